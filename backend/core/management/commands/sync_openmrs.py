@@ -16,6 +16,11 @@ class Command(BaseCommand):
             action='store_true',
             help='방문 데이터를 OpenMRS에서 가져옵니다',
         )
+        parser.add_argument(
+            '--vitals',
+            action='store_true',
+            help='활력징후 관찰 기록(obs)을 OpenMRS에서 가져옵니다',
+        )
         parser.add_argument(
             '--all',
             action='store_true',
@@ -49,13 +54,18 @@ class Command(BaseCommand):
         if options['visits'] or options['all']:
             self.sync_visits(limit)
         
+        # 활력징후 동기화 (환자/방문 동기화 후)
+        if options['vitals'] or options['all']:
+            self.sync_vitals()
+        
         # 옵션이 없으면 도움말 표시
-        if not any([options['patients'], options['visits'], options['all']]):
+        if not any([options['patients'], options['visits'], options['vitals'], options['all']]):
             self.stdout.write(
                 self.style.WARNING('동기화할 데이터 유형을 선택하세요:')
             )
             self.stdout.write('  --patients: 환자 데이터 동기화')
             self.stdout.write('  --visits: 방문 데이터 동기화')
+            self.stdout.write('  --vitals: 활력징후 관찰 기록 동기화')
             self.stdout.write('  --all: 모든 데이터 동기화')
             self.stdout.write('  --push-patient [환자번호]: 환자를 OpenMRS로 전송')
     
@@ -101,6 +111,28 @@ class Command(BaseCommand):
                 self.style.ERROR(f"❌ 방문 동기화 중 오류: {str(e)}")
             )
     
+    def sync_vitals(self):
+        """활력징후 관찰 기록 동기화"""
+        self.stdout.write('OpenMRS에서 활력징후 관찰 기록 동기화 시작...')
+        
+        try:
+            result = sync.sync_vital_signs_from_openmrs()
+            
+            if result['success']:
+                self.stdout.write(
+                    self.style.SUCCESS(f"✅ {result['message']}")
+                )
+                self.stdout.write(f"상세: {result['stats']}")
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f"❌ {result['message']}")
+                )
+                
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"❌ 활력징후 동기화 중 오류: {str(e)}")
+            )
+    
     def push_patient_to_openmrs(self, patient_id):
         """Django 환자를 OpenMRS로 전송"""
         self.stdout.write(f'환자 {patient_id}를 OpenMRS로 전송 중...')
@@ -0,0 +1,261 @@
+# backend/core/openmrs_async.py - ASGI 뷰 / 워커용 asyncio OpenMRS 클라이언트와 서비스
+import asyncio
+import logging
+import random
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .openmrs_client import MAX_BACKOFF, RETRY_STATUS_CODES
+from .openmrs_service import openmrs
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenMRSClient:
+    """OpenMRSClient 의 asyncio 버전 (httpx.AsyncClient)
+
+    - 이벤트 루프마다 하나의 httpx.AsyncClient(연결 풀 크기 OPENMRS_ASYNC_POOL_SIZE)를 공유합니다.
+    - 루프마다 세마포어로 동시에 진행 중인 요청 수를 OPENMRS_ASYNC_MAX_IN_FLIGHT 로 제한하므로
+      한 프로세스에서 수백 개의 호출을 동시에 기다리면서도 OpenMRS 에 보내는 요청은 제한됩니다.
+    - 타임아웃과 GET 재시도(지수 백오프 + 지터)는 OpenMRSClient 와 같은 설정을 사용합니다.
+    """
+
+    def __init__(self, api_base_url=None, username=None, password=None, pool_size=None, max_in_flight=None):
+        self.api_base_url = (api_base_url or settings.OPENMRS_API_BASE_URL).rstrip('/')
+        self.auth = (username or settings.OPENMRS_USERNAME, password or settings.OPENMRS_PASSWORD)
+        self.pool_size = pool_size or getattr(settings, 'OPENMRS_ASYNC_POOL_SIZE', 100)
+        self.max_in_flight = max_in_flight or getattr(settings, 'OPENMRS_ASYNC_MAX_IN_FLIGHT', 200)
+        self.connect_timeout = getattr(settings, 'OPENMRS_CONNECT_TIMEOUT', 5.0)
+        self.read_timeout = getattr(settings, 'OPENMRS_READ_TIMEOUT', 30.0)
+        self.max_retries = getattr(settings, 'OPENMRS_MAX_RETRIES', 3)
+        self.backoff_factor = getattr(settings, 'OPENMRS_RETRY_BACKOFF', 0.5)
+        # httpx.AsyncClient 와 세마포어는 생성된 이벤트 루프에서만 쓸 수 있으므로 루프별로 보관
+        self._loop_state = weakref.WeakKeyDictionary()
+
+    def url(self, endpoint):
+        if endpoint.startswith(('http://', 'https://')):
+            return endpoint
+        return f"{self.api_base_url}/{endpoint.lstrip('/')}"
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._loop_state.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                auth=self.auth,
+                headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            state = (client, asyncio.Semaphore(self.max_in_flight))
+            self._loop_state[loop] = state
+        return state
+
+    async def request(self, method, endpoint, params=None, json=None, timeout=None, headers=None, retry=None):
+        """요청 후 httpx.Response 반환 (상태 코드 검사는 호출하는 쪽에서)
+
+        retry 를 지정하지 않으면 GET 만 재시도합니다.
+        """
+        client, semaphore = self._state()
+        method = method.upper()
+        url = self.url(endpoint)
+        attempts = 1 + (self.max_retries if (retry if retry is not None else method == 'GET') else 0)
+
+        for attempt in range(1, attempts + 1):
+            try:
+                async with semaphore:
+                    response = await client.request(
+                        method, url, params=params, json=json, headers=headers,
+                        timeout=self._timeout(timeout)
+                    )
+            except httpx.TransportError as e:
+                if attempt == attempts:
+                    raise
+                await self._sleep_before_retry(attempt, method, url, str(e))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < attempts:
+                await self._sleep_before_retry(attempt, method, url, f"HTTP {response.status_code}",
+                                               response.headers.get('Retry-After'))
+                continue
+            return response
+
+    @staticmethod
+    def _timeout(timeout):
+        # OpenMRSClient 와 같이 초 또는 (연결, 읽기) 튜플
+        if not timeout:
+            return httpx.USE_CLIENT_DEFAULT
+        if isinstance(timeout, (tuple, list)):
+            return httpx.Timeout(timeout[1], connect=timeout[0])
+        return httpx.Timeout(timeout)
+
+    async def get(self, endpoint, params=None, **kwargs):
+        return await self.request('GET', endpoint, params=params, **kwargs)
+
+    async def post(self, endpoint, json=None, **kwargs):
+        return await self.request('POST', endpoint, json=json, **kwargs)
+
+    async def get_json(self, endpoint, params=None, **kwargs):
+        """GET 후 JSON 반환 (2xx 가 아니면 httpx.HTTPStatusError)"""
+        response = await self.get(endpoint, params=params, **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    async def aclose(self):
+        """현재 이벤트 루프의 연결 풀 닫기"""
+        state = self._loop_state.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+
+    def run(self, coroutine_function, *args, **kwargs):
+        """동기 코드(Celery 태스크, 관리 명령)에서 코루틴 실행 - 끝나면 이 루프의 연결 풀을 닫음
+
+        예: async_openmrs_client.run(fetch_many, uuids) 로 여러 호출을 한 스레드에서 동시에 진행합니다.
+        """
+        async def runner():
+            try:
+                return await coroutine_function(*args, **kwargs)
+            finally:
+                await self.aclose()
+        return asyncio.run(runner())
+
+    async def _sleep_before_retry(self, attempt, method, url, reason, retry_after=None):
+        """지수 백오프 + full jitter (Retry-After 헤더가 있으면 그 값을 우선)"""
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = random.uniform(0, self.backoff_factor * (2 ** (attempt - 1)))
+        delay = min(delay, MAX_BACKOFF)
+        logger.warning(f"OpenMRS {method} {url} 실패 ({reason}) - {delay:.2f}s 후 재시도 ({attempt}/{self.max_retries})")
+        await asyncio.sleep(delay)
+
+
+class AsyncOpenMRSService:
+    """OpenMRSService 와 같은 메서드를 제공하는 asyncio 버전
+
+    요청/오류 처리는 AsyncOpenMRSClient 로 하고, 기준 데이터(개념/위치/의료진 등)와 생성 요청 변환은
+    캐시를 공유하도록 OpenMRSService 의 구현을 스레드에서 호출합니다.
+    """
+
+    def __init__(self, client=None, sync_service=None):
+        self.client = client or async_openmrs_client
+        self.sync_service = sync_service or openmrs
+
+    async def _make_request(self, method, endpoint, data=None, params=None):
+        """API 요청 공통 처리 (OpenMRSService._make_request 와 같은 예외)"""
+        try:
+            response = await self.client.request(method, endpoint, params=params, json=data)
+            response.raise_for_status()
+            return response.json() if response.content else {}
+
+        except httpx.HTTPError as e:
+            logger.error(f"OpenMRS API 요청 실패: {e}")
+            raise Exception(f"OpenMRS API 연결 실패: {str(e)}")
+
+    async def _call_sync(self, method_name, *args, **kwargs):
+        # thread_sensitive=False - 캐시 미스 시 OpenMRS 호출이 다른 요청을 막지 않도록 별도 스레드에서 실행
+        return await sync_to_async(getattr(self.sync_service, method_name), thread_sensitive=False)(*args, **kwargs)
+
+    async def test_connection(self):
+        """OpenMRS 연결 테스트"""
+        try:
+            result = await self._make_request('GET', 'session')
+            return {
+                'success': True,
+                'message': 'OpenMRS 연결 성공',
+                'user': result.get('user', {}).get('display', 'Unknown')
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'OpenMRS 연결 실패: {str(e)}'
+            }
+
+    # === 환자 관련 API ===
+    async def get_patients(self, query=None, limit=50):
+        """환자 목록 조회"""
+        params = {'v': 'default', 'limit': limit}
+        if query:
+            params['q'] = query
+        result = await self._make_request('GET', 'patient', params=params)
+        return result.get('results', [])
+
+    async def get_patient(self, patient_uuid):
+        """특정 환자 조회"""
+        return await self._make_request('GET', f'patient/{patient_uuid}', params={'v': 'full'})
+
+    async def create_patient(self, patient_data):
+        """환자 생성"""
+        openmrs_data = await self._call_sync('_convert_patient_to_openmrs', patient_data)
+        return await self._make_request('POST', 'patient', data=openmrs_data)
+
+    async def update_patient(self, patient_uuid, patient_data):
+        """환자 정보 수정"""
+        openmrs_data = await self._call_sync('_convert_patient_to_openmrs', patient_data)
+        return await self._make_request('POST', f'patient/{patient_uuid}', data=openmrs_data)
+
+    # === 방문 관련 API ===
+    async def get_visits(self, patient_uuid=None, limit=50):
+        """방문 목록 조회"""
+        params = {'v': 'default', 'limit': limit}
+        if patient_uuid:
+            params['patient'] = patient_uuid
+        result = await self._make_request('GET', 'visit', params=params)
+        return result.get('results', [])
+
+    async def get_visit(self, visit_uuid):
+        """특정 방문 조회"""
+        return await self._make_request('GET', f'visit/{visit_uuid}', params={'v': 'full'})
+
+    async def create_visit(self, visit_data):
+        """방문 생성"""
+        openmrs_data = await self._call_sync('_convert_visit_to_openmrs', visit_data)
+        return await self._make_request('POST', 'visit', data=openmrs_data)
+
+    # === 관찰 기록 (Obs) 관련 API ===
+    async def get_observations(self, patient_uuid=None, concept_uuid=None, limit=50):
+        """관찰 기록 조회 (활력징후 등)"""
+        params = {'v': 'default', 'limit': limit}
+        if patient_uuid:
+            params['patient'] = patient_uuid
+        if concept_uuid:
+            params['concept'] = concept_uuid
+        result = await self._make_request('GET', 'obs', params=params)
+        return result.get('results', [])
+
+    async def create_observation(self, obs_data):
+        """관찰 기록 생성"""
+        return await self._make_request('POST', 'obs', data=obs_data)
+
+    # === 기준 데이터 (reference_cache 공유) ===
+    async def get_concepts(self, query=None, limit=50):
+        """개념 검색"""
+        return await self._call_sync('get_concepts', query, limit)
+
+    async def get_concept(self, concept_uuid):
+        """특정 개념 조회"""
+        return await self._call_sync('get_concept', concept_uuid)
+
+    async def get_locations(self):
+        """위치/부서 목록 조회"""
+        return await self._call_sync('get_locations')
+
+    async def get_providers(self):
+        """의료진 목록 조회"""
+        return await self._call_sync('get_providers')
+
+    async def get_visit_types(self):
+        """방문 유형 목록 조회"""
+        return await self._call_sync('get_visit_types')
+
+    async def get_identifier_types(self):
+        """환자 식별번호 유형 목록 조회"""
+        return await self._call_sync('get_identifier_types')
+
+
+# 싱글톤 인스턴스 생성
+async_openmrs_client = AsyncOpenMRSClient()
+async_openmrs = AsyncOpenMRSService()
@@ -0,0 +1,230 @@
+# backend/core/openmrs_client.py - 모든 OpenMRS 연동 경로가 공유하는 HTTP 클라이언트
+import math
+import random
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from django.conf import settings
+
+try:
+    import ijson
+except ImportError:  # 선택 의존성 - 없으면 페이지 전체를 response.json() 으로 파싱
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 응답 상태 (일시적인 서버 과부하/게이트웨이 오류)
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+# 재시도 간 최대 대기 시간(초)
+MAX_BACKOFF = 10.0
+
+
+def custom_representation(*fields):
+    """OpenMRS 사용자 정의 표현(v=custom:...) 문자열 생성
+
+    필드는 이름 문자열이나 (이름, [하위 필드...]) 튜플이며 하위 필드도 같은 형식입니다.
+    예: custom_representation('uuid', ('person', ['gender'])) → 'custom:(uuid,person:(gender))'
+    """
+    def render(field_list):
+        rendered = []
+        for field in field_list:
+            if isinstance(field, (tuple, list)):
+                name, sub_fields = field
+                rendered.append(f"{name}:({render(sub_fields)})")
+            else:
+                rendered.append(field)
+        return ','.join(rendered)
+    return f"custom:({render(fields)})"
+
+
+class OpenMRSClient:
+    """OpenMRS REST API 클라이언트
+
+    - 하나의 requests.Session 과 keep-alive 연결 풀(크기 OPENMRS_HTTP_POOL_SIZE)을 재사용해
+      페이지마다 TCP/TLS 연결을 새로 맺지 않습니다.
+    - 모든 호출에 (연결, 읽기) 타임아웃을 적용하며, 호출마다 timeout 으로 바꿀 수 있습니다.
+    - 멱등인 GET 만 연결 오류/타임아웃/429·5xx 응답에 대해 지수 백오프 + 지터로 재시도합니다.
+    - endpoint 는 'patient' 같은 상대 경로 또는 (next 링크 등) 전체 URL 을 받습니다.
+    """
+
+    def __init__(self, api_base_url=None, username=None, password=None, pool_size=None,
+                 connect_timeout=None, read_timeout=None, max_retries=None, backoff_factor=None):
+        self.api_base_url = (api_base_url or settings.OPENMRS_API_BASE_URL).rstrip('/')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else getattr(settings, 'OPENMRS_CONNECT_TIMEOUT', 5.0),
+            read_timeout if read_timeout is not None else getattr(settings, 'OPENMRS_READ_TIMEOUT', 30.0),
+        )
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'OPENMRS_MAX_RETRIES', 3)
+        self.backoff_factor = backoff_factor if backoff_factor is not None else getattr(settings, 'OPENMRS_RETRY_BACKOFF', 0.5)
+
+        pool_size = pool_size or getattr(settings, 'OPENMRS_HTTP_POOL_SIZE', 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.auth = HTTPBasicAuth(
+            username or settings.OPENMRS_USERNAME,
+            password or settings.OPENMRS_PASSWORD
+        )
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        })
+
+    def url(self, endpoint):
+        if endpoint.startswith(('http://', 'https://')):
+            return endpoint
+        return f"{self.api_base_url}/{endpoint.lstrip('/')}"
+
+    def request(self, method, endpoint, params=None, json=None, timeout=None, headers=None, retry=None, stream=False):
+        """요청 후 Response 반환 (상태 코드 검사는 호출하는 쪽에서)
+
+        retry 를 지정하지 않으면 GET 만 재시도합니다.
+        stream=True 면 본문을 미리 읽지 않습니다 (호출하는 쪽에서 response.close() 필요).
+        """
+        method = method.upper()
+        url = self.url(endpoint)
+        attempts = 1 + (self.max_retries if (retry if retry is not None else method == 'GET') else 0)
+
+        for attempt in range(1, attempts + 1):
+            try:
+                response = self.session.request(
+                    method, url, params=params, json=json, headers=headers,
+                    timeout=timeout or self.timeout, stream=stream
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == attempts:
+                    raise
+                self._sleep_before_retry(attempt, method, url, str(e))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < attempts:
+                response.close()
+                self._sleep_before_retry(attempt, method, url, f"HTTP {response.status_code}",
+                                         response.headers.get('Retry-After'))
+                continue
+            return response
+
+    def get(self, endpoint, params=None, **kwargs):
+        return self.request('GET', endpoint, params=params, **kwargs)
+
+    def post(self, endpoint, json=None, **kwargs):
+        return self.request('POST', endpoint, json=json, **kwargs)
+
+    def get_json(self, endpoint, params=None, **kwargs):
+        """GET 후 JSON 반환 (2xx 가 아니면 requests.exceptions.HTTPError)"""
+        response = self.get(endpoint, params=params, **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    def stream_results(self, endpoint, params=None, timeout=None):
+        """GET 응답의 results 항목을 하나씩 반환 (2xx 가 아니면 requests.exceptions.HTTPError)
+
+        ijson 이 설치되어 있으면 소켓에서 읽는 대로 항목을 파싱하므로, 응답 본문 전체(원문 + 파싱 결과)를
+        메모리에 올리지 않습니다. 없으면 response.json() 으로 파싱합니다.
+        """
+        response = self.get(endpoint, params=params, timeout=timeout, stream=ijson is not None)
+        try:
+            response.raise_for_status()
+            if ijson is None:
+                yield from (response.json() if response.content else {}).get('results', [])
+                return
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, 'results.item', use_float=True)
+        finally:
+            response.close()
+
+    def iter_pages(self, endpoint, params=None, page_size=50, max_total=None, concurrency=None, timeout=None, start_index=0):
+        """startIndex 페이지들을 동시에 여러 개 요청하고 순서대로 (start_index, results) 반환
+
+        - 최대 concurrency 개(기본 OPENMRS_SYNC_CONCURRENCY)의 페이지 요청을 동시에 진행합니다.
+          연결 풀 크기(OPENMRS_HTTP_POOL_SIZE)가 이보다 작으면 연결을 재사용하지 못합니다.
+        - limit 보다 짧거나 빈 페이지가 나오면 끝으로 보고, 이미 진행 중인 요청 결과는 버립니다.
+        - max_total 을 넘는 페이지는 요청하지 않으며 마지막 페이지는 잘라서 반환합니다.
+        - 페이지 요청 중 오류가 나면 해당 페이지 순서에서 예외가 발생합니다.
+        - start_index 부터 시작합니다 (중단된 동기화 재개용). max_total 은 start_index 이후 개수입니다.
+        - 각 페이지는 stream_results 로 파싱하므로 메모리에는 최대 concurrency 개 페이지의 항목만 올라갑니다.
+        """
+        concurrency = max(1, concurrency or getattr(settings, 'OPENMRS_SYNC_CONCURRENCY', 4))
+        max_pages = math.ceil(max_total / page_size) if max_total is not None else None
+
+        def fetch_page(page_start):
+            page_params = dict(params or {}, limit=page_size, startIndex=page_start)
+            return list(self.stream_results(endpoint, params=page_params, timeout=timeout))
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='openmrs-page')
+        in_flight = deque()
+        next_page = 0
+        fetched = 0
+        try:
+            while True:
+                while len(in_flight) < concurrency and (max_pages is None or next_page < max_pages):
+                    page_start = start_index + next_page * page_size
+                    in_flight.append((page_start, executor.submit(fetch_page, page_start)))
+                    next_page += 1
+                if not in_flight:
+                    return
+
+                page_start, future = in_flight.popleft()
+                results = future.result()
+                is_last_page = len(results) < page_size
+                if max_total is not None:
+                    results = results[:max_total - fetched]
+                fetched += len(results)
+
+                yield page_start, results
+                if is_last_page or (max_total is not None and fetched >= max_total):
+                    return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_items(self, endpoint, params=None, page_size=50, max_total=None, concurrency=None, timeout=None, start_index=0):
+        """iter_pages 의 항목을 하나씩 (index, item) 으로 반환 (index 는 startIndex 기준 위치)
+
+        concurrency 가 1 이면 페이지를 순서대로 하나씩 요청하고 파싱되는 대로 항목을 넘기므로
+        메모리에 페이지 전체가 올라가지 않습니다. 그보다 크면 iter_pages 로 페이지를 동시에 받습니다.
+        """
+        concurrency = max(1, concurrency or getattr(settings, 'OPENMRS_SYNC_CONCURRENCY', 4))
+        if concurrency > 1:
+            for page_start, results in self.iter_pages(endpoint, params, page_size, max_total, concurrency, timeout, start_index):
+                yield from enumerate(results, page_start)
+            return
+
+        page_start = start_index
+        fetched = 0
+        while max_total is None or fetched < max_total:
+            page_params = dict(params or {}, limit=page_size, startIndex=page_start)
+            page_count = 0
+            items = self.stream_results(endpoint, params=page_params, timeout=timeout)
+            try:
+                for item in items:
+                    yield page_start + page_count, item
+                    page_count += 1
+                    fetched += 1
+                    if max_total is not None and fetched >= max_total:
+                        return
+            finally:
+                items.close()
+            if page_count < page_size:
+                return
+            page_start += page_size
+
+    def _sleep_before_retry(self, attempt, method, url, reason, retry_after=None):
+        """지수 백오프 + full jitter (Retry-After 헤더가 있으면 그 값을 우선)"""
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = random.uniform(0, self.backoff_factor * (2 ** (attempt - 1)))
+        delay = min(delay, MAX_BACKOFF)
+        logger.warning(f"OpenMRS {method} {url} 실패 ({reason}) - {delay:.2f}s 후 재시도 ({attempt}/{self.max_retries})")
+        time.sleep(delay)
+
+
+# 싱글톤 인스턴스 생성
+openmrs_client = OpenMRSClient()
@@ -0,0 +1,199 @@
+# backend/core/openmrs_reference.py - 자주 바뀌지 않는 OpenMRS 기준 데이터 캐시
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .openmrs_client import openmrs_client
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_PREFIX = 'omrs_ref'
+# 리소스별 기본 TTL(초) - settings.OPENMRS_REFERENCE_CACHE_TTL 로 덮어씀
+DEFAULT_REFERENCE_TTL = {
+    'concept': 86400,
+    'location': 3600,
+    'provider': 900,
+    'visittype': 86400,
+    'patientidentifiertype': 86400,
+    'personattributetype': 86400,
+}
+# TTL 이 지난 항목도 이 배수만큼 더 보관 - 재검증(ETag/If-Modified-Since)과 OpenMRS 장애 시 이전 값 반환용
+STALE_RETENTION_FACTOR = 4
+# 다른 프로세스가 같은 항목을 가져오는 중일 때 기다리는 최대 시간(초)과 확인 간격
+SINGLE_FLIGHT_WAIT = 5.0
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# 워커 시작 시 미리 불러올 목록 (리소스, 조회 파라미터)
+WARM_UP_LISTS = [
+    ('location', {'v': 'default'}),
+    ('provider', {'v': 'default'}),
+    ('visittype', {'v': 'default'}),
+    ('patientidentifiertype', {'v': 'default'}),
+    ('personattributetype', {'v': 'default'}),
+]
+
+# 생성 요청에 쓰는 기본 UUID - (리소스, UUID 설정, 이름 설정, 기본 이름, 기본 UUID)
+# 설정된 UUID → OpenMRS 에서 이름으로 찾은 UUID → 표준 데모 데이터 UUID 순으로 사용
+DEFAULT_REFERENCE_UUIDS = {
+    'identifier_type': ('patientidentifiertype', 'DEFAULT_OPENMRS_IDENTIFIER_TYPE_UUID', 'OPENMRS_IDENTIFIER_TYPE_NAME',
+                        'OpenMRS ID', '05a29f94-c0ed-11e2-94be-8c13b969e334'),
+    'location': ('location', 'DEFAULT_OPENMRS_LOCATION_UUID', 'OPENMRS_DEFAULT_LOCATION_NAME',
+                 'Unknown Location', '8d6c993e-c2cc-11de-8d13-0010c6dffd0f'),
+    'visit_type': ('visittype', 'DEFAULT_OPENMRS_VISIT_TYPE_UUID', 'OPENMRS_DEFAULT_VISIT_TYPE_NAME',
+                   'Facility Visit', '7b0f5697-27e3-40c4-8bae-f4049abfb4ed'),
+    'phone_attribute_type': ('personattributetype', 'OPENMRS_PHONE_ATTRIBUTE_TYPE_UUID', 'OPENMRS_PHONE_ATTRIBUTE_TYPE_NAME',
+                             'Telephone Number', '14d4f066-15f5-102d-96e4-000c29c2a5d7'),
+}
+
+
+class OpenMRSReferenceCache:
+    """Django 캐시 위의 OpenMRS 기준 데이터(개념/위치/의료진/방문 유형 등) 캐시
+
+    - 리소스별 TTL 동안은 OpenMRS 를 호출하지 않습니다.
+    - TTL 이 지나면 저장해 둔 ETag / Last-Modified 로 조건부 요청을 보내고, 304 면 본문 없이 갱신합니다.
+    - 같은 항목을 동시에 놓치면 프로세스 안에서는 스레드 잠금, 프로세스 사이에서는 cache.add 잠금으로
+      한 번만 OpenMRS 를 호출하고 나머지는 그 결과(또는 만료된 이전 값)를 사용합니다.
+    - OpenMRS 호출이 실패하면 보관 중인 이전 값을 반환합니다.
+
+    프로세스 사이의 잠금과 항목 공유는 캐시가 Redis(REDIS_CACHE_URL, docker-compose 기본값)일 때만 동작하며,
+    지정하지 않아 로컬 메모리 캐시면 프로세스마다 따로 캐시하고 따로 OpenMRS 를 호출합니다.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or openmrs_client
+        self._local_locks = {}
+        self._local_locks_guard = threading.Lock()
+
+    def ttl(self, resource):
+        ttls = dict(DEFAULT_REFERENCE_TTL, **getattr(settings, 'OPENMRS_REFERENCE_CACHE_TTL', {}))
+        return ttls.get(resource, 3600)
+
+    def _key(self, endpoint, params):
+        digest = hashlib.md5(json.dumps([endpoint, params or {}], sort_keys=True).encode('utf-8')).hexdigest()
+        return f"{REFERENCE_CACHE_PREFIX}:{endpoint.split('/')[0]}:{digest}"
+
+    def _local_lock(self, key):
+        with self._local_locks_guard:
+            return self._local_locks.setdefault(key, threading.Lock())
+
+    def get(self, resource, endpoint=None, params=None):
+        """기준 데이터 JSON 조회 (endpoint 기본값은 resource, 예: 'concept/<uuid>')"""
+        endpoint = endpoint or resource
+        key = self._key(endpoint, params)
+        entry = cache.get(key)
+        if entry and time.time() - entry['fetched_at'] < self.ttl(resource):
+            return entry['data']
+
+        with self._local_lock(key):
+            # 잠금을 기다리는 동안 다른 스레드가 갱신했으면 그 값을 사용
+            entry = cache.get(key)
+            if entry and time.time() - entry['fetched_at'] < self.ttl(resource):
+                return entry['data']
+
+            lock_key = f"{key}:lock"
+            acquired = cache.add(lock_key, 1, timeout=int(SINGLE_FLIGHT_WAIT * 2))
+            if not acquired:
+                if entry:
+                    return entry['data']
+                entry = self._wait_for_other_fetch(key)
+                if entry:
+                    return entry['data']
+            try:
+                return self._fetch(resource, endpoint, params, key, entry)
+            finally:
+                if acquired:
+                    cache.delete(lock_key)
+
+    def _wait_for_other_fetch(self, key):
+        deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry:
+                return entry
+        return None
+
+    def _fetch(self, resource, endpoint, params, key, entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.client.get(endpoint, params=params, headers=headers or None)
+            if response.status_code == 304 and entry:
+                data = entry['data']
+            else:
+                response.raise_for_status()
+                data = response.json() if response.content else {}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if entry:
+                logger.warning(f"OpenMRS 기준 데이터 갱신 실패 - 이전 값 사용 ({endpoint}): {e}")
+                return entry['data']
+            raise
+
+        previous = entry or {}
+        cache.set(key, {
+            'data': data,
+            'etag': response.headers.get('ETag') or previous.get('etag'),
+            'last_modified': response.headers.get('Last-Modified') or previous.get('last_modified'),
+            'fetched_at': time.time(),
+        }, timeout=self.ttl(resource) * STALE_RETENTION_FACTOR)
+        return data
+
+    def get_results(self, resource, params=None):
+        """목록 조회 결과(results) 반환"""
+        return self.get(resource, params=params).get('results', [])
+
+    def exists(self, resource, reference_uuid):
+        """해당 리소스에 UUID 가 있는지 (있으면 캐시, 404 는 캐시하지 않음)"""
+        if not reference_uuid:
+            return False
+        try:
+            self.get(resource, f"{resource}/{reference_uuid}", params={'v': 'ref'})
+            return True
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return False
+            raise
+
+    def find_uuid_by_name(self, resource, name):
+        """목록에서 이름(display/name)이 같은 항목의 UUID (없거나 조회 실패 시 None)"""
+        try:
+            for item in self.get_results(resource, params={'v': 'default'}):
+                if name in (item.get('display'), item.get('name')):
+                    return item.get('uuid')
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"OpenMRS {resource} 목록 조회 실패 - 기본 UUID 사용: {e}")
+        return None
+
+    def default_uuid(self, kind):
+        """생성 요청에 쓸 기본 UUID (DEFAULT_REFERENCE_UUIDS 참고)"""
+        resource, uuid_setting, name_setting, default_name, fallback_uuid = DEFAULT_REFERENCE_UUIDS[kind]
+        configured = getattr(settings, uuid_setting, None)
+        if configured:
+            return configured
+        return self.find_uuid_by_name(resource, getattr(settings, name_setting, default_name)) or fallback_uuid
+
+    def warm_up(self):
+        """자주 쓰는 목록을 미리 캐시에 적재 (실패한 항목은 건너뜀)"""
+        loaded = 0
+        for resource, params in WARM_UP_LISTS:
+            try:
+                self.get(resource, params=params)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"OpenMRS 기준 데이터 warm-up 실패 ({resource}): {e}")
+        logger.info(f"OpenMRS 기준 데이터 warm-up 완료: {loaded}/{len(WARM_UP_LISTS)}")
+        return loaded
+
+
+# 싱글톤 인스턴스 생성
+reference_cache = OpenMRSReferenceCache()
@@ -1,8 +1,9 @@
 import requests
 import json
-import base64
 from django.conf import settings
 from django.core.cache import cache
+from .openmrs_client import openmrs_client
+from .openmrs_reference import reference_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,41 +13,27 @@ class OpenMRSService:
     
     def __init__(self):
         self.base_url = settings.OPENMRS_BASE_URL
-        self.username = settings.OPENMRS_USERNAME
-        self.password = settings.OPENMRS_PASSWORD
-        self.session = requests.Session()
-        self._setup_auth()
-    
-    def _setup_auth(self):
-        """Basic Auth 설정"""
-        credentials = f"{self.username}:{self.password}"
-        encoded_credentials = base64.b64encode(credentials.encode()).decode()
-        self.session.headers.update({
-            'Authorization': f'Basic {encoded_credentials}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
+        self.client = openmrs_client
+        self.reference = reference_cache
     
     def _make_request(self, method, endpoint, data=None, params=None):
-        """API 요청 공통 처리"""
-        url = f"{self.base_url}/ws/rest/v1/{endpoint}"
-        
+        """API 요청 공통 처리 (공용 클라이언트의 연결 풀 / 타임아웃 / GET 재시도 사용)"""
         try:
-            if method == 'GET':
-                response = self.session.get(url, params=params)
-            elif method == 'POST':
-                response = self.session.post(url, json=data)
-            elif method == 'PUT':
-                response = self.session.put(url, json=data)
-            elif method == 'DELETE':
-                response = self.session.delete(url)
-            
+            response = self.client.request(method, endpoint, params=params, json=data)
             response.raise_for_status()
             return response.json() if response.content else {}
             
         except requests.exceptions.RequestException as e:
             logger.error(f"OpenMRS API 요청 실패: {e}")
             raise Exception(f"OpenMRS API 연결 실패: {str(e)}")
+
+    def _get_reference(self, resource, endpoint=None, params=None):
+        """기준 데이터 조회 (reference_cache 사용, 오류 처리는 _make_request 와 동일)"""
+        try:
+            return self.reference.get(resource, endpoint, params=params)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"OpenMRS API 요청 실패: {e}")
+            raise Exception(f"OpenMRS API 연결 실패: {str(e)}")
     
     def test_connection(self):
         """OpenMRS 연결 테스트"""
@@ -106,8 +93,8 @@ class OpenMRSService:
         return {
             "identifiers": [{
                 "identifier": patient_data.get('patient_id'),
-                "identifierType": "05a29f94-c0ed-11e2-94be-8c13b969e334",  # OpenMRS Patient Identifier Type UUID
-                "location": "8d6c993e-c2cc-11de-8d13-0010c6dffd0f",  # Unknown Location UUID
+                "identifierType": self.reference.default_uuid('identifier_type'),
+                "location": self.reference.default_uuid('location'),
                 "preferred": True
             }],
             "person": {
@@ -148,9 +135,9 @@ class OpenMRSService:
         """Django 방문 데이터를 OpenMRS 형식으로 변환"""
         return {
             "patient": visit_data.get('patient_uuid'),
-            "visitType": "7b0f5697-27e3-40c4-8bae-f4049abfb4ed",  # Facility Visit
+            "visitType": self.reference.default_uuid('visit_type'),
             "startDatetime": visit_data.get('visit_date'),
-            "location": "8d6c993e-c2cc-11de-8d13-0010c6dffd0f"  # Unknown Location
+            "location": self.reference.default_uuid('location')
         }
     
     # === 관찰 기록 (Obs) 관련 API ===
@@ -176,23 +163,34 @@ class OpenMRSService:
         if query:
             params['q'] = query
         
-        result = self._make_request('GET', 'concept', params=params)
+        result = self._get_reference('concept', params=params)
         return result.get('results', [])
     
     def get_concept(self, concept_uuid):
         """특정 개념 조회"""
-        return self._make_request('GET', f'concept/{concept_uuid}', params={'v': 'full'})
+        return self._get_reference('concept', f'concept/{concept_uuid}', params={'v': 'full'})
     
     # === 진료과/부서 관련 API ===
     def get_locations(self):
         """위치/부서 목록 조회"""
-        result = self._make_request('GET', 'location', params={'v': 'default'})
+        result = self._get_reference('location', params={'v': 'default'})
         return result.get('results', [])
     
     # === 사용자 관련 API ===
     def get_providers(self):
         """의료진 목록 조회"""
-        result = self._make_request('GET', 'provider', params={'v': 'default'})
+        result = self._get_reference('provider', params={'v': 'default'})
+        return result.get('results', [])
+    
+    # === 방문 유형 / 식별번호 유형 API ===
+    def get_visit_types(self):
+        """방문 유형 목록 조회"""
+        result = self._get_reference('visittype', params={'v': 'default'})
+        return result.get('results', [])
+    
+    def get_identifier_types(self):
+        """환자 식별번호 유형 목록 조회"""
+        result = self._get_reference('patientidentifiertype', params={'v': 'default'})
         return result.get('results', [])
 
 
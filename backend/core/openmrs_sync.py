@@ -1,11 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from patients.models import Patient, Visit, VitalSigns
+from patients.vital_stats import refresh_vital_sign_aggregates
+from openmrs_integration.utils import parse_openmrs_datetime
+from .openmrs_client import custom_representation, openmrs_client
 from .openmrs_service import openmrs
 import logging
 
 logger = logging.getLogger(__name__)
 
+# CIEL 활력징후 개념 UUID → VitalSigns 필드 (settings.OPENMRS_VITAL_SIGN_CONCEPTS 로 추가/변경)
+DEFAULT_VITAL_SIGN_CONCEPTS = {
+    '5085AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'systolic_bp',
+    '5086AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'diastolic_bp',
+    '5087AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'heart_rate',
+    '5088AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'temperature',
+    '5242AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'respiratory_rate',
+    '5092AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'oxygen_saturation',
+    '5090AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'height',
+    '5089AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA': 'weight',
+}
+
+# 관찰 기록 조회 시 받는 필드 (값, 개념, encounter 와 방문 - 방문 유형/종료 시각은 로컬 Visit 생성용)
+OBS_REPRESENTATION = custom_representation(
+    'uuid', 'obsDatetime', 'value',
+    ('concept', ['uuid']),
+    ('encounter', ['uuid', ('visit', ['uuid', 'startDatetime', 'stopDatetime', ('visitType', ['display'])])]),
+)
+OBS_PAGE_SIZE = 100
+# VitalSigns bulk_create 한 번에 저장할 행 수
+VITAL_SIGNS_BATCH_SIZE = 500
+
 class OpenMRSSync:
     """OpenMRS와 Django 데이터 동기화"""
     
@@ -153,13 +182,7 @@ class OpenMRSSync:
                         pass
             
             # 방문 유형
-            visit_type = openmrs_visit.get('visitType', {}).get('display', 'OUTPATIENT')
-            if 'inpatient' in visit_type.lower():
-                visit_type = 'INPATIENT'
-            elif 'emergency' in visit_type.lower():
-                visit_type = 'EMERGENCY'
-            else:
-                visit_type = 'OUTPATIENT'
+            visit_type = self._openmrs_visit_type(openmrs_visit)
             
             # Django 방문 객체 생성 또는 업데이트
             visit, created = Visit.objects.update_or_create(
@@ -179,6 +202,208 @@ class OpenMRSSync:
             logger.error(f"OpenMRS 방문 변환 실패: {str(e)}")
             return None
     
+    def _openmrs_visit_type(self, openmrs_visit):
+        """OpenMRS visitType 표시 이름 → Visit.visit_type"""
+        visit_type = (openmrs_visit.get('visitType') or {}).get('display') or 'OUTPATIENT'
+        if 'inpatient' in visit_type.lower():
+            return 'INPATIENT'
+        elif 'emergency' in visit_type.lower():
+            return 'EMERGENCY'
+        return 'OUTPATIENT'
+    
+    def vital_sign_concepts(self):
+        concepts = dict(DEFAULT_VITAL_SIGN_CONCEPTS)
+        concepts.update(getattr(settings, 'OPENMRS_VITAL_SIGN_CONCEPTS', {}))
+        return concepts
+    
+    def sync_vital_signs_from_openmrs(self, patients=None, concurrency=None):
+        """OpenMRS 관찰 기록(활력징후)을 가져와 VitalSigns 로 일괄 저장
+        
+        - 환자별 obs 목록을 최대 concurrency 명(기본 OPENMRS_SYNC_CONCURRENCY)씩 동시에 페이지 단위로 가져옵니다.
+        - 개념 매핑(vital_sign_concepts)에 있는 obs 만 남기고, obs UUID 로 중복을 제거한 뒤
+          encounter 하나를 VitalSigns 한 행으로 묶습니다. 이미 저장된 encounter 에 나중에 추가/변경된
+          obs 는 기존 행에 합쳐 갱신합니다 (값이 같으면 existing 으로 집계).
+        - 로컬에 없는 OpenMRS 방문은 최소 정보로 Visit 을 만듭니다. 유형은 visitType 으로 정하고,
+          stopDatetime 이 없으면 진행 중(IN_PROGRESS)으로 두어 코호트 예측 대상이 되게 합니다.
+          진행 중인 로컬 방문이 OpenMRS 에서 종료되었으면 COMPLETED 로 바꿉니다.
+        - DB 쓰기는 호출한 스레드에서만 하며 VITAL_SIGNS_BATCH_SIZE 행씩 bulk_create / bulk_update 하고,
+          둘 다 signal 을 보내지 않으므로 측정값이 바뀐 방문의 통계를 바로 갱신합니다.
+        - created 는 실제로 INSERT 된 행 수입니다 (동시 실행으로 이미 들어간 행은 제외).
+        patients 를 주지 않으면 OpenMRS ID 가 있는 모든 환자를 대상으로 합니다.
+        """
+        if patients is None:
+            patients = Patient.objects.exclude(openmrs_patient_id__isnull=True).exclude(openmrs_patient_id='')
+        patients = list(patients.only('id', 'openmrs_patient_id'))
+        concepts = self.vital_sign_concepts()
+        concurrency = max(1, concurrency or getattr(settings, 'OPENMRS_SYNC_CONCURRENCY', 4))
+        update_fields = sorted(set(concepts.values())) + ['measured_at']
+        
+        stats = {'patients': 0, 'failed_patients': 0, 'obs': 0, 'duplicate_obs': 0,
+                 'created': 0, 'updated': 0, 'existing': 0, 'skipped': 0}
+        pending = []
+        pending_updates = []
+        
+        def flush():
+            if not pending and not pending_updates:
+                return
+            with transaction.atomic():
+                if pending:
+                    # ignore_conflicts 로 건너뛴 행은 created 에 넣지 않도록 INSERT 전후 행 수로 집계
+                    inserted = VitalSigns.objects.filter(
+                        openmrs_encounter_uuid__in=[vital_signs.openmrs_encounter_uuid for vital_signs in pending]
+                    )
+                    before = inserted.count()
+                    VitalSigns.objects.bulk_create(pending, batch_size=VITAL_SIGNS_BATCH_SIZE, ignore_conflicts=True)
+                    stats['created'] += inserted.count() - before
+                if pending_updates:
+                    VitalSigns.objects.bulk_update(pending_updates, update_fields, batch_size=VITAL_SIGNS_BATCH_SIZE)
+                    stats['updated'] += len(pending_updates)
+                refresh_vital_sign_aggregates([vital_signs.visit_id for vital_signs in pending + pending_updates])
+            pending.clear()
+            pending_updates.clear()
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='openmrs-obs') as executor:
+            futures = {
+                executor.submit(self._fetch_vital_sign_obs, patient.openmrs_patient_id, concepts): patient
+                for patient in patients
+            }
+            for future in as_completed(futures):
+                patient = futures[future]
+                try:
+                    obs_list = future.result()
+                except Exception as e:
+                    logger.error(f"환자 관찰 기록 조회 실패 ({patient.openmrs_patient_id}): {str(e)}")
+                    stats['failed_patients'] += 1
+                    continue
+                
+                stats['patients'] += 1
+                stats['obs'] += len(obs_list)
+                new_vital_signs, changed_vital_signs = self._build_vital_signs(patient, obs_list, concepts, stats)
+                pending.extend(new_vital_signs)
+                pending_updates.extend(changed_vital_signs)
+                if len(pending) + len(pending_updates) >= VITAL_SIGNS_BATCH_SIZE:
+                    flush()
+        flush()
+        
+        logger.info(f"활력징후 동기화 완료: {stats}")
+        return {
+            'success': True,
+            'message': f"{stats['created']}건의 활력징후 동기화 완료 (갱신 {stats['updated']}건)",
+            'synced_count': stats['created'] + stats['updated'],
+            'stats': stats
+        }
+    
+    def _fetch_vital_sign_obs(self, patient_uuid, concepts):
+        """환자의 obs 를 페이지 단위로 읽으며 매핑된 개념이고 encounter 가 있는 항목만 반환 (작업 스레드에서 실행)"""
+        params = {'patient': patient_uuid, 'v': OBS_REPRESENTATION}
+        obs_list = []
+        for _, obs in openmrs_client.iter_items('obs', params=params, page_size=OBS_PAGE_SIZE, concurrency=1):
+            concept_uuid = (obs.get('concept') or {}).get('uuid')
+            if concept_uuid in concepts and (obs.get('encounter') or {}).get('uuid'):
+                obs_list.append(obs)
+        return obs_list
+    
+    def _build_vital_signs(self, patient, obs_list, concepts, stats):
+        """한 환자의 obs → (새 VitalSigns 목록, 값이 바뀐 기존 VitalSigns 목록) (저장하지 않음)"""
+        encounters = {}
+        seen_obs = set()
+        for obs in obs_list:
+            if obs.get('uuid') in seen_obs:
+                stats['duplicate_obs'] += 1
+                continue
+            seen_obs.add(obs.get('uuid'))
+            
+            value = self._vital_sign_value(concepts[obs['concept']['uuid']], obs.get('value'))
+            if value is None:
+                stats['skipped'] += 1
+                continue
+            encounter = obs['encounter']
+            group = encounters.setdefault(encounter['uuid'], {'visit': encounter.get('visit') or {}, 'measured_at': None, 'values': {}})
+            group['values'][concepts[obs['concept']['uuid']]] = value
+            obs_datetime = parse_openmrs_datetime(obs.get('obsDatetime'))
+            if obs_datetime and (group['measured_at'] is None or obs_datetime > group['measured_at']):
+                group['measured_at'] = obs_datetime
+        if not encounters:
+            return [], []
+        
+        # 이미 저장된 encounter - 나중에 추가되거나 값이 바뀐 obs 를 기존 행에 합침
+        existing = {
+            vital_signs.openmrs_encounter_uuid: vital_signs
+            for vital_signs in VitalSigns.objects.filter(openmrs_encounter_uuid__in=list(encounters)).only(
+                'id', 'visit_id', 'openmrs_encounter_uuid', 'measured_at', *set(concepts.values())
+            )
+        }
+        changed_vital_signs = []
+        for encounter_uuid, vital_signs in existing.items():
+            group = encounters[encounter_uuid]
+            changed = {field: value for field, value in group['values'].items() if getattr(vital_signs, field) != value}
+            if not changed:
+                stats['existing'] += 1
+                continue
+            for field, value in changed.items():
+                setattr(vital_signs, field, value)
+            if group['measured_at'] and group['measured_at'] > vital_signs.measured_at:
+                vital_signs.measured_at = group['measured_at']
+            changed_vital_signs.append(vital_signs)
+        new_encounters = {uuid: group for uuid, group in encounters.items() if uuid not in existing}
+        # 이미 저장된 encounter 의 방문도 확인해 OpenMRS 에서 종료된 방문을 반영
+        visit_ids = self._resolve_visits(patient, [group['visit'] for group in encounters.values()])
+        
+        vital_signs = []
+        for encounter_uuid, group in new_encounters.items():
+            visit_id = visit_ids.get(group['visit'].get('uuid'))
+            if visit_id is None:
+                stats['skipped'] += 1
+                continue
+            vital_signs.append(VitalSigns(
+                visit_id=visit_id,
+                openmrs_encounter_uuid=encounter_uuid,
+                measured_at=group['measured_at'] or timezone.now(),
+                **group['values']
+            ))
+        return vital_signs, changed_vital_signs
+    
+    def _vital_sign_value(self, field_name, value):
+        """obs 값 → VitalSigns 필드 값 (숫자가 아니면 None)"""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        if VitalSigns._meta.get_field(field_name).get_internal_type() == 'DecimalField':
+            return Decimal(str(round(value, 1)))
+        return int(round(value))
+    
+    def _resolve_visits(self, patient, openmrs_visits):
+        """OpenMRS 방문 UUID → Django Visit id (없는 방문은 최소 정보로 생성, 종료된 방문은 상태 반영)"""
+        openmrs_visits = {visit['uuid']: visit for visit in openmrs_visits if visit.get('uuid')}
+        if not openmrs_visits:
+            return {}
+        local_visits = Visit.objects.filter(openmrs_visit_id__in=list(openmrs_visits)).values_list(
+            'openmrs_visit_id', 'id', 'end_date'
+        )
+        visit_ids = {}
+        for visit_uuid, visit_id, end_date in local_visits:
+            visit_ids[visit_uuid] = visit_id
+            stopped_at = parse_openmrs_datetime(openmrs_visits[visit_uuid].get('stopDatetime'))
+            if stopped_at and end_date is None:
+                Visit.objects.filter(id=visit_id, status='IN_PROGRESS').update(status='COMPLETED', end_date=stopped_at)
+        missing = [visit for visit_uuid, visit in openmrs_visits.items() if visit_uuid not in visit_ids]
+        if missing:
+            Visit.objects.bulk_create([
+                Visit(
+                    openmrs_visit_id=visit['uuid'],
+                    patient_id=patient.id,
+                    visit_number=f"V{visit['uuid'].replace('-', '')[:19]}",
+                    visit_type=self._openmrs_visit_type(visit),
+                    status='COMPLETED' if visit.get('stopDatetime') else 'IN_PROGRESS',
+                    visit_date=parse_openmrs_datetime(visit.get('startDatetime')) or timezone.now(),
+                    end_date=parse_openmrs_datetime(visit.get('stopDatetime')),
+                )
+                for visit in missing
+            ], ignore_conflicts=True)
+            visit_ids.update(Visit.objects.filter(
+                openmrs_visit_id__in=[visit['uuid'] for visit in missing]
+            ).values_list('openmrs_visit_id', 'id'))
+        return visit_ids
+    
     def push_patient_to_openmrs(self, patient):
         """Django 환자를 OpenMRS로 전송"""
         try:
@@ -0,0 +1,119 @@
+# backend/core/pagination.py - 목록 API 공통 키셋(커서) 페이지네이션
+import base64
+import binascii
+import datetime
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# count=approx 일 때 추정치가 이보다 작으면 정확한 count() 로 다시 계산
+APPROX_COUNT_EXACT_BELOW = 1000
+COUNT_MODES = ('exact', 'approx', 'none')
+# 한 페이지 최대 행 수 (limit 은 1 ~ 이 값으로 보정)
+KEYSET_PAGE_MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    """디코딩할 수 없거나 정렬 키 개수가 맞지 않는 커서"""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder 는 datetime 을 밀리초로 자르므로 커서에서는 마이크로초까지 보존
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """정렬 키 값 목록 → 불투명 커서 문자열 (URL-safe base64 JSON)"""
+    payload = json.dumps(values, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, key_count):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    if not isinstance(values, list) or len(values) != key_count:
+        raise InvalidCursor("Invalid cursor: ordering keys do not match")
+    return values
+
+
+def _after_cursor(ordering, values):
+    """(k1, k2, ...) > 커서 값 조건 - 정렬 방향('-' 접두사)을 키마다 반영
+
+    첫 키의 범위 조건(k1 >= v1)을 함께 걸어 인덱스 범위 스캔이 커서 위치에서 시작하도록 합니다.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for key, value in zip(ordering, values):
+        field = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= equal_so_far & Q(**{f"{field}__{lookup}": value})
+        equal_so_far &= Q(**{field: value})
+    first_field = ordering[0].lstrip('-')
+    first_lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+    return Q(**{f"{first_field}__{first_lookup}": values[0]}) & condition
+
+
+def _row_value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=50, offset=0):
+    """커서 다음의 한 페이지 - (rows, next_cursor)
+
+    ordering 은 정렬 키 목록('-' 는 내림차순)이며 마지막 키는 유일해야 합니다 (예: uuid, id).
+    OFFSET 없이 정렬 키 조건으로 이어서 읽으므로 깊은 페이지도 첫 페이지와 비용이 같습니다.
+    .values() queryset 이면 ordering 의 필드도 values 에 포함되어 있어야 합니다.
+    offset 은 기존 startIndex 파라미터 호환용이며 cursor 가 없을 때만 사용합니다.
+    limit 은 1 ~ KEYSET_PAGE_MAX_LIMIT, offset 은 0 이상으로 보정합니다 (?limit=0 등 쿼리 파라미터 그대로 전달 가능).
+    """
+    limit = min(max(int(limit), 1), KEYSET_PAGE_MAX_LIMIT)
+    offset = max(int(offset), 0)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after_cursor(ordering, decode_cursor(cursor, len(ordering))))
+        offset = 0
+
+    rows = list(queryset[offset:offset + limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([_row_value(rows[-1], key.lstrip('-')) for key in ordering])
+
+
+def approximate_count(queryset):
+    """PostgreSQL 실행 계획의 예상 행 수 (작거나 다른 DB 면 정확한 count)"""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        try:
+            sql, params = queryset.values('pk').query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate >= APPROX_COUNT_EXACT_BELOW:
+                return estimate
+        except Exception as e:
+            logger.warning(f"예상 행 수 조회 실패 - 정확한 count 사용: {e}")
+    return queryset.count()
+
+
+def count_rows(queryset, mode):
+    """count 파라미터('exact' | 'approx' | 'none')에 따른 전체 개수 (none 이면 None)"""
+    if mode == 'none':
+        return None
+    if mode == 'approx':
+        return approximate_count(queryset)
+    return queryset.count()
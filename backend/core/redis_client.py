@@ -0,0 +1,57 @@
+# backend/core/redis_client.py - 웹/Celery 워커가 함께 쓰는 Redis 연결과 프로세스 간 잠금
+import threading
+
+import redis
+from django.conf import settings
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+# 잠금을 잡은 토큰일 때만 삭제 / 만료 연장 (다른 프로세스가 다시 잡은 잠금은 건드리지 않음)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_EXTEND_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def get_redis():
+    """settings.REDIS_URL 의 Redis 클라이언트 (프로세스당 하나, 연결 풀 공유)"""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    getattr(settings, 'REDIS_URL', 'redis://redis:6379/0'), decode_responses=True
+                )
+    return _redis_client
+
+
+def acquire_lock(key, token, timeout):
+    """SET NX EX 로 잠금 획득 - 이미 같은 토큰이 잡고 있으면 만료만 연장하고 True"""
+    client = get_redis()
+    if client.set(key, token, nx=True, ex=int(timeout)):
+        return True
+    return extend_lock(key, token, timeout)
+
+
+def extend_lock(key, token, timeout):
+    """이 토큰이 잡은 잠금일 때만 만료 연장"""
+    return bool(get_redis().eval(_EXTEND_SCRIPT, 1, key, token, int(timeout)))
+
+
+def release_lock(key, token):
+    """이 토큰이 잡은 잠금일 때만 해제 (compare-and-delete)"""
+    return bool(get_redis().eval(_RELEASE_SCRIPT, 1, key, token))
+
+
+def lock_owner(key):
+    """잠금을 잡고 있는 토큰 (없으면 None)"""
+    return get_redis().get(key)
@@ -1,6 +1,7 @@
 # backend/medical_cdss/celery.py
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_ready
 from django.conf import settings
 
 # Django 설정 모듈 지정
@@ -28,6 +29,28 @@ app.conf.update(
     result_expires=3600,  # 1시간 후 결과 삭제
 )
 
+# ML 모델 사전 로드 (prefork 부모에서 로드 → 자식과 copy-on-write 공유)
+@worker_init.connect
+def preload_ml_models(**kwargs):
+    if getattr(settings, 'ML_PRELOAD_MODELS', False):
+        from ml_models.worker import preload_models_for_fork
+        preload_models_for_fork()
+
+@worker_process_init.connect
+def report_worker_child_memory(**kwargs):
+    if getattr(settings, 'ML_PRELOAD_MODELS', False):
+        from ml_models.worker import log_child_memory
+        log_child_memory()
+
+# OpenMRS 기준 데이터 캐시 미리 적재 (워커 시작을 막지 않도록 백그라운드 스레드에서)
+# REDIS_CACHE_URL 이 없으면(로컬 메모리 캐시) 이 워커 프로세스 안에서만 쓰이고 웹/다른 워커와는 공유되지 않음
+@worker_ready.connect
+def warm_up_openmrs_reference_cache(**kwargs):
+    if getattr(settings, 'OPENMRS_REFERENCE_WARMUP', True):
+        import threading
+        from core.openmrs_reference import reference_cache
+        threading.Thread(target=reference_cache.warm_up, name='openmrs-reference-warmup', daemon=True).start()
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
@@ -82,6 +82,16 @@ DATABASES = {
     }
 }
 
+# Cache - REDIS_CACHE_URL 을 지정하면 웹/Celery 워커가 함께 쓰는 Redis 캐시 사용 (예측 결과 캐시 등)
+# 지정하지 않으면 Django 기본 캐시(프로세스별 로컬 메모리) 유지
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -184,21 +194,87 @@ OPENMRS_API_BASE_URL = f"{OPENMRS_BASE_URL}/ws/rest/v1"
 OPENMRS_USERNAME = os.getenv('OPENMRS_USERNAME', 'admin')
 OPENMRS_PASSWORD = os.getenv('OPENMRS_PASSWORD', 'Admin123')
 
+# OpenMRS HTTP 클라이언트 (core/openmrs_client.py) - 연결 풀 크기, 타임아웃(초), GET 재시도
+OPENMRS_HTTP_POOL_SIZE = int(os.getenv('OPENMRS_HTTP_POOL_SIZE', '10'))
+OPENMRS_CONNECT_TIMEOUT = float(os.getenv('OPENMRS_CONNECT_TIMEOUT', '5'))
+OPENMRS_READ_TIMEOUT = float(os.getenv('OPENMRS_READ_TIMEOUT', '30'))
+OPENMRS_MAX_RETRIES = int(os.getenv('OPENMRS_MAX_RETRIES', '3'))
+OPENMRS_RETRY_BACKOFF = float(os.getenv('OPENMRS_RETRY_BACKOFF', '0.5'))
+# 비동기 클라이언트 (core/openmrs_async.py) - 이벤트 루프별 연결 풀 크기, 동시에 보내는 최대 요청 수
+OPENMRS_ASYNC_POOL_SIZE = int(os.getenv('OPENMRS_ASYNC_POOL_SIZE', '100'))
+OPENMRS_ASYNC_MAX_IN_FLIGHT = int(os.getenv('OPENMRS_ASYNC_MAX_IN_FLIGHT', '200'))
+# 동기화 시 동시에 요청할 페이지 수 (OPENMRS_HTTP_POOL_SIZE 이하로 설정)
+OPENMRS_SYNC_CONCURRENCY = int(os.getenv('OPENMRS_SYNC_CONCURRENCY', '4'))
+# sync-and-list 요청 시 마지막 성공 동기화가 이 시간(초) 이내면 새 동기화를 건너뜀
+OPENMRS_SYNC_DEBOUNCE_SECONDS = int(os.getenv('OPENMRS_SYNC_DEBOUNCE_SECONDS', '300'))
+# 검색어별 동기화 잠금 만료 시간(초) - 워커가 죽어도 이 시간 후 다시 동기화 가능
+OPENMRS_SYNC_LOCK_TIMEOUT = int(os.getenv('OPENMRS_SYNC_LOCK_TIMEOUT', '900'))
+# Celery Beat 정기 동기화 (검색어, 페이지 크기, 최대 환자 수, 주기(초))
+OPENMRS_SCHEDULED_SYNC_QUERY = os.getenv('OPENMRS_SCHEDULED_SYNC_QUERY', '1000')
+OPENMRS_SCHEDULED_SYNC_PAGE_SIZE = int(os.getenv('OPENMRS_SCHEDULED_SYNC_PAGE_SIZE', '100'))
+OPENMRS_SCHEDULED_SYNC_MAX = int(os.getenv('OPENMRS_SCHEDULED_SYNC_MAX', '100000'))
+OPENMRS_SCHEDULED_SYNC_INTERVAL = float(os.getenv('OPENMRS_SCHEDULED_SYNC_INTERVAL', '3600'))
+
+# OpenMRS 기준 데이터 캐시 (core/openmrs_reference.py) - 리소스별 TTL(초), 워커 시작 시 미리 적재 여부
+OPENMRS_REFERENCE_CACHE_TTL = {
+    'concept': int(os.getenv('OPENMRS_CONCEPT_CACHE_TTL', '86400')),
+    'location': int(os.getenv('OPENMRS_LOCATION_CACHE_TTL', '3600')),
+    'provider': int(os.getenv('OPENMRS_PROVIDER_CACHE_TTL', '900')),
+    'visittype': int(os.getenv('OPENMRS_VISIT_TYPE_CACHE_TTL', '86400')),
+}
+OPENMRS_REFERENCE_WARMUP = os.getenv('OPENMRS_REFERENCE_WARMUP', 'true').lower() == 'true'
+# 생성 요청 기본 UUID - 비워 두면 이름으로 조회하고, 없으면 표준 데모 데이터 UUID 사용
+DEFAULT_OPENMRS_IDENTIFIER_TYPE_UUID = os.getenv('DEFAULT_OPENMRS_IDENTIFIER_TYPE_UUID') or None
+DEFAULT_OPENMRS_LOCATION_UUID = os.getenv('DEFAULT_OPENMRS_LOCATION_UUID') or None
+DEFAULT_OPENMRS_VISIT_TYPE_UUID = os.getenv('DEFAULT_OPENMRS_VISIT_TYPE_UUID') or None
+OPENMRS_PHONE_ATTRIBUTE_TYPE_UUID = os.getenv('OPENMRS_PHONE_ATTRIBUTE_TYPE_UUID') or None
+
 # Celery 설정 - Docker 환경용
-CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
-CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Seoul'
 CELERY_ENABLE_UTC = True
 
+# ML 모델 설정
+# True 이면 Celery 워커 부모 프로세스가 fork 전에 모든 모델을 로드 (ml_predictions 워커 전용)
+ML_PRELOAD_MODELS = os.getenv('ML_PRELOAD_MODELS', 'False').lower() == 'true'
+# True 이면 convert_models_to_mmap 으로 만든 .joblib 아티팩트를 메모리 맵(mmap_mode='r')으로 로드
+ML_MODEL_MMAP = os.getenv('ML_MODEL_MMAP', 'True').lower() == 'true'
+# 모델 파일이 없거나 로드에 실패한 경우 다시 시도하기까지의 간격(초) - 모델 파일이 바뀌면 바로 재시도
+ML_MODEL_RETRY_INTERVAL = float(os.getenv('ML_MODEL_RETRY_INTERVAL', '60'))
+# 예측 결과 캐시 유지 시간(초), 0 이면 캐시 사용 안 함
+ML_PREDICTION_CACHE_TTL = int(os.getenv('ML_PREDICTION_CACHE_TTL', '300'))
+# 동기 모드(?mode=sync) 허용 여부 - 켜면 웹 프로세스도 모델을 로드함 (기본값: 꺼짐, 비동기 태스크로 처리)
+ML_SYNC_PREDICTION_ENABLED = os.getenv('ML_SYNC_PREDICTION_ENABLED', 'False').lower() == 'true'
+# 동기 모드 예측 시간 예산(초), ?timeout= 으로 요청할 수 있는 최대값, 웹 프로세스당 예측 스레드 수
+ML_SYNC_TIMEOUT = float(os.getenv('ML_SYNC_TIMEOUT', '2.0'))
+ML_SYNC_MAX_TIMEOUT = float(os.getenv('ML_SYNC_MAX_TIMEOUT', '10.0'))
+ML_SYNC_MAX_WORKERS = int(os.getenv('ML_SYNC_MAX_WORKERS', '4'))
+# 작업 완료 대기(tasks/wait/) 최대 대기 시간(초)과 한 번에 기다릴 수 있는 작업 수
+ML_TASK_WAIT_TIMEOUT = float(os.getenv('ML_TASK_WAIT_TIMEOUT', '25'))
+ML_TASK_WAIT_MAX_IDS = int(os.getenv('ML_TASK_WAIT_MAX_IDS', '50'))
+# 코호트 일괄 예측 시 청크 태스크 하나가 처리할 환자 수
+ML_COHORT_CHUNK_SIZE = int(os.getenv('ML_COHORT_CHUNK_SIZE', '200'))
+# 환자별 작업 목록 한 페이지 최대 크기
+ML_TASK_LIST_MAX_LIMIT = int(os.getenv('ML_TASK_LIST_MAX_LIMIT', '200'))
+
 # Celery 태스크 라우팅
 CELERY_TASK_ROUTES = {
     'ml_models.tasks.predict_complications_task': {'queue': 'ml_predictions'},
     'ml_models.tasks.predict_stroke_mortality_task': {'queue': 'ml_predictions'},
     'ml_models.tasks.assess_sod2_status_task': {'queue': 'ml_predictions'},
+    'ml_models.tasks.persist_prediction_result_task': {'queue': 'ml_predictions'},
+    'ml_models.tasks.score_cohort_task': {'queue': 'ml_predictions'},
+    'ml_models.tasks.score_cohort_chunk_task': {'queue': 'ml_predictions'},
+    'ml_models.tasks.report_worker_memory_task': {'queue': 'ml_predictions'},
     'ml_models.tasks.cleanup_old_tasks': {'queue': 'maintenance'},
+    'openmrs_integration.tasks.sync_openmrs_patients_task': {'queue': 'openmrs_sync'},
+    'openmrs_integration.tasks.scheduled_openmrs_patient_sync_task': {'queue': 'openmrs_sync'},
+    'openmrs_integration.tasks.ingest_openmrs_vital_signs_task': {'queue': 'openmrs_sync'},
 }
 
 # Celery Beat 스케줄 (정기 작업)
@@ -207,6 +283,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'ml_models.tasks.cleanup_old_tasks',
         'schedule': 86400.0,  # 24시간마다 실행
     },
+    'sync-openmrs-patients': {
+        'task': 'openmrs_integration.tasks.scheduled_openmrs_patient_sync_task',
+        'schedule': OPENMRS_SCHEDULED_SYNC_INTERVAL,  # 기본 1시간마다 실행 (실패/중단 시 커서부터 재개)
+    },
 }
 
 # 로깅 설정 (디버깅용)
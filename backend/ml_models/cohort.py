@@ -0,0 +1,100 @@
+# backend/ml_models/cohort.py - 병동/방문 목록 단위 일괄 예측용 코호트 선택 및 입력 구성
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from patients.models import Patient, Visit, VitalSigns
+from patients.vital_stats import get_visit_vital_sign_stats
+
+# 진행 중인 방문으로 보는 상태
+OPEN_VISIT_STATUSES = ['IN_PROGRESS']
+
+# VitalSigns 필드 → ml_service patient_data['vital_signs'] 키
+VITAL_SIGN_FIELDS = [
+    'heart_rate',
+    'systolic_bp',
+    'diastolic_bp',
+    'temperature',
+    'respiratory_rate',
+    'oxygen_saturation',
+]
+
+
+def select_cohort(department: Optional[str] = None, inpatient_only: bool = True,
+                  patient_ids: Optional[List[int]] = None) -> List[Dict[str, Optional[int]]]:
+    """예측 대상 코호트 선택 - [{'patient_id', 'visit_id'}, ...]
+
+    진행 중인 방문(종료되지 않은 IN_PROGRESS)을 진료과/입원 여부/환자 ID 로 거르고,
+    환자마다 가장 최근 방문 하나만 사용합니다. patient_ids 로 지정했지만 진행 중인
+    방문이 없는 환자는 visit_id=None 으로 포함합니다.
+    """
+    visits = Visit.objects.filter(status__in=OPEN_VISIT_STATUSES, end_date__isnull=True)
+    if inpatient_only:
+        visits = visits.filter(visit_type='INPATIENT')
+    if department:
+        visits = visits.filter(department=department)
+    if patient_ids:
+        visits = visits.filter(patient_id__in=patient_ids)
+
+    members = {}
+    for patient_id, visit_id in visits.order_by('patient_id', '-visit_date').values_list('patient_id', 'id'):
+        members.setdefault(patient_id, visit_id)
+
+    if patient_ids:
+        existing = Patient.objects.filter(id__in=patient_ids).values_list('id', flat=True)
+        for patient_id in existing:
+            members.setdefault(patient_id, None)
+
+    return [{'patient_id': patient_id, 'visit_id': visit_id} for patient_id, visit_id in sorted(members.items())]
+
+
+def _latest_vital_signs(visit_ids: List[int]):
+    """방문별 가장 최근 활력징후 한 행씩만 조회 (방문의 전체 측정 이력은 읽지 않음)"""
+    vitals = VitalSigns.objects.filter(visit_id__in=visit_ids)
+    if connection.vendor == 'postgresql':
+        # DISTINCT ON (visit_id) - 정렬 기준 첫 행(가장 최근 측정)만 남김
+        vitals = vitals.order_by('visit_id', '-measured_at', '-id').distinct('visit_id')
+    else:
+        latest_id = VitalSigns.objects.filter(visit_id=OuterRef('visit_id')).order_by('-measured_at', '-id').values('id')[:1]
+        vitals = vitals.filter(id=Subquery(latest_id)).order_by()
+    return vitals.values('visit_id', *VITAL_SIGN_FIELDS)
+
+
+def build_cohort_patient_data(members: List[Dict[str, Optional[int]]]) -> List[Dict]:
+    """코호트 멤버들의 예측 입력(patient_data)을 쿼리 3회로 구성
+
+    환자 기본 정보는 한 번에 조회하고, 활력징후는 방문별 가장 최근 측정값(vital_signs)과
+    저장된 방문별 통계(vital_sign_stats, VitalSignsAggregate)를 사용합니다.
+    반환 리스트는 members 와 같은 순서이며, 그 사이 삭제된 환자 자리는 None 입니다.
+    """
+    patients = Patient.objects.only('id', 'birth_date', 'gender').in_bulk(
+        [member['patient_id'] for member in members]
+    )
+
+    latest_vitals = {}
+    vital_stats = {}
+    visit_ids = [member['visit_id'] for member in members if member['visit_id']]
+    if visit_ids:
+        vital_stats = get_visit_vital_sign_stats(visit_ids)
+        latest_vitals = {row['visit_id']: row for row in _latest_vital_signs(visit_ids)}
+
+    today = date.today()
+    patients_data = []
+    for member in members:
+        patient = patients.get(member['patient_id'])
+        if patient is None:
+            patients_data.append(None)
+            continue
+        vitals = latest_vitals.get(member['visit_id'], {})
+        patients_data.append({
+            'age': today.year - patient.birth_date.year
+                   - ((today.month, today.day) < (patient.birth_date.month, patient.birth_date.day)),
+            'gender': patient.gender,
+            'vital_signs': {
+                field: float(vitals[field]) for field in VITAL_SIGN_FIELDS if vitals.get(field) is not None
+            },
+            'vital_sign_stats': vital_stats.get(member['visit_id'], {}),
+        })
+    return patients_data
@@ -0,0 +1,36 @@
+# backend/ml_models/feature_layout.py
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Tuple
+
+
+class FeatureLayout:
+    """feature_columns.json 순서를 고정한 피처 벡터 레이아웃
+
+    컬럼명 → 인덱스 맵을 한 번만 만들어 두고, 예측마다 미리 할당한
+    float32 배열(단건은 1 x F, 배치는 N x F)에 값을 채웁니다.
+    """
+
+    dtype = np.float32
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns: List[str] = list(columns)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def empty(self, n_rows: int = 1) -> np.ndarray:
+        """0으로 초기화된 (n_rows, F) 피처 행렬"""
+        return np.zeros((n_rows, len(self.columns)), dtype=self.dtype)
+
+    def resolve(self, names: Dict[str, str]) -> List[Tuple[str, int]]:
+        """{입력 키: 피처명} 매핑 중 레이아웃에 있는 피처만 (입력 키, 인덱스)로 변환"""
+        return [(key, self.index[name]) for key, name in names.items() if name in self.index]
+
+    def to_frame(self, matrix: np.ndarray) -> pd.DataFrame:
+        """컬럼명이 필요한 전처리기/모델용 DataFrame 래핑 (복사 없음)"""
+        return pd.DataFrame(matrix, columns=self.columns, copy=False)
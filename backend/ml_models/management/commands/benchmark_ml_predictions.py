@@ -0,0 +1,104 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ml_models.ml_service import ml_service, COMPLICATION_TYPES
+
+
+class Command(BaseCommand):
+    help = '합병증 예측 단건/일괄(batch) 경로의 환자당 지연시간을 비교합니다 (예측 결과 캐시 미사용)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 10, 100, 1000],
+            help='측정할 배치 크기 목록 (기본값: 1 10 100 1000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='배치 크기별 반복 측정 횟수 (최소값 사용, 기본값: 3)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='합성 환자 데이터 난수 시드',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('합병증 모델을 로드합니다...')
+        ml_service._load_complication_models()
+
+        loaded = [comp for comp in COMPLICATION_TYPES if ml_service.registry.get(comp) is not None]
+        if not loaded:
+            self.stdout.write(self.style.ERROR('❌ 로드된 합병증 모델이 없습니다. saved_models 디렉터리를 확인하세요.'))
+            return
+        self.stdout.write(f"대상 모델: {', '.join(loaded)}")
+
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f"{'batch':>6} | {'single ms/pt':>12} | {'batch ms/pt':>11} | {'speedup':>7} | match")
+
+        for size in options['sizes']:
+            patients_data = [self._synthetic_patient(rng) for _ in range(size)]
+
+            # 예측 결과 캐시를 거치면 앞선 측정이 채운 결과를 읽기만 하므로 캐시 없는 구현을 직접 호출
+            single_time = self._best_of(options['repeat'], lambda: [
+                ml_service._predict_complications(patient_data) for patient_data in patients_data
+            ])
+            batch_time = self._best_of(options['repeat'], lambda: ml_service._predict_complications_batch(patients_data))
+
+            single_results = [ml_service._predict_complications(patient_data) for patient_data in patients_data]
+            batch_results = ml_service._predict_complications_batch(patients_data)
+            matches = all(
+                np.isclose(single[comp]['probability'], batch[comp]['probability'])
+                for single, batch in zip(single_results, batch_results)
+                for comp in loaded
+            )
+
+            single_ms = single_time / size * 1000
+            batch_ms = batch_time / size * 1000
+            self.stdout.write(
+                f"{size:>6} | {single_ms:>12.3f} | {batch_ms:>11.3f} | {single_ms / batch_ms:>6.1f}x | "
+                + ('✅' if matches else '❌')
+            )
+
+    def _best_of(self, repeat, func):
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def _synthetic_patient(self, rng):
+        """벤치마크용 합성 환자 입력 (프론트엔드 patient_data 형식)"""
+        return {
+            'age': int(rng.integers(40, 90)),
+            'gender': 'M' if rng.random() < 0.5 else 'F',
+            'vital_signs': {
+                'heart_rate': float(rng.normal(80, 12)),
+                'systolic_bp': float(rng.normal(135, 18)),
+                'diastolic_bp': float(rng.normal(80, 10)),
+                'temperature': float(rng.normal(36.8, 0.5)),
+                'respiratory_rate': float(rng.normal(18, 3)),
+                'oxygen_saturation': float(rng.normal(96, 2)),
+            },
+            'lab_results': {
+                'wbc': float(rng.normal(8, 2.5)),
+                'hemoglobin': float(rng.normal(13, 1.5)),
+                'creatinine': float(rng.normal(1.0, 0.3)),
+                'bun': float(rng.normal(18, 6)),
+            },
+            'complications': {
+                'sepsis': bool(rng.random() < 0.1),
+            },
+            'medications': {
+                'antiplatelet_flag': bool(rng.random() < 0.6),
+                'statin_flag': bool(rng.random() < 0.5),
+            },
+        }
@@ -0,0 +1,61 @@
+import os
+
+import joblib
+from django.core.management.base import BaseCommand
+
+from ml_models.ml_service import ml_service
+from ml_models.model_registry import mmap_artifact_name
+
+
+class Command(BaseCommand):
+    help = 'saved_models 의 pkl 아티팩트를 메모리 맵(mmap_mode=\'r\')으로 열 수 있는 joblib 형식으로 변환합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            help='변환할 모델 이름 (기본값: 레지스트리의 모든 모델)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='이미 최신 .joblib 파일이 있어도 다시 변환',
+        )
+
+    def handle(self, *args, **options):
+        registry = ml_service.registry
+        names = options['models'] or list(registry.artifacts)
+
+        converted = 0
+        for name in names:
+            files = registry.artifacts.get(name)
+            if files is None:
+                self.stdout.write(self.style.ERROR(f"❌ 알 수 없는 모델: {name}"))
+                continue
+
+            for filename in files.values():
+                source = os.path.join(registry.model_path, filename)
+                target = os.path.join(registry.model_path, mmap_artifact_name(filename))
+                if not os.path.exists(source):
+                    continue
+                if not options['force'] and os.path.exists(target) \
+                        and os.path.getmtime(target) >= os.path.getmtime(source):
+                    self.stdout.write(f"건너뜀 (최신): {os.path.basename(target)}")
+                    continue
+
+                try:
+                    # 압축하지 않고 저장해야 NumPy 배열을 mmap 으로 열 수 있음
+                    joblib.dump(joblib.load(source), target)
+                    joblib.load(target, mmap_mode='r')
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"❌ {filename} 변환 실패: {str(e)}"))
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+
+                converted += 1
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {filename} → {os.path.basename(target)} ({os.path.getsize(target) / 1024:.1f}KB)"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"변환 완료: {converted}개 파일"))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_models', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='predictiontask',
+            index=models.Index(fields=['patient', '-created_at', '-id'], name='ml_task_patient_created_idx'),
+        ),
+    ]
@@ -1,11 +1,13 @@
 # backend/ml_models/ml_service.py - 실제 모델 파일들 기반
 import os
-import pickle
+import hashlib
 import numpy as np
 import json
 import pandas as pd
 from django.conf import settings
 from django.core.cache import cache
+from .feature_layout import FeatureLayout
+from .model_registry import ModelRegistry
 import logging
 from typing import Dict, List, Tuple, Any
 import time
@@ -13,15 +15,101 @@ from datetime import datetime, date, timedelta
 
 logger = logging.getLogger(__name__)
 
+# 예측 결과 캐시 키 접두사
+PREDICTION_CACHE_PREFIX = 'ml_prediction'
+
+# 합병증 예측 모델 목록 (saved_models/{name}_final_model.pkl)
+COMPLICATION_TYPES = ['pneumonia', 'acute_kidney_injury', 'heart_failure']
+
+# 입력 키 → 피처명 매핑 (단일 측정값은 *_mean 피처에 기록)
+VITAL_SIGN_FEATURES = {
+    'heart_rate': 'heart_rate_mean',
+    'systolic_bp': 'systolic_bp_mean', 
+    'diastolic_bp': 'diastolic_bp_mean',
+    'temperature': 'temperature_mean',
+    'respiratory_rate': 'respiratory_rate_mean',
+    'oxygen_saturation': 'spo2_mean'
+}
+
+# 방문/기간 통계 입력(patient_data['vital_sign_stats']) 항목 → 피처명 접두사 ({접두사}_{통계})
+VITAL_SIGN_STAT_FEATURES = {
+    'heart_rate': 'heart_rate',
+    'systolic_bp': 'systolic_bp',
+    'diastolic_bp': 'diastolic_bp',
+    'mean_bp': 'mean_bp',
+    'temperature': 'temperature',
+    'respiratory_rate': 'respiratory_rate',
+    'oxygen_saturation': 'spo2',
+    'weight': 'weight',
+}
+VITAL_SIGN_STATS = ['mean', 'std', 'min', 'max', 'count', 'first', 'last']
+
+LAB_RESULT_FEATURES = {
+    'wbc': 'wbc_mean',
+    'hemoglobin': 'hemoglobin_mean',
+    'creatinine': 'creatinine_mean',
+    'bun': 'bun_mean',
+    'glucose': 'glucose_mean',
+    'sodium': 'sodium_mean',
+    'potassium': 'potassium_mean'
+}
+
+COMPLICATION_FLAGS = [
+    'sepsis', 'respiratory_failure', 'deep_vein_thrombosis',
+    'pulmonary_embolism', 'urinary_tract_infection', 'gastrointestinal_bleeding'
+]
+
+MEDICATION_FLAGS = [
+    'anticoagulant_flag', 'antiplatelet_flag', 'thrombolytic_flag',
+    'antihypertensive_flag', 'statin_flag', 'antibiotic_flag', 'vasopressor_flag'
+]
+
+DEFAULT_FEATURE_COLUMNS = [
+    'GENDER', 'AGE',
+    # 활력징후 관련 (심박수, 혈압, 체온 등의 통계값들)
+    'heart_rate_mean', 'heart_rate_std', 'heart_rate_min', 'heart_rate_max', 'heart_rate_count',
+    'heart_rate_first', 'heart_rate_last',
+    'systolic_bp_mean', 'systolic_bp_std', 'systolic_bp_min', 'systolic_bp_max', 'systolic_bp_count',
+    'systolic_bp_first', 'systolic_bp_last',
+    'diastolic_bp_mean', 'diastolic_bp_std', 'diastolic_bp_min', 'diastolic_bp_max', 'diastolic_bp_count',
+    'diastolic_bp_first', 'diastolic_bp_last',
+    'mean_bp_mean', 'mean_bp_std', 'mean_bp_min', 'mean_bp_max', 'mean_bp_count',
+    'mean_bp_first', 'mean_bp_last',
+    'temperature_mean', 'temperature_std', 'temperature_min', 'temperature_max', 'temperature_count',
+    'temperature_first', 'temperature_last',
+    'respiratory_rate_mean', 'respiratory_rate_std', 'respiratory_rate_min', 'respiratory_rate_max',
+    'respiratory_rate_count', 'respiratory_rate_first', 'respiratory_rate_last',
+    'spo2_mean', 'spo2_std', 'spo2_min', 'spo2_max', 'spo2_count', 'spo2_first', 'spo2_last',
+    # ... (실제로는 183개 모든 피처)
+    # 검사 결과들
+    'wbc_mean', 'wbc_first', 'wbc_last', 'wbc_trend', 'wbc_count',
+    'hemoglobin_mean', 'hemoglobin_first', 'hemoglobin_last', 'hemoglobin_trend', 'hemoglobin_count',
+    'creatinine_mean', 'creatinine_first', 'creatinine_last', 'creatinine_trend', 'creatinine_count',
+    'bun_mean', 'bun_first', 'bun_last', 'bun_trend', 'bun_count',
+    # 합병증 플래그들
+    'sepsis', 'respiratory_failure', 'deep_vein_thrombosis', 'pulmonary_embolism',
+    'urinary_tract_infection', 'gastrointestinal_bleeding',
+    # 약물 플래그들  
+    'anticoagulant_flag', 'antiplatelet_flag', 'thrombolytic_flag',
+    'antihypertensive_flag', 'statin_flag', 'antibiotic_flag', 'vasopressor_flag'
+]
+
+
 class MLModelService:
     """머신러닝 모델 서비스 - 실제 pkl 파일 기반"""
     
     def __init__(self):
-        self.models: Dict[str, Any] = {}
-        self.preprocessors: Dict[str, Any] = {}
-        self.metadata: Dict[str, Any] = {}
         self.feature_columns: List[str] = []
+        self._feature_layout = None
+        self._feature_layout_source = None
+        self._feature_slots: Dict[str, List[Tuple[str, int]]] = {}
         self.model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'saved_models')
+        self.registry = ModelRegistry(
+            self.model_path,
+            use_mmap=getattr(settings, 'ML_MODEL_MMAP', True),
+            retry_interval=getattr(settings, 'ML_MODEL_RETRY_INTERVAL', 60.0)
+        )
+        self.prediction_cache_ttl = getattr(settings, 'ML_PREDICTION_CACHE_TTL', 300)
 
         # 1) JSON 파일에서 피처 컬럼 목록 로드
         json_path = os.path.join(
@@ -38,83 +126,137 @@ class MLModelService:
         self._load_models()
 
     def _load_models(self):
-        try:
-        # 오류가 발생해도 Django 시작을 막지 않도록 수정
-            logger.info("ML 모델 로드를 시도합니다...")
-        # self._load_complication_models()  # 임시 주석 처리
-        # self._load_mortality_model()      # 임시 주석 처리
-            logger.info("ML 모델 로드를 건너뛰었습니다. (개발 중)")
-        except Exception as e:
-            logger.warning(f"ML 모델 로드 실패 (무시됨): {e}")
+        """모델은 처음 사용할 때 ModelRegistry 가 로드 (웹 프로세스 기동 시에는 로드하지 않음)"""
+        logger.info("ML 모델은 첫 예측 요청 시 로드됩니다. (지연 로딩)")
     
     def _load_complication_models(self):
-        """합병증 예측 모델들 로드"""
-        complications = ['pneumonia', 'acute_kidney_injury', 'heart_failure']
-        
-        for comp in complications:
-            try:
-                # 메타데이터 로드
-                metadata_path = os.path.join(self.model_path, f'{comp}_metadata.pkl')
-                if os.path.exists(metadata_path):
-                    with open(metadata_path, 'rb') as f:
-                        self.metadata[comp] = pickle.load(f)
-                
-                # 전처리기 로드  
-                preprocessor_path = os.path.join(self.model_path, f'{comp}_preprocessors.pkl')
-                if os.path.exists(preprocessor_path):
-                    with open(preprocessor_path, 'rb') as f:
-                        self.preprocessors[comp] = pickle.load(f)
-                
-                # 모델 로드
-                model_path = os.path.join(self.model_path, f'{comp}_final_model.pkl')
-                if os.path.exists(model_path):
-                    with open(model_path, 'rb') as f:
-                        self.models[comp] = pickle.load(f)
-                
-                logger.info(f"{comp} 합병증 모델 로드 완료")
-                
-            except Exception as e:
-                logger.error(f"{comp} 모델 로드 실패: {str(e)}")
+        """합병증 예측 모델들 미리 로드"""
+        return self.registry.preload(COMPLICATION_TYPES)
     
     def _load_mortality_model(self):
-        """사망률 예측 모델 로드"""
+        """사망률 예측 모델 미리 로드"""
+        return self.registry.preload(['stroke_mortality'])
+    
+    # ================================
+    # 예측 API (결과 캐시 적용)
+    # ================================
+    def predict_complications(self, patient_data: Dict) -> Dict[str, Any]:
+        """합병증 예측 (동일 입력 + 동일 모델 버전이면 캐시된 결과 반환)"""
+        return self._cached_prediction('complications', patient_data, self._predict_complications)
+    
+    def predict_complications_batch(self, patients_data: List[Dict]) -> List[Dict[str, Any]]:
+        """합병증 일괄 예측 - 캐시에 없는 환자만 모아서 한 번에 추론"""
+        return self._cached_prediction_batch('complications', patients_data, self._predict_complications_batch)
+    
+    def predict_stroke_mortality(self, patient_data: Dict) -> Dict[str, Any]:
+        """뇌졸중 사망률 예측 (결과 캐시 적용)"""
+        return self._cached_prediction('mortality', patient_data, self._predict_stroke_mortality)
+    
+    def predict_stroke_mortality_batch(self, patients_data: List[Dict]) -> List[Dict[str, Any]]:
+        """뇌졸중 사망률 일괄 예측 - 캐시에 없는 환자만 모아서 한 번에 추론"""
+        return self._cached_prediction_batch('mortality', patients_data, self._predict_stroke_mortality_batch)
+    
+    def assess_sod2_status(self, patient_data: Dict) -> Dict[str, Any]:
+        """SOD2 항산화 평가 (결과 캐시 적용)"""
+        return self._cached_prediction('sod2', patient_data, self._assess_sod2_status)
+    
+    def _cached_prediction(self, kind: str, patient_data: Dict, predict) -> Dict[str, Any]:
+        start_time = time.time()
+        key = self._prediction_cache_key(kind, patient_data)
+        result = self._cache_get_many([key]).get(key)
+        if result is not None:
+            return self._from_cache(result, time.time() - start_time, datetime.now().isoformat())
+        result = predict(patient_data)
+        if self._is_cacheable(result):
+            self._cache_set_many({key: result})
+        return result
+    
+    def _cached_prediction_batch(self, kind: str, patients_data: List[Dict], predict_batch) -> List[Dict[str, Any]]:
+        if not patients_data:
+            return []
+        
+        start_time = time.time()
+        keys = [self._prediction_cache_key(kind, patient_data) for patient_data in patients_data]
+        cached = self._cache_get_many(keys)
+        lookup_time = (time.time() - start_time) / len(keys)
+        timestamp = datetime.now().isoformat()
+        batch_results = [
+            self._from_cache(cached[key], lookup_time, timestamp) if key in cached else None
+            for key in keys
+        ]
+        
+        missing = [i for i, result in enumerate(batch_results) if result is None]
+        if missing:
+            computed = predict_batch([patients_data[i] for i in missing])
+            for i, result in zip(missing, computed):
+                batch_results[i] = result
+            self._cache_set_many({
+                keys[i]: batch_results[i] for i in missing if self._is_cacheable(batch_results[i])
+            })
+        
+        return batch_results
+    
+    def _prediction_cache_key(self, kind: str, patient_data: Dict) -> str:
+        """정규화된 입력 + 사용 모델 버전의 해시 (모델 파일이 바뀌어 다시 로드되면 키도 바뀜)"""
+        if kind == 'complications':
+            versions = [f"{name}@{self.registry.version(name)}" for name in COMPLICATION_TYPES]
+        elif kind == 'mortality':
+            versions = [f"stroke_mortality@{self.registry.version('stroke_mortality')}"]
+        else:
+            # SOD2 평가는 규칙 기반이지만 stroke_date 로부터 경과 시간을 오늘 날짜 기준으로 계산함
+            versions = [f"sod2@{date.today().isoformat()}"]
+        
+        payload = json.dumps(
+            {'versions': versions, 'input': patient_data},
+            sort_keys=True, separators=(',', ':'), default=str
+        )
+        return f"{PREDICTION_CACHE_PREFIX}:{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+    
+    def _from_cache(self, result: Dict[str, Any], processing_time: float, timestamp: str) -> Dict[str, Any]:
+        """캐시 적중 결과의 processing_time/timestamp 를 이번 요청 기준으로 교체 (저장 당시 값을 돌려주지 않음)"""
+        result = dict(result)
+        if 'processing_time' in result:
+            result['processing_time'] = processing_time
+        if 'timestamp' in result:
+            result['timestamp'] = timestamp
+        return result
+    
+    def _is_cacheable(self, result: Dict[str, Any]) -> bool:
+        """오류가 포함된 결과는 캐시하지 않음"""
+        if 'error' in result:
+            return False
+        return not any(isinstance(value, dict) and 'error' in value for value in result.values())
+    
+    def _cache_get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if self.prediction_cache_ttl <= 0:
+            return {}
         try:
-            # stroke_mortality_30day.pkl 모델 로드
-            mortality_model_path = os.path.join(self.model_path, 'stroke_mortality_30day.pkl')
-            if os.path.exists(mortality_model_path):
-                with open(mortality_model_path, 'rb') as f:
-                    self.models['stroke_mortality'] = pickle.load(f)
-                
-                # 메타데이터가 별도 파일로 있는 경우
-                mortality_metadata_path = os.path.join(self.model_path, 'stroke_mortality_metadata.pkl')
-                if os.path.exists(mortality_metadata_path):
-                    with open(mortality_metadata_path, 'rb') as f:
-                        self.metadata['stroke_mortality'] = pickle.load(f)
-                
-                # 전처리기가 별도 파일로 있는 경우
-                mortality_preprocessor_path = os.path.join(self.model_path, 'stroke_mortality_preprocessors.pkl')
-                if os.path.exists(mortality_preprocessor_path):
-                    with open(mortality_preprocessor_path, 'rb') as f:
-                        self.preprocessors['stroke_mortality'] = pickle.load(f)
-                
-                logger.info("뇌졸중 사망률 예측 모델 로드 완료")
-            
+            return cache.get_many(keys)
         except Exception as e:
-            logger.error(f"사망률 모델 로드 실패: {str(e)}")
+            logger.warning(f"예측 캐시 조회 실패 (무시됨): {e}")
+            return {}
     
-    def predict_complications(self, patient_data: Dict) -> Dict[str, Any]:
+    def _cache_set_many(self, entries: Dict[str, Any]):
+        if self.prediction_cache_ttl <= 0 or not entries:
+            return
+        try:
+            cache.set_many(entries, timeout=self.prediction_cache_ttl)
+        except Exception as e:
+            logger.warning(f"예측 캐시 저장 실패 (무시됨): {e}")
+    
+    def _predict_complications(self, patient_data: Dict) -> Dict[str, Any]:
         """합병증 예측 - 실제 모델 사용"""
         start_time = time.time()
         results = {}
         
         try:
             # 입력 데이터 전처리 (183개 피처)
-            features_df = self._prepare_features(patient_data)
+            features = self._build_feature_matrix([patient_data])
             
             # 각 합병증 모델로 예측
-            for complication in ['pneumonia', 'acute_kidney_injury', 'heart_failure']:
-                if complication in self.models:
-                    result = self._predict_single_complication(features_df, complication)
+            for complication in COMPLICATION_TYPES:
+                if self.registry.get(complication) is not None:
+                    result = self._predict_single_complication(features, complication)
                     results[complication] = result
             
             processing_time = time.time() - start_time
@@ -127,68 +269,128 @@ class MLModelService:
             logger.error(f"합병증 예측 중 오류: {str(e)}")
             return {'error': str(e)}
     
-    def predict_stroke_mortality(self, patient_data: Dict) -> Dict[str, Any]:
+    def _predict_complications_batch(self, patients_data: List[Dict]) -> List[Dict[str, Any]]:
+        """합병증 일괄 예측 - 환자 N명을 하나의 피처 행렬로 묶어 모델별 1회 추론
+
+        반환 리스트의 각 항목은 predict_complications()와 같은 형식이며,
+        processing_time 은 배치 전체 시간을 환자 수로 나눈 값입니다.
+        """
+        start_time = time.time()
+        if not patients_data:
+            return []
+        
+        try:
+            # 입력 데이터 전처리 (N x 183 피처)
+            features = self._build_feature_matrix(patients_data)
+            batch_results: List[Dict[str, Any]] = [{} for _ in patients_data]
+            
+            # 합병증 모델별로 imputer → scaler → predict_proba 를 한 번만 실행
+            for complication in COMPLICATION_TYPES:
+                if self.registry.get(complication) is None:
+                    continue
+                try:
+                    probabilities = self._predict_complication_probabilities(features, complication)
+                    for results, probability in zip(batch_results, probabilities):
+                        results[complication] = self._build_complication_result(probability, complication)
+                except Exception as e:
+                    logger.error(f"{complication} 일괄 예측 중 오류: {str(e)}")
+                    for results in batch_results:
+                        results[complication] = {'error': str(e)}
+            
+            processing_time = (time.time() - start_time) / len(patients_data)
+            timestamp = datetime.now().isoformat()
+            for results in batch_results:
+                results['processing_time'] = processing_time
+                results['timestamp'] = timestamp
+            
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"합병증 일괄 예측 중 오류: {str(e)}")
+            return [{'error': str(e)} for _ in patients_data]
+    
+    def _predict_stroke_mortality(self, patient_data: Dict) -> Dict[str, Any]:
         """뇌졸중 사망률 예측 - stroke_mortality_30day.pkl 사용"""
+        return self._predict_stroke_mortality_batch([patient_data])[0]
+    
+    def _predict_stroke_mortality_batch(self, patients_data: List[Dict]) -> List[Dict[str, Any]]:
+        """뇌졸중 사망률 일괄 예측 - 환자 N명을 하나의 피처 행렬로 묶어 1회 추론"""
         start_time = time.time()
+        if not patients_data:
+            return []
         
         try:
-            if 'stroke_mortality' not in self.models:
-                return {'error': '사망률 예측 모델이 로드되지 않았습니다.'}
+            bundle = self.registry.get('stroke_mortality')
+            if bundle is None:
+                return [{'error': '사망률 예측 모델이 로드되지 않았습니다.'} for _ in patients_data]
             
-            # 뇌졸중 특화 피처 준비
-            stroke_features = self._prepare_stroke_features(patient_data)
+            # 뇌졸중 특화 피처 준비 (N x 183)
+            stroke_features = self._build_stroke_feature_matrix(patients_data)
             
-            model = self.models['stroke_mortality']
-            metadata = self.metadata.get('stroke_mortality', {})
-            preprocessors = self.preprocessors.get('stroke_mortality', {})
+            model = bundle['model']
+            metadata = bundle['metadata']
+            preprocessors = bundle['preprocessors']
             
             # 전처리
             if 'imputer' in preprocessors:
-                stroke_features = preprocessors['imputer'].transform(stroke_features)
+                stroke_features = preprocessors['imputer'].transform(
+                    self._as_model_input(stroke_features, preprocessors['imputer']))
             
             if 'scaler' in preprocessors:
-                stroke_features = preprocessors['scaler'].transform(stroke_features)
+                stroke_features = preprocessors['scaler'].transform(
+                    self._as_model_input(stroke_features, preprocessors['scaler']))
             
             # 30일 사망률 예측
+            stroke_features = self._as_model_input(stroke_features, model)
             if hasattr(model, 'predict_proba'):
-                mortality_30_day = model.predict_proba(stroke_features)[0, 1]
+                mortality_30_day = model.predict_proba(stroke_features)[:, 1]
             else:
-                mortality_30_day = model.predict(stroke_features)[0]
+                mortality_30_day = model.predict(stroke_features)
             
-            # 위험도 분류
-            if mortality_30_day < 0.1:
-                risk_level = 'LOW'
-            elif mortality_30_day < 0.3:
-                risk_level = 'MODERATE'  
-            elif mortality_30_day < 0.5:
-                risk_level = 'HIGH'
-            else:
-                risk_level = 'CRITICAL'
-            
-            # 뇌졸중 특화 분석
-            stroke_analysis = self._analyze_stroke_factors(patient_data, mortality_30_day)
+            batch_results = [
+                self._build_mortality_result(patient_data, probability, metadata)
+                for patient_data, probability in zip(patients_data, mortality_30_day)
+            ]
             
-            result = {
-                'mortality_30_day': float(mortality_30_day),
-                'risk_level': risk_level,
-                'stroke_type': patient_data.get('stroke_type', 'unknown'),
-                'nihss_score': patient_data.get('nihss_score'),
-                'reperfusion_treatment': patient_data.get('reperfusion_treatment', False),
-                'reperfusion_time': patient_data.get('reperfusion_time'),
-                'risk_factors': stroke_analysis['risk_factors'],
-                'protective_factors': stroke_analysis['protective_factors'],
-                'clinical_recommendations': stroke_analysis['recommendations'],
-                'model_confidence': float(metadata.get('performance', {}).get('auc', 0.8)),
-                'processing_time': time.time() - start_time
-            }
+            processing_time = (time.time() - start_time) / len(patients_data)
+            for result in batch_results:
+                result['processing_time'] = processing_time
             
-            return result
+            return batch_results
             
         except Exception as e:
             logger.error(f"사망률 예측 중 오류: {str(e)}")
-            return {'error': str(e)}
+            return [{'error': str(e)} for _ in patients_data]
     
-    def assess_sod2_status(self, patient_data: Dict) -> Dict[str, Any]:
+    def _build_mortality_result(self, patient_data: Dict, mortality_30_day: float, metadata: Dict) -> Dict[str, Any]:
+        """환자 한 명의 사망률 예측 결과 구성"""
+        # 위험도 분류
+        if mortality_30_day < 0.1:
+            risk_level = 'LOW'
+        elif mortality_30_day < 0.3:
+            risk_level = 'MODERATE'  
+        elif mortality_30_day < 0.5:
+            risk_level = 'HIGH'
+        else:
+            risk_level = 'CRITICAL'
+        
+        # 뇌졸중 특화 분석
+        stroke_analysis = self._analyze_stroke_factors(patient_data, mortality_30_day)
+        
+        return {
+            'mortality_30_day': float(mortality_30_day),
+            'risk_level': risk_level,
+            'stroke_type': patient_data.get('stroke_type', 'unknown'),
+            'nihss_score': patient_data.get('nihss_score'),
+            'reperfusion_treatment': patient_data.get('reperfusion_treatment', False),
+            'reperfusion_time': patient_data.get('reperfusion_time'),
+            'risk_factors': stroke_analysis['risk_factors'],
+            'protective_factors': stroke_analysis['protective_factors'],
+            'clinical_recommendations': stroke_analysis['recommendations'],
+            'model_confidence': float(metadata.get('performance', {}).get('auc', 0.8)),
+        }
+    
+    def _assess_sod2_status(self, patient_data: Dict) -> Dict[str, Any]:
         """SOD2 항산화 평가 - tsx 파일 로직 기반"""
         try:
             # 환자 기본 정보
@@ -447,219 +649,208 @@ class MLModelService:
         }
     
     def _prepare_features(self, patient_data: Dict) -> pd.DataFrame:
-        """환자 데이터를 183개 피처로 변환"""
+        """환자 데이터를 183개 피처로 변환 (컬럼명이 있는 1행 DataFrame)"""
+        return self._get_feature_layout().to_frame(self._build_feature_matrix([patient_data]))
+    
+    def _build_feature_matrix(self, patients_data: List[Dict]) -> np.ndarray:
+        """환자 N명의 입력을 (N, 183) float32 피처 행렬로 변환"""
         try:
-            # 실제 모델에서 사용되는 피처 컬럼들 가져오기
-            feature_columns = self._get_feature_columns()
-            features = pd.DataFrame(0, index=[0], columns=feature_columns)
-            
-            # 기본 정보
-            if 'gender' in patient_data:
-                features.loc[0, 'GENDER'] = 1 if patient_data['gender'] == 'M' else 0
-            if 'age' in patient_data:
-                features.loc[0, 'AGE'] = patient_data['age']
-            
-            # 활력징후 매핑
-            vital_signs = patient_data.get('vital_signs', {})
-            self._map_vital_signs(features, vital_signs)
-            
-            # 검사결과 매핑  
-            lab_results = patient_data.get('lab_results', {})
-            self._map_lab_results(features, lab_results)
-            
-            # 합병증 플래그
-            complications = patient_data.get('complications', {})
-            self._map_complications(features, complications)
-            
-            # 약물 플래그
-            medications = patient_data.get('medications', {})
-            self._map_medications(features, medications)
-            
-            return features
+            layout = self._get_feature_layout()
+            matrix = layout.empty(len(patients_data))
+            for row, patient_data in zip(matrix, patients_data):
+                self._fill_feature_row(row, patient_data, layout)
+            return matrix
             
         except Exception as e:
             logger.error(f"피처 준비 중 오류: {str(e)}")
             raise
     
-    def _prepare_stroke_features(self, patient_data: Dict) -> pd.DataFrame:
-        """뇌졸중 사망률 예측용 피처 준비"""
-        # 기본 피처 준비 후 뇌졸중 특화 피처 추가
-        features = self._prepare_features(patient_data)
+    def _fill_feature_row(self, row: np.ndarray, patient_data: Dict, layout: FeatureLayout):
+        """피처 행렬의 한 행(뷰)에 환자 데이터를 채움"""
+        # 기본 정보
+        if 'gender' in patient_data and 'GENDER' in layout:
+            row[layout.index['GENDER']] = 1 if patient_data['gender'] == 'M' else 0
+        if 'age' in patient_data and 'AGE' in layout:
+            row[layout.index['AGE']] = patient_data['age']
         
-        # 뇌졸중 특화 피처들
-        if 'nihss_score' in patient_data:
-            if 'nihss_score' in features.columns:
-                features.loc[0, 'nihss_score'] = patient_data['nihss_score']
+        # 활력징후 매핑 (통계가 있으면 단일 측정값보다 우선)
+        vital_signs = patient_data.get('vital_signs', {})
+        self._map_vital_signs(row, vital_signs, patient_data.get('vital_sign_stats', {}))
         
-        if 'stroke_type' in patient_data:
-            stroke_type = patient_data['stroke_type']
-            if 'stroke_type_ischemic' in features.columns:
-                features.loc[0, 'stroke_type_ischemic'] = 1 if 'ischemic' in stroke_type else 0
-            if 'stroke_type_hemorrhagic' in features.columns:
-                features.loc[0, 'stroke_type_hemorrhagic'] = 1 if 'hemorrhagic' in stroke_type else 0
+        # 검사결과 매핑  
+        lab_results = patient_data.get('lab_results', {})
+        self._map_lab_results(row, lab_results)
         
-        if 'reperfusion_treatment' in patient_data:
-            if 'reperfusion_treatment' in features.columns:
-                features.loc[0, 'reperfusion_treatment'] = 1 if patient_data['reperfusion_treatment'] else 0
+        # 합병증 플래그
+        complications = patient_data.get('complications', {})
+        self._map_complications(row, complications)
         
+        # 약물 플래그
+        medications = patient_data.get('medications', {})
+        self._map_medications(row, medications)
+    
+    def _build_stroke_feature_matrix(self, patients_data: List[Dict]) -> np.ndarray:
+        """뇌졸중 사망률 예측용 피처 행렬 준비 - 기본 피처 후 뇌졸중 특화 피처 추가"""
+        layout = self._get_feature_layout()
+        features = self._build_feature_matrix(patients_data)
+        for row, patient_data in zip(features, patients_data):
+            self._fill_stroke_features(row, patient_data, layout)
         return features
     
+    def _fill_stroke_features(self, row: np.ndarray, patient_data: Dict, layout: FeatureLayout):
+        """뇌졸중 특화 피처들"""
+        if 'nihss_score' in patient_data and 'nihss_score' in layout:
+            row[layout.index['nihss_score']] = patient_data['nihss_score']
+        
+        if 'stroke_type' in patient_data:
+            stroke_type = patient_data['stroke_type']
+            if 'stroke_type_ischemic' in layout:
+                row[layout.index['stroke_type_ischemic']] = 1 if 'ischemic' in stroke_type else 0
+            if 'stroke_type_hemorrhagic' in layout:
+                row[layout.index['stroke_type_hemorrhagic']] = 1 if 'hemorrhagic' in stroke_type else 0
+        
+        if 'reperfusion_treatment' in patient_data and 'reperfusion_treatment' in layout:
+            row[layout.index['reperfusion_treatment']] = 1 if patient_data['reperfusion_treatment'] else 0
+    
     def _get_feature_columns(self) -> List[str]:
         """모델 피처 컬럼 목록 반환"""
         if self.feature_columns:
             return self.feature_columns
         logger.warning("feature_columns JSON이 비어있습니다. Preprocessor에서 로드된 컬럼 사용.")
-        for pre in self.preprocessors.values():
+        for bundle in self.registry.loaded().values():
+            pre = bundle['preprocessors']
             if isinstance(pre, dict) and 'feature_columns' in pre:
                 return pre['feature_columns']
         
         # 기본 183개 피처 (실제로는 업로드된 전처리기에서 가져와야 함)
-        return [
-            'GENDER', 'AGE',
-            # 활력징후 관련 (심박수, 혈압, 체온 등의 통계값들)
-            'heart_rate_mean', 'heart_rate_std', 'heart_rate_min', 'heart_rate_max', 'heart_rate_count',
-            'heart_rate_first', 'heart_rate_last',
-            'systolic_bp_mean', 'systolic_bp_std', 'systolic_bp_min', 'systolic_bp_max', 'systolic_bp_count',
-            'systolic_bp_first', 'systolic_bp_last',
-            'diastolic_bp_mean', 'diastolic_bp_std', 'diastolic_bp_min', 'diastolic_bp_max', 'diastolic_bp_count',
-            'diastolic_bp_first', 'diastolic_bp_last',
-            'mean_bp_mean', 'mean_bp_std', 'mean_bp_min', 'mean_bp_max', 'mean_bp_count',
-            'mean_bp_first', 'mean_bp_last',
-            'temperature_mean', 'temperature_std', 'temperature_min', 'temperature_max', 'temperature_count',
-            'temperature_first', 'temperature_last',
-            'respiratory_rate_mean', 'respiratory_rate_std', 'respiratory_rate_min', 'respiratory_rate_max',
-            'respiratory_rate_count', 'respiratory_rate_first', 'respiratory_rate_last',
-            'spo2_mean', 'spo2_std', 'spo2_min', 'spo2_max', 'spo2_count', 'spo2_first', 'spo2_last',
-            # ... (실제로는 183개 모든 피처)
-            # 검사 결과들
-            'wbc_mean', 'wbc_first', 'wbc_last', 'wbc_trend', 'wbc_count',
-            'hemoglobin_mean', 'hemoglobin_first', 'hemoglobin_last', 'hemoglobin_trend', 'hemoglobin_count',
-            'creatinine_mean', 'creatinine_first', 'creatinine_last', 'creatinine_trend', 'creatinine_count',
-            'bun_mean', 'bun_first', 'bun_last', 'bun_trend', 'bun_count',
-            # 합병증 플래그들
-            'sepsis', 'respiratory_failure', 'deep_vein_thrombosis', 'pulmonary_embolism',
-            'urinary_tract_infection', 'gastrointestinal_bleeding',
-            # 약물 플래그들  
-            'anticoagulant_flag', 'antiplatelet_flag', 'thrombolytic_flag',
-            'antihypertensive_flag', 'statin_flag', 'antibiotic_flag', 'vasopressor_flag'
-        ]
+        return DEFAULT_FEATURE_COLUMNS
     
-    def _map_vital_signs(self, features: pd.DataFrame, vital_signs: Dict):
-        """활력징후 데이터 매핑"""
-        vital_mapping = {
-            'heart_rate': 'heart_rate_mean',
-            'systolic_bp': 'systolic_bp_mean', 
-            'diastolic_bp': 'diastolic_bp_mean',
-            'temperature': 'temperature_mean',
-            'respiratory_rate': 'respiratory_rate_mean',
-            'oxygen_saturation': 'spo2_mean'
-        }
-        
-        for key, feature_name in vital_mapping.items():
-            if key in vital_signs and feature_name in features.columns:
-                features.loc[0, feature_name] = vital_signs[key]
+    def _get_feature_layout(self) -> FeatureLayout:
+        """피처 컬럼 목록이 바뀔 때만 레이아웃(컬럼명 → 인덱스 맵)을 다시 컴파일"""
+        feature_columns = self._get_feature_columns()
+        if self._feature_layout is None or self._feature_layout_source is not feature_columns:
+            layout = FeatureLayout(feature_columns)
+            self._feature_slots = {
+                'vital_signs': layout.resolve(VITAL_SIGN_FEATURES),
+                'vital_sign_stats': layout.resolve({
+                    (measure, stat): f"{prefix}_{stat}"
+                    for measure, prefix in VITAL_SIGN_STAT_FEATURES.items() for stat in VITAL_SIGN_STATS
+                }),
+                'lab_results': layout.resolve(LAB_RESULT_FEATURES),
+                'complications': layout.resolve({flag: flag for flag in COMPLICATION_FLAGS}),
+                'medications': layout.resolve({flag: flag for flag in MEDICATION_FLAGS}),
+            }
+            self._feature_layout = layout
+            self._feature_layout_source = feature_columns
+        return self._feature_layout
     
-    def _map_lab_results(self, features: pd.DataFrame, lab_results: Dict):
+    def _as_model_input(self, X, estimator):
+        """컬럼명으로 학습된 전처리기/모델에만 DataFrame 으로 래핑해서 전달"""
+        if hasattr(estimator, 'feature_names_in_'):
+            return X if isinstance(X, pd.DataFrame) else self._get_feature_layout().to_frame(X)
+        return X.to_numpy() if isinstance(X, pd.DataFrame) else X
+    
+    def _map_vital_signs(self, row: np.ndarray, vital_signs: Dict, vital_sign_stats: Dict = None):
+        """활력징후 데이터 매핑
+
+        vital_signs 는 단일 측정값({'heart_rate': 80, ...} → *_mean),
+        vital_sign_stats 는 방문/기간 통계({'heart_rate': {'mean', 'std', 'min', 'max', 'count', 'first', 'last'}})입니다.
+        """
+        for key, idx in self._feature_slots['vital_signs']:
+            if key in vital_signs:
+                row[idx] = vital_signs[key]
+        if vital_sign_stats:
+            for (measure, stat), idx in self._feature_slots['vital_sign_stats']:
+                value = vital_sign_stats.get(measure, {}).get(stat)
+                if value is not None:
+                    row[idx] = value
+    
+    def _map_lab_results(self, row: np.ndarray, lab_results: Dict):
         """검사결과 데이터 매핑"""
-        lab_mapping = {
-            'wbc': 'wbc_mean',
-            'hemoglobin': 'hemoglobin_mean',
-            'creatinine': 'creatinine_mean',
-            'bun': 'bun_mean',
-            'glucose': 'glucose_mean',
-            'sodium': 'sodium_mean',
-            'potassium': 'potassium_mean'
-        }
-        
-        for key, feature_name in lab_mapping.items():
-            if key in lab_results and feature_name in features.columns:
-                features.loc[0, feature_name] = lab_results[key]
+        for key, idx in self._feature_slots['lab_results']:
+            if key in lab_results:
+                row[idx] = lab_results[key]
     
-    def _map_complications(self, features: pd.DataFrame, complications: Dict):
+    def _map_complications(self, row: np.ndarray, complications: Dict):
         """합병증 플래그 매핑"""
-        complication_flags = [
-            'sepsis', 'respiratory_failure', 'deep_vein_thrombosis',
-            'pulmonary_embolism', 'urinary_tract_infection', 'gastrointestinal_bleeding'
-        ]
-        
-        for flag in complication_flags:
-            if flag in features.columns:
-                features.loc[0, flag] = 1 if complications.get(flag, False) else 0
+        for flag, idx in self._feature_slots['complications']:
+            row[idx] = 1 if complications.get(flag, False) else 0
     
-    def _map_medications(self, features: pd.DataFrame, medications: Dict):
+    def _map_medications(self, row: np.ndarray, medications: Dict):
         """약물 플래그 매핑"""
-        medication_flags = [
-            'anticoagulant_flag', 'antiplatelet_flag', 'thrombolytic_flag',
-            'antihypertensive_flag', 'statin_flag', 'antibiotic_flag', 'vasopressor_flag'
-        ]
-        
-        for flag in medication_flags:
-            if flag in features.columns:
-                features.loc[0, flag] = 1 if medications.get(flag, False) else 0
+        for flag, idx in self._feature_slots['medications']:
+            row[idx] = 1 if medications.get(flag, False) else 0
     
-    def _predict_single_complication(self, features_df: pd.DataFrame, complication: str) -> Dict:
+    def _predict_single_complication(self, features: np.ndarray, complication: str) -> Dict:
         """단일 합병증 예측"""
         try:
-            model = self.models[complication]
-            preprocessors = self.preprocessors[complication]
-            metadata = self.metadata[complication]
-            
-            # 데이터 전처리
-            X = features_df.copy()
-            
-            # 결측치 처리
-            if 'imputer' in preprocessors:
-                X_imputed = preprocessors['imputer'].transform(X)
-                X = pd.DataFrame(X_imputed, columns=X.columns)
-            
-            # 스케일링
-            if 'scaler' in preprocessors:
-                X_scaled = preprocessors['scaler'].transform(X)
-                X = pd.DataFrame(X_scaled, columns=X.columns)
-            
-            # 예측
-            if hasattr(model, 'predict_proba'):
-                probability = model.predict_proba(X)[0, 1]
-            else:
-                decision_score = model.decision_function(X)[0]
-                probability = 1 / (1 + np.exp(-decision_score))
-            
-            # 임계값 및 위험도
-            threshold = metadata.get('threshold', 0.5)
-            prediction = probability > threshold
-            
-            if probability < 0.3:
-                risk_level = 'LOW'
-            elif probability < 0.7:
-                risk_level = 'MEDIUM'
-            else:
-                risk_level = 'HIGH'
-            
-            # 모델 성능 정보
-            performance = metadata.get('performance', {})
-            
-            return {
-                'probability': float(probability),
-                'prediction': bool(prediction),
-                'risk_level': risk_level,
-                'threshold': float(threshold),
-                'model_performance': {
-                    'auc': float(performance.get('auc', 0)),
-                    'precision': float(performance.get('precision', 0)),
-                    'recall': float(performance.get('recall', 0)),
-                    'f1': float(performance.get('f1', 0))
-                },
-                'model_info': {
-                    'type': metadata.get('model_type', 'Unknown'),
-                    'strategy': metadata.get('strategy', 'Unknown'),
-                    'training_date': metadata.get('training_date', 'Unknown'),
-                    'feature_count': metadata.get('feature_count', 183)
-                }
-            }
+            probability = self._predict_complication_probabilities(features, complication)[0]
+            return self._build_complication_result(probability, complication)
             
         except Exception as e:
             logger.error(f"{complication} 예측 중 오류: {str(e)}")
             return {'error': str(e)}
+    
+    def _predict_complication_probabilities(self, features: np.ndarray, complication: str) -> np.ndarray:
+        """피처 행렬(N행)에 대한 합병증 발생 확률 벡터"""
+        bundle = self.registry.get(complication)
+        model = bundle['model']
+        preprocessors = bundle['preprocessors']
+        
+        # 데이터 전처리 (transform 은 새 배열을 반환하므로 입력 행렬은 변경되지 않음)
+        X = features
+        
+        # 결측치 처리
+        if 'imputer' in preprocessors:
+            X = preprocessors['imputer'].transform(self._as_model_input(X, preprocessors['imputer']))
+        
+        # 스케일링
+        if 'scaler' in preprocessors:
+            X = preprocessors['scaler'].transform(self._as_model_input(X, preprocessors['scaler']))
+        
+        # 예측
+        X = self._as_model_input(X, model)
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(X)[:, 1]
+        decision_scores = model.decision_function(X)
+        return 1 / (1 + np.exp(-decision_scores))
+    
+    def _build_complication_result(self, probability: float, complication: str) -> Dict:
+        """예측 확률을 API 응답 형식으로 변환"""
+        metadata = self.registry.get(complication)['metadata']
+        
+        # 임계값 및 위험도
+        threshold = metadata.get('threshold', 0.5)
+        prediction = probability > threshold
+        
+        if probability < 0.3:
+            risk_level = 'LOW'
+        elif probability < 0.7:
+            risk_level = 'MEDIUM'
+        else:
+            risk_level = 'HIGH'
+        
+        # 모델 성능 정보
+        performance = metadata.get('performance', {})
+        
+        return {
+            'probability': float(probability),
+            'prediction': bool(prediction),
+            'risk_level': risk_level,
+            'threshold': float(threshold),
+            'model_performance': {
+                'auc': float(performance.get('auc', 0)),
+                'precision': float(performance.get('precision', 0)),
+                'recall': float(performance.get('recall', 0)),
+                'f1': float(performance.get('f1', 0))
+            },
+            'model_info': {
+                'type': metadata.get('model_type', 'Unknown'),
+                'strategy': metadata.get('strategy', 'Unknown'),
+                'training_date': metadata.get('training_date', 'Unknown'),
+                'feature_count': metadata.get('feature_count', 183)
+            }
+        }
 
 # 싱글톤 인스턴스
 ml_service = MLModelService()
\ No newline at end of file
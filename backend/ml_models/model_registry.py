@@ -0,0 +1,228 @@
+# backend/ml_models/model_registry.py
+import os
+import resource
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# 모델별 아티팩트 파일 (saved_models 디렉터리 기준)
+MODEL_ARTIFACTS = {
+    'pneumonia': {
+        'model': 'pneumonia_final_model.pkl',
+        'preprocessors': 'pneumonia_preprocessors.pkl',
+        'metadata': 'pneumonia_metadata.pkl',
+    },
+    'acute_kidney_injury': {
+        'model': 'acute_kidney_injury_final_model.pkl',
+        'preprocessors': 'acute_kidney_injury_preprocessors.pkl',
+        'metadata': 'acute_kidney_injury_metadata.pkl',
+    },
+    'heart_failure': {
+        'model': 'heart_failure_final_model.pkl',
+        'preprocessors': 'heart_failure_preprocessors.pkl',
+        'metadata': 'heart_failure_metadata.pkl',
+    },
+    'stroke_mortality': {
+        'model': 'stroke_mortality_30day.pkl',
+        'preprocessors': 'stroke_mortality_preprocessors.pkl',
+        'metadata': 'stroke_mortality_metadata.pkl',
+    },
+}
+
+
+# 변환된 메모리 맵 아티팩트 확장자 (convert_models_to_mmap 명령으로 생성)
+MMAP_ARTIFACT_SUFFIX = '.joblib'
+
+
+def mmap_artifact_name(filename: str) -> str:
+    """pkl 아티팩트에 대응하는 메모리 맵용 joblib 파일명"""
+    return os.path.splitext(filename)[0] + MMAP_ARTIFACT_SUFFIX
+
+
+def current_rss_bytes() -> int:
+    """현재 프로세스의 상주 메모리(RSS) 바이트 수"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # /proc 가 없는 환경(macOS 등)에서는 최대 RSS 로 대체 (Linux 외에는 바이트 단위)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ModelRegistry:
+    """모델을 처음 사용할 때 로드하는 지연 로딩 레지스트리
+
+    - get(name) 은 로드가 끝난 모델을 잠금 없이 반환하고, 최초 호출만 잠금 안에서 로드합니다.
+    - 로드는 하나의 잠금으로 직렬화되어 모델별 RSS 증가량을 정확히 기록합니다.
+    - status() 로 모델별 상태, 로드 시간, 메모리 사용량을 조회합니다.
+    - use_mmap 이면 변환된 .joblib 아티팩트를 mmap_mode='r' 로 열어, NumPy 배열을
+      필요할 때 페이지 단위로 읽고 OS 페이지 캐시를 통해 프로세스 간에 공유합니다.
+    - 모델 파일이 없거나 로드에 실패하면 retry_interval 초 동안은 다시 시도하지 않고 None 을 반환하며,
+      그 전이라도 모델 파일이 생기거나 수정시각이 바뀌면 바로 다시 로드합니다.
+    """
+
+    def __init__(self, model_path: str, artifacts: Dict[str, Dict[str, str]] = None, use_mmap: bool = True,
+                 retry_interval: float = 60.0):
+        self.model_path = model_path
+        self.artifacts = artifacts or MODEL_ARTIFACTS
+        self.use_mmap = use_mmap
+        self.retry_interval = retry_interval
+        self._bundles: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, Tuple[float, Optional[int]]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._load_lock = threading.RLock()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """{'model', 'preprocessors', 'metadata'} 번들 반환 (모델 파일이 없거나 로드 실패 시 None)"""
+        bundle = self._bundles.get(name)
+        if bundle is not None:
+            return bundle
+        if self._should_skip_retry(name):
+            return None
+
+        with self._load_lock:
+            if name in self._bundles:
+                return self._bundles[name]
+            if self._should_skip_retry(name):
+                return None
+            bundle = self._load(name)
+            if bundle is None:
+                # 실패는 캐시하지 않고 재시도 시각과 당시 모델 파일 수정시각만 기록
+                self._failures[name] = (time.monotonic() + self.retry_interval, self._artifact_signature(name))
+            else:
+                self._failures.pop(name, None)
+                self._bundles[name] = bundle
+        return bundle
+
+    def _should_skip_retry(self, name: str) -> bool:
+        """최근 실패 후 재시도 간격이 지나지 않았고 모델 파일도 그대로이면 True"""
+        failure = self._failures.get(name)
+        if failure is None:
+            return False
+        retry_at, signature = failure
+        return time.monotonic() < retry_at and self._artifact_signature(name) == signature
+
+    def _artifact_signature(self, name: str) -> Optional[int]:
+        """모델 파일 수정시각(ns) - 파일이 없으면 None"""
+        files = self.artifacts.get(name)
+        if files is None:
+            return None
+        try:
+            return os.stat(self._resolve_artifact(files['model'])[0]).st_mtime_ns
+        except OSError:
+            return None
+
+    def preload(self, names: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """지정한 모델(기본값: 전체)을 미리 로드하고 상태 반환"""
+        for name in names or list(self.artifacts):
+            self.get(name)
+        return self.status()
+
+    def reload(self, name: str) -> Optional[Dict[str, Any]]:
+        """모델을 디스크에서 다시 로드"""
+        with self._load_lock:
+            self._bundles.pop(name, None)
+            self._failures.pop(name, None)
+            return self.get(name)
+
+    def version(self, name: str) -> str:
+        """모델 버전 식별자 (로드한 모델 파일의 수정시각-크기) - 파일이 바뀐 뒤 reload 하면 값이 바뀜"""
+        self.get(name)
+        stats = self._stats.get(name, {})
+        return stats.get('version', stats.get('state', 'unknown'))
+
+    def loaded(self) -> Dict[str, Dict[str, Any]]:
+        """현재 메모리에 로드된 번들들"""
+        return dict(self._bundles)
+
+    def status(self) -> Dict[str, Any]:
+        """모델별 로드 상태, 로드 시간, 메모리 사용량"""
+        models = {}
+        for name in self.artifacts:
+            stats = self._stats.get(name)
+            if stats is None:
+                models[name] = {'state': 'not_loaded'}
+            else:
+                models[name] = dict(stats)
+
+        return {
+            'pid': os.getpid(),
+            'process_rss_bytes': current_rss_bytes(),
+            'loaded_count': len(self.loaded()),
+            'models': models,
+        }
+
+    def _artifact_path(self, filename: str) -> str:
+        return os.path.join(self.model_path, filename)
+
+    def _resolve_artifact(self, filename: str):
+        """(실제 로드할 경로, 포맷) - 원본 pkl 보다 오래되지 않은 .joblib 이 있으면 우선 사용"""
+        path = self._artifact_path(filename)
+        mmap_path = self._artifact_path(mmap_artifact_name(filename))
+        if self.use_mmap and os.path.exists(mmap_path):
+            if not os.path.exists(path) or os.path.getmtime(mmap_path) >= os.path.getmtime(path):
+                return mmap_path, 'joblib-mmap'
+            logger.warning(f"{mmap_artifact_name(filename)} 이 {filename} 보다 오래되어 pkl 을 사용합니다.")
+        return path, 'pickle'
+
+    def _artifact_exists(self, filename: str) -> bool:
+        return os.path.exists(self._resolve_artifact(filename)[0])
+
+    def _load_artifact(self, filename: str):
+        """pickle.dump / joblib.dump 로 저장된 파일 모두 joblib.load 로 로드"""
+        path, artifact_format = self._resolve_artifact(filename)
+        if artifact_format == 'joblib-mmap':
+            return joblib.load(path, mmap_mode='r')
+        return joblib.load(path)
+
+    def _load(self, name: str) -> Optional[Dict[str, Any]]:
+        files = self.artifacts.get(name)
+        if files is None:
+            logger.error(f"알 수 없는 모델: {name}")
+            return None
+
+        if not self._artifact_exists(files['model']):
+            logger.warning(f"{name} 모델 파일이 없습니다: {files['model']}")
+            self._stats[name] = {'state': 'missing', 'artifact': files['model']}
+            return None
+
+        rss_before = current_rss_bytes()
+        start_time = time.perf_counter()
+        try:
+            bundle = {
+                'model': self._load_artifact(files['model']),
+                'preprocessors': {},
+                'metadata': {},
+            }
+            for key in ('preprocessors', 'metadata'):
+                if self._artifact_exists(files[key]):
+                    bundle[key] = self._load_artifact(files[key])
+        except Exception as e:
+            logger.error(f"{name} 모델 로드 실패: {str(e)}")
+            self._stats[name] = {'state': 'failed', 'error': str(e)}
+            return None
+
+        load_time = time.perf_counter() - start_time
+        model_file = os.stat(self._resolve_artifact(files['model'])[0])
+        self._stats[name] = {
+            'state': 'loaded',
+            'loaded_at': datetime.now().isoformat(),
+            'load_time': load_time,
+            'rss_delta_bytes': max(0, current_rss_bytes() - rss_before),
+            'artifact_bytes': sum(
+                os.path.getsize(self._resolve_artifact(filename)[0])
+                for filename in files.values()
+                if self._artifact_exists(filename)
+            ),
+            'artifact_format': self._resolve_artifact(files['model'])[1],
+            'version': f"{model_file.st_mtime_ns}-{model_file.st_size}",
+            'model_type': type(bundle['model']).__name__,
+        }
+        logger.info(f"{name} 모델 로드 완료 ({load_time:.2f}s)")
+        return bundle
@@ -47,6 +47,10 @@ class PredictionTask(models.Model):
         verbose_name = "AI 예측 작업"
         verbose_name_plural = "AI 예측 작업"
         ordering = ['-created_at']
+        indexes = [
+            # 환자별 작업 목록 키셋 페이지네이션 (created_at, id 역순)
+            models.Index(fields=['patient', '-created_at', '-id'], name='ml_task_patient_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_task_type_display()} - {self.patient.name} ({self.status})"
\ No newline at end of file
@@ -0,0 +1,120 @@
+# backend/ml_models/task_events.py - 예측 작업 완료 알림 (Redis pub/sub)
+import json
+import time
+import logging
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.redis_client import get_redis
+from .models import PredictionTask
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENT_CHANNEL_PREFIX = 'ml_task_events'
+# 알림 대기 중 keepalive 간격(초) - SSE 연결 유지용 주석을 이 간격으로 보냄
+KEEPALIVE_INTERVAL = 15.0
+# Redis 를 쓸 수 없을 때 DB 재조회 간격(초)
+FALLBACK_POLL_INTERVAL = 1.0
+
+def task_channel(task_id) -> str:
+    return f"{TASK_EVENT_CHANNEL_PREFIX}:{task_id}"
+
+
+def task_result_payload(prediction_task: PredictionTask) -> Dict:
+    """작업 결과 응답 (get_task_result 와 알림 공통 형식)"""
+    payload = {
+        'task_id': str(prediction_task.task_id),
+        'status': prediction_task.status.lower(),
+        'task_type': prediction_task.task_type,
+        'patient': prediction_task.patient.name,
+        'created_at': prediction_task.created_at,
+        'processing_time': prediction_task.processing_time
+    }
+
+    if prediction_task.status == 'COMPLETED':
+        payload['results'] = prediction_task.predictions
+        payload['completed_at'] = prediction_task.completed_at
+    elif prediction_task.status == 'FAILED':
+        payload['error'] = prediction_task.error_message
+    return payload
+
+
+def publish_task_event(prediction_task: PredictionTask):
+    """작업 완료/실패 알림 발행 (실패해도 대기 쪽이 DB 로 다시 확인하므로 무시)"""
+    try:
+        get_redis().publish(
+            task_channel(prediction_task.task_id),
+            json.dumps(task_result_payload(prediction_task), cls=DjangoJSONEncoder)
+        )
+    except Exception as e:
+        logger.warning(f"작업 완료 알림 발행 실패 (무시됨): {e}")
+
+
+def finished_task_payloads(task_ids: Iterable[str]) -> Dict[str, Dict]:
+    """이미 끝난(COMPLETED/FAILED) 작업들의 결과 - 쿼리 1회"""
+    prediction_tasks = PredictionTask.objects.select_related('patient').filter(
+        task_id__in=list(task_ids), status__in=['COMPLETED', 'FAILED']
+    )
+    return {str(prediction_task.task_id): task_result_payload(prediction_task) for prediction_task in prediction_tasks}
+
+
+def iter_task_results(task_ids: Iterable[str], timeout: float) -> Iterator[Optional[Tuple[str, Dict]]]:
+    """작업들이 끝나는 대로 (task_id, 결과) 를 반환하는 제너레이터
+
+    채널을 먼저 구독한 뒤 DB 를 한 번 확인하므로, 그 사이에 끝난 작업도 놓치지 않습니다.
+    알림 없이 KEEPALIVE_INTERVAL 이 지나면 None 을 반환합니다 (SSE keepalive 용).
+    모든 작업이 끝나거나 timeout 이 지나면 종료합니다. Redis 를 쓸 수 없으면 DB 재조회로 대체합니다.
+    """
+    pending = set(str(task_id) for task_id in task_ids)
+    deadline = time.monotonic() + timeout
+
+    pubsub = None
+    try:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*[task_channel(task_id) for task_id in pending])
+    except Exception as e:
+        logger.warning(f"작업 알림 구독 실패 - DB 재조회로 대체: {e}")
+        pubsub = None
+
+    try:
+        for task_id, payload in finished_task_payloads(pending).items():
+            pending.discard(task_id)
+            yield task_id, payload
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            if pubsub is None:
+                time.sleep(min(remaining, FALLBACK_POLL_INTERVAL))
+                finished = finished_task_payloads(pending)
+                for task_id, payload in finished.items():
+                    pending.discard(task_id)
+                    yield task_id, payload
+                if not finished:
+                    yield None
+                continue
+
+            try:
+                message = pubsub.get_message(timeout=min(remaining, KEEPALIVE_INTERVAL))
+            except Exception as e:
+                logger.warning(f"작업 알림 수신 실패 - DB 재조회로 대체: {e}")
+                pubsub = None
+                continue
+
+            if message is None:
+                yield None
+                continue
+
+            payload = json.loads(message['data'])
+            if payload.get('task_id') in pending:
+                pending.discard(payload['task_id'])
+                yield payload['task_id'], payload
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
@@ -1,30 +1,202 @@
 # backend/ml_models/tasks.py
-from celery import shared_task
+from celery import shared_task, group
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from core.redis_client import get_redis
 from .ml_service import ml_service
+from .cohort import select_cohort, build_cohort_patient_data
+from .task_events import publish_task_event
 from .models import PredictionTask, ComplicationPrediction, StrokeMortalityPrediction, SOD2Assessment
-from patients.models import Patient, Visit
+from patients.models import Patient
 import logging
 import json
+import time
+import uuid
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# ================================
+# 예측 결과 저장 (비동기 태스크 / 동기 모드 공통)
+# ================================
+def build_complication_predictions(prediction_task, results):
+    """합병증별 상세 결과 행 생성 (저장하지 않음)"""
+    return [
+        ComplicationPrediction(
+            task=prediction_task,
+            complication_type=complication,
+            probability=result.get('probability', 0),
+            risk_level=result.get('risk_level', 'LOW'),
+            threshold=result.get('threshold', 0.5),
+            model_auc=result.get('model_performance', {}).get('auc', 0),
+            model_precision=result.get('model_performance', {}).get('precision', 0),
+            model_recall=result.get('model_performance', {}).get('recall', 0),
+            model_f1=result.get('model_performance', {}).get('f1', 0),
+            model_type=result.get('model_info', {}).get('type', 'Unknown'),
+            model_strategy=result.get('model_info', {}).get('strategy', 'Unknown'),
+            important_features=result.get('important_features', [])
+        )
+        for complication, result in results.items()
+        if complication not in ['processing_time', 'timestamp']
+    ]
+
+def save_complication_predictions(prediction_task, results):
+    """합병증별 상세 결과 저장 (INSERT 1회)"""
+    ComplicationPrediction.objects.bulk_create(build_complication_predictions(prediction_task, results))
+
+def build_mortality_prediction(prediction_task, result):
+    """사망률 예측 상세 결과 행 생성 (저장하지 않음)"""
+    return StrokeMortalityPrediction(
+        task=prediction_task,
+        mortality_30_day=result.get('mortality_30_day', 0),
+        mortality_30_day_risk_level=result.get('risk_level', 'LOW'),
+        stroke_type=result.get('stroke_type', 'unknown'),
+        nihss_score=result.get('nihss_score'),
+        reperfusion_treatment=result.get('reperfusion_treatment', False),
+        reperfusion_time=result.get('reperfusion_time'),
+        risk_factors=result.get('risk_factors', []),
+        protective_factors=result.get('protective_factors', []),
+        model_confidence=result.get('model_confidence', 0.8),
+        model_auc=result.get('model_confidence', 0.8),  # 임시
+        clinical_recommendations='\n'.join(result.get('clinical_recommendations', [])),
+        monitoring_priority=result.get('risk_level', 'LOW')
+    )
+
+def save_mortality_prediction(prediction_task, result):
+    """사망률 예측 상세 결과 저장"""
+    build_mortality_prediction(prediction_task, result).save()
+
+def save_sod2_assessment(prediction_task, result):
+    """SOD2 평가 상세 결과 저장"""
+    patient_info = result['patient_info']
+    sod2_status = result['sod2_status']
+    exercise_rec = result['exercise_recommendations']
+    
+    SOD2Assessment.objects.create(
+        task=prediction_task,
+        age=patient_info['age'],
+        gender=patient_info['gender'],
+        stroke_type=patient_info['stroke_type'],
+        stroke_date=datetime.now().date(),  # 실제로는 input_data에서 파싱
+        nihss_score=patient_info['nihss_score'],
+        reperfusion_treatment=patient_info['reperfusion_treatment'],
+        reperfusion_time=patient_info.get('reperfusion_time'),
+        hours_after_stroke=patient_info['hours_after_stroke'],
+        current_sod2_level=sod2_status['current_level'],
+        sod2_prediction_data=result['sod2_prediction_data'],
+        oxidative_stress_risk=sod2_status['oxidative_stress_risk'],
+        prediction_confidence=sod2_status['prediction_confidence'],
+        exercise_can_start=exercise_rec['can_start'],
+        exercise_intensity=exercise_rec['intensity'],
+        exercise_start_time=exercise_rec.get('time_until_start'),
+        sod2_target_level=exercise_rec['sod2_target'],
+        age_adjustment_factor=result['personalization_factors']['age_adjustment'],
+        stroke_type_adjustment=result['personalization_factors']['stroke_type_adjustment'],
+        nihss_adjustment=result['personalization_factors']['nihss_adjustment'],
+        reperfusion_timing_adjustment=result['personalization_factors']['reperfusion_timing_adjustment'],
+        clinical_recommendations='\n'.join(result['clinical_recommendations']),
+        exercise_recommendations='\n'.join(exercise_rec['recommended_activities']),
+        monitoring_schedule=exercise_rec['monitoring_schedule']
+    )
+
+RESULT_SAVERS = {
+    'COMPLICATION': save_complication_predictions,
+    'MORTALITY': save_mortality_prediction,
+    'SOD2_ASSESSMENT': save_sod2_assessment,
+}
+
+# 배치 저장 시 한 번에 INSERT 할 행 수
+BULK_SAVE_BATCH_SIZE = 500
+
+def complete_prediction_task(prediction_task, result, processing_time):
+    """작업 완료 처리 - 한 트랜잭션에서 작업 UPDATE 1회 + 상세 결과 INSERT"""
+    completed_at = timezone.now()
+    with transaction.atomic():
+        PredictionTask.objects.filter(pk=prediction_task.pk).update(
+            predictions=result,
+            processing_time=processing_time,
+            status='COMPLETED',
+            completed_at=completed_at
+        )
+        RESULT_SAVERS[prediction_task.task_type](prediction_task, result)
+    
+    prediction_task.predictions = result
+    prediction_task.processing_time = processing_time
+    prediction_task.status = 'COMPLETED'
+    prediction_task.completed_at = completed_at
+    transaction.on_commit(lambda: publish_task_event(prediction_task))
+
+def fail_prediction_task(prediction_task, error_message):
+    """작업 실패 처리 (UPDATE 1회)"""
+    PredictionTask.objects.filter(pk=prediction_task.pk).update(
+        status='FAILED',
+        error_message=error_message
+    )
+    prediction_task.status = 'FAILED'
+    prediction_task.error_message = error_message
+    transaction.on_commit(lambda: publish_task_event(prediction_task))
+
+# 일괄 저장 시 작업 유형별 (상세 결과 모델, 행 생성 함수) - 함수는 PredictionTask 하나당 행 목록 반환
+RESULT_ROW_BUILDERS = {
+    'COMPLICATION': (ComplicationPrediction, build_complication_predictions),
+    'MORTALITY': (StrokeMortalityPrediction, lambda prediction_task, result: [build_mortality_prediction(prediction_task, result)]),
+}
+
+def bulk_save_predictions(task_type, entries, batch_size=BULK_SAVE_BATCH_SIZE):
+    """여러 환자의 예측 결과를 일괄 저장
+    
+    entries: [{'task_id', 'patient_id', 'visit_id', 'input_data', 'result', 'processing_time'}, ...]
+    환자 수와 관계없이 batch_size 마다 PredictionTask / 상세 결과 INSERT 각 1회만 실행합니다.
+    오류 결과는 FAILED 작업으로만 저장합니다.
+    """
+    row_model, build_rows = RESULT_ROW_BUILDERS[task_type]
+    completed_at = timezone.now()
+    saved_tasks = []
+    
+    for start in range(0, len(entries), batch_size):
+        chunk = entries[start:start + batch_size]
+        with transaction.atomic():
+            prediction_tasks = PredictionTask.objects.bulk_create([
+                PredictionTask(
+                    task_id=entry['task_id'],
+                    patient_id=entry['patient_id'],
+                    visit_id=entry.get('visit_id'),
+                    task_type=task_type,
+                    status='FAILED' if 'error' in entry['result'] else 'COMPLETED',
+                    input_data=entry.get('input_data', {}),
+                    predictions=None if 'error' in entry['result'] else entry['result'],
+                    error_message=entry['result'].get('error', ''),
+                    processing_time=entry.get('processing_time'),
+                    completed_at=None if 'error' in entry['result'] else completed_at
+                )
+                for entry in chunk
+            ])
+            
+            row_model.objects.bulk_create([
+                row
+                for prediction_task, entry in zip(prediction_tasks, chunk)
+                if 'error' not in entry['result']
+                for row in build_rows(prediction_task, entry['result'])
+            ])
+        saved_tasks.extend(prediction_tasks)
+    
+    return saved_tasks
+
 @shared_task(bind=True)
 def predict_complications_task(self, patient_id, visit_id, input_data):
     """합병증 예측 비동기 태스크"""
     task_id = self.request.id
     
     try:
-        # 환자와 방문 정보 가져오기
-        patient = Patient.objects.get(id=patient_id)
-        visit = Visit.objects.get(id=visit_id) if visit_id else None
+        # 환자 정보 가져오기 (방문은 FK 제약으로 검증되므로 따로 조회하지 않음)
+        patient = Patient.objects.only('id', 'name').get(id=patient_id)
         
-        # 예측 작업 기록 생성
+        # 예측 작업 기록 생성 (진행 중 상태를 폴링에서 볼 수 있도록 먼저 커밋)
         prediction_task = PredictionTask.objects.create(
             task_id=task_id,
             patient=patient,
-            visit=visit,
+            visit_id=visit_id or None,
             task_type='COMPLICATION',
             status='PROCESSING',
             input_data=input_data
@@ -36,35 +208,11 @@ def predict_complications_task(self, patient_id, visit_id, input_data):
         processing_time = (timezone.now() - start_time).total_seconds()
         
         if 'error' in results:
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = results['error']
-            prediction_task.save()
+            fail_prediction_task(prediction_task, results['error'])
             return {'error': results['error']}
         
-        # 결과 저장
-        prediction_task.predictions = results
-        prediction_task.processing_time = processing_time
-        prediction_task.status = 'COMPLETED'
-        prediction_task.completed_at = timezone.now()
-        prediction_task.save()
-        
-        # 각 합병증별 상세 결과 저장
-        for complication, result in results.items():
-            if complication not in ['processing_time', 'timestamp']:
-                ComplicationPrediction.objects.create(
-                    task=prediction_task,
-                    complication_type=complication,
-                    probability=result.get('probability', 0),
-                    risk_level=result.get('risk_level', 'LOW'),
-                    threshold=result.get('threshold', 0.5),
-                    model_auc=result.get('model_performance', {}).get('auc', 0),
-                    model_precision=result.get('model_performance', {}).get('precision', 0),
-                    model_recall=result.get('model_performance', {}).get('recall', 0),
-                    model_f1=result.get('model_performance', {}).get('f1', 0),
-                    model_type=result.get('model_info', {}).get('type', 'Unknown'),
-                    model_strategy=result.get('model_info', {}).get('strategy', 'Unknown'),
-                    important_features=result.get('important_features', [])
-                )
+        # 작업 상태 UPDATE 와 합병증별 상세 결과 bulk INSERT 를 한 트랜잭션으로 저장
+        complete_prediction_task(prediction_task, results, processing_time)
         
         logger.info(f"합병증 예측 완료: Task {task_id}, Patient {patient.name}")
         return {
@@ -77,9 +225,7 @@ def predict_complications_task(self, patient_id, visit_id, input_data):
     except Exception as e:
         logger.error(f"합병증 예측 실패: {str(e)}")
         if 'prediction_task' in locals():
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = str(e)
-            prediction_task.save()
+            fail_prediction_task(prediction_task, str(e))
         return {'error': str(e)}
 
 @shared_task(bind=True)
@@ -88,13 +234,13 @@ def predict_stroke_mortality_task(self, patient_id, visit_id, input_data):
     task_id = self.request.id
     
     try:
-        patient = Patient.objects.get(id=patient_id)
-        visit = Visit.objects.get(id=visit_id) if visit_id else None
+        # 환자 정보 가져오기 (방문은 FK 제약으로 검증되므로 따로 조회하지 않음)
+        patient = Patient.objects.only('id', 'name').get(id=patient_id)
         
         prediction_task = PredictionTask.objects.create(
             task_id=task_id,
             patient=patient,
-            visit=visit,
+            visit_id=visit_id or None,
             task_type='MORTALITY',
             status='PROCESSING',
             input_data=input_data
@@ -105,33 +251,11 @@ def predict_stroke_mortality_task(self, patient_id, visit_id, input_data):
         processing_time = (timezone.now() - start_time).total_seconds()
         
         if 'error' in result:
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = result['error']
-            prediction_task.save()
+            fail_prediction_task(prediction_task, result['error'])
             return {'error': result['error']}
         
-        prediction_task.predictions = result
-        prediction_task.processing_time = processing_time
-        prediction_task.status = 'COMPLETED'
-        prediction_task.completed_at = timezone.now()
-        prediction_task.save()
-        
-        # 사망률 예측 상세 결과 저장
-        StrokeMortalityPrediction.objects.create(
-            task=prediction_task,
-            mortality_30_day=result.get('mortality_30_day', 0),
-            mortality_30_day_risk_level=result.get('risk_level', 'LOW'),
-            stroke_type=result.get('stroke_type', 'unknown'),
-            nihss_score=result.get('nihss_score'),
-            reperfusion_treatment=result.get('reperfusion_treatment', False),
-            reperfusion_time=result.get('reperfusion_time'),
-            risk_factors=result.get('risk_factors', []),
-            protective_factors=result.get('protective_factors', []),
-            model_confidence=result.get('model_confidence', 0.8),
-            model_auc=result.get('model_confidence', 0.8),  # 임시
-            clinical_recommendations='\n'.join(result.get('clinical_recommendations', [])),
-            monitoring_priority=result.get('risk_level', 'LOW')
-        )
+        # 작업 상태 UPDATE 와 사망률 예측 상세 결과 INSERT 를 한 트랜잭션으로 저장
+        complete_prediction_task(prediction_task, result, processing_time)
         
         logger.info(f"사망률 예측 완료: Task {task_id}, Patient {patient.name}")
         return {
@@ -144,9 +268,7 @@ def predict_stroke_mortality_task(self, patient_id, visit_id, input_data):
     except Exception as e:
         logger.error(f"사망률 예측 실패: {str(e)}")
         if 'prediction_task' in locals():
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = str(e)
-            prediction_task.save()
+            fail_prediction_task(prediction_task, str(e))
         return {'error': str(e)}
 
 @shared_task(bind=True)
@@ -155,13 +277,13 @@ def assess_sod2_status_task(self, patient_id, visit_id, input_data):
     task_id = self.request.id
     
     try:
-        patient = Patient.objects.get(id=patient_id)
-        visit = Visit.objects.get(id=visit_id) if visit_id else None
+        # 환자 정보 가져오기 (방문은 FK 제약으로 검증되므로 따로 조회하지 않음)
+        patient = Patient.objects.only('id', 'name').get(id=patient_id)
         
         prediction_task = PredictionTask.objects.create(
             task_id=task_id,
             patient=patient,
-            visit=visit,
+            visit_id=visit_id or None,
             task_type='SOD2_ASSESSMENT',
             status='PROCESSING',
             input_data=input_data
@@ -172,48 +294,11 @@ def assess_sod2_status_task(self, patient_id, visit_id, input_data):
         processing_time = (timezone.now() - start_time).total_seconds()
         
         if 'error' in result:
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = result['error']
-            prediction_task.save()
+            fail_prediction_task(prediction_task, result['error'])
             return {'error': result['error']}
         
-        prediction_task.predictions = result
-        prediction_task.processing_time = processing_time
-        prediction_task.status = 'COMPLETED'
-        prediction_task.completed_at = timezone.now()
-        prediction_task.save()
-        
-        # SOD2 평가 상세 결과 저장
-        patient_info = result['patient_info']
-        sod2_status = result['sod2_status']
-        exercise_rec = result['exercise_recommendations']
-        
-        SOD2Assessment.objects.create(
-            task=prediction_task,
-            age=patient_info['age'],
-            gender=patient_info['gender'],
-            stroke_type=patient_info['stroke_type'],
-            stroke_date=datetime.now().date(),  # 실제로는 input_data에서 파싱
-            nihss_score=patient_info['nihss_score'],
-            reperfusion_treatment=patient_info['reperfusion_treatment'],
-            reperfusion_time=patient_info.get('reperfusion_time'),
-            hours_after_stroke=patient_info['hours_after_stroke'],
-            current_sod2_level=sod2_status['current_level'],
-            sod2_prediction_data=result['sod2_prediction_data'],
-            oxidative_stress_risk=sod2_status['oxidative_stress_risk'],
-            prediction_confidence=sod2_status['prediction_confidence'],
-            exercise_can_start=exercise_rec['can_start'],
-            exercise_intensity=exercise_rec['intensity'],
-            exercise_start_time=exercise_rec.get('time_until_start'),
-            sod2_target_level=exercise_rec['sod2_target'],
-            age_adjustment_factor=result['personalization_factors']['age_adjustment'],
-            stroke_type_adjustment=result['personalization_factors']['stroke_type_adjustment'],
-            nihss_adjustment=result['personalization_factors']['nihss_adjustment'],
-            reperfusion_timing_adjustment=result['personalization_factors']['reperfusion_timing_adjustment'],
-            clinical_recommendations='\n'.join(result['clinical_recommendations']),
-            exercise_recommendations='\n'.join(exercise_rec['recommended_activities']),
-            monitoring_schedule=exercise_rec['monitoring_schedule']
-        )
+        # 작업 상태 UPDATE 와 SOD2 평가 상세 결과 INSERT 를 한 트랜잭션으로 저장
+        complete_prediction_task(prediction_task, result, processing_time)
         
         logger.info(f"SOD2 평가 완료: Task {task_id}, Patient {patient.name}")
         return {
@@ -226,11 +311,267 @@ def assess_sod2_status_task(self, patient_id, visit_id, input_data):
     except Exception as e:
         logger.error(f"SOD2 평가 실패: {str(e)}")
         if 'prediction_task' in locals():
-            prediction_task.status = 'FAILED'
-            prediction_task.error_message = str(e)
-            prediction_task.save()
+            fail_prediction_task(prediction_task, str(e))
+        return {'error': str(e)}
+
+@shared_task
+def persist_prediction_result_task(task_id, task_type, patient_id, visit_id, input_data, result, processing_time):
+    """동기 모드(?mode=sync)로 이미 계산된 예측 결과를 나중에 저장"""
+    try:
+        patient = Patient.objects.only('id', 'name').get(id=patient_id)
+        
+        if 'error' in result:
+            prediction_task = PredictionTask.objects.create(
+                task_id=task_id,
+                patient=patient,
+                visit_id=visit_id or None,
+                task_type=task_type,
+                status='FAILED',
+                input_data=input_data,
+                error_message=result['error'],
+                processing_time=processing_time
+            )
+            publish_task_event(prediction_task)
+            return {'task_id': task_id, 'status': 'failed'}
+        
+        with transaction.atomic():
+            prediction_task = PredictionTask.objects.create(
+                task_id=task_id,
+                patient=patient,
+                visit_id=visit_id or None,
+                task_type=task_type,
+                status='COMPLETED',
+                input_data=input_data,
+                predictions=result,
+                processing_time=processing_time,
+                completed_at=timezone.now()
+            )
+            RESULT_SAVERS[task_type](prediction_task, result)
+        publish_task_event(prediction_task)
+        
+        logger.info(f"동기 예측 결과 저장 완료: Task {task_id}, Patient {patient.name}")
+        return {'task_id': task_id, 'status': 'completed'}
+        
+    except Exception as e:
+        logger.error(f"동기 예측 결과 저장 실패: {str(e)}")
+        return {'error': str(e)}
+
+# ================================
+# 코호트(병동/방문 목록) 일괄 예측
+# ================================
+COHORT_PROGRESS_PREFIX = 'ml_cohort'
+COHORT_PROGRESS_FIELDS = ['total', 'chunks', 'chunks_done', 'scored', 'failed', 'skipped']
+COHORT_PROGRESS_TTL = 60 * 60 * 24
+
+# 청크 완료 표시(SET NX)와 카운터 증가를 한 번에 - 재전달된 청크는 카운터를 다시 올리지 않음
+_ADVANCE_COHORT_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return -1
+end
+if not redis.call('set', KEYS[2], 1, 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+redis.call('hincrby', KEYS[1], 'chunks_done', 1)
+redis.call('hincrby', KEYS[1], 'scored', ARGV[2])
+redis.call('hincrby', KEYS[1], 'failed', ARGV[3])
+redis.call('hincrby', KEYS[1], 'skipped', ARGV[4])
+return 1
+"""
+
+def _cohort_progress_key(cohort_id):
+    # 웹 프로세스와 모든 워커가 같은 값을 보도록 공유 Redis 해시에 저장
+    return f"{COHORT_PROGRESS_PREFIX}:{cohort_id}:progress"
+
+def _cohort_chunk_done_key(cohort_id, chunk_index):
+    return f"{COHORT_PROGRESS_PREFIX}:{cohort_id}:chunk:{chunk_index}:done"
+
+def _cohort_prediction_task_id(cohort_id, task_type, member):
+    """코호트/작업 유형/환자/방문으로 정해지는 PredictionTask.task_id (재전달된 청크가 같은 행을 다시 만들지 않도록)"""
+    return str(uuid.uuid5(
+        uuid.NAMESPACE_URL,
+        f"{COHORT_PROGRESS_PREFIX}:{cohort_id}:{task_type}:{member['patient_id']}:{member['visit_id']}"
+    ))
+
+def _init_cohort_progress(cohort_id, total, chunks):
+    """진행 상황 카운터를 모두 0 으로 만들고 만료 시간 설정"""
+    key = _cohort_progress_key(cohort_id)
+    counters = {field: 0 for field in COHORT_PROGRESS_FIELDS}
+    counters.update(total=total, chunks=chunks)
+    pipeline = get_redis().pipeline()
+    pipeline.hset(key, mapping=counters)
+    pipeline.expire(key, COHORT_PROGRESS_TTL)
+    pipeline.execute()
+
+def get_cohort_progress(cohort_id):
+    """코호트 예측 진행 상황 (청크 태스크들이 Redis 카운터를 올림), 없으면 None"""
+    values = get_redis().hgetall(_cohort_progress_key(cohort_id))
+    if 'total' not in values:
+        return None
+    
+    progress = {field: int(values.get(field, 0)) for field in COHORT_PROGRESS_FIELDS}
+    progress['cohort_id'] = cohort_id
+    progress['state'] = 'COMPLETED' if progress['chunks_done'] >= progress['chunks'] else 'PROGRESS'
+    progress['progress'] = (
+        (progress['scored'] + progress['failed'] + progress['skipped']) / progress['total']
+        if progress['total'] else 1.0
+    )
+    return progress
+
+def _advance_cohort_progress(cohort_id, chunk_index, scored, failed, skipped):
+    """청크 결과를 진행 상황에 반영 - 청크마다 한 번만 (재전달된 청크는 다시 더하지 않음)
+
+    Redis 오류는 그대로 올려 보내 청크 태스크 실패로 드러나게 합니다.
+    """
+    applied = get_redis().eval(
+        _ADVANCE_COHORT_SCRIPT, 2,
+        _cohort_progress_key(cohort_id), _cohort_chunk_done_key(cohort_id, chunk_index),
+        COHORT_PROGRESS_TTL, scored, failed, skipped
+    )
+    if applied == -1:
+        logger.error(f"코호트 진행 상황이 없거나 만료됨: Cohort {cohort_id}, 청크 {chunk_index} 결과를 반영하지 못함")
+    return get_cohort_progress(cohort_id)
+
+def _saved_cohort_predictions(cohort_id, task_type, members):
+    """이미 저장된 코호트 예측 {환자 인덱스: 상태} (이전 전달에서 저장된 행 포함)"""
+    task_ids = {
+        uuid.UUID(_cohort_prediction_task_id(cohort_id, task_type, member)): i
+        for i, member in enumerate(members)
+    }
+    return {
+        task_ids[task_id]: status
+        for task_id, status in PredictionTask.objects.filter(task_id__in=task_ids).values_list('task_id', 'status')
+    }
+
+@shared_task(bind=True)
+def score_cohort_task(self, department=None, inpatient_only=True, patient_ids=None,
+                      include_mortality=True, chunk_size=None):
+    """코호트 일괄 예측 - 대상 환자를 청크로 나눠 score_cohort_chunk_task 그룹으로 분배
+    
+    여러 워커가 청크를 병렬로 처리하며, 진행 상황은 get_cohort_progress(이 태스크 ID)로 조회합니다.
+    """
+    cohort_id = self.request.id
+    chunk_size = chunk_size or getattr(settings, 'ML_COHORT_CHUNK_SIZE', 200)
+    
+    try:
+        members = select_cohort(department=department, inpatient_only=inpatient_only, patient_ids=patient_ids)
+        chunks = [members[i:i + chunk_size] for i in range(0, len(members), chunk_size)]
+        
+        _init_cohort_progress(cohort_id, len(members), len(chunks))
+        
+        group_id = None
+        if chunks:
+            group_result = group(
+                score_cohort_chunk_task.s(cohort_id, chunk_index, chunk, include_mortality)
+                for chunk_index, chunk in enumerate(chunks)
+            ).apply_async()
+            group_id = group_result.id
+        
+        logger.info(f"코호트 예측 시작: Cohort {cohort_id}, 환자 {len(members)}명, 청크 {len(chunks)}개")
+        return {
+            'cohort_id': cohort_id,
+            'group_id': group_id,
+            'total': len(members),
+            'chunks': len(chunks)
+        }
+        
+    except Exception as e:
+        logger.error(f"코호트 예측 시작 실패: {str(e)}")
         return {'error': str(e)}
 
+@shared_task(bind=True)
+def score_cohort_chunk_task(self, cohort_id, chunk_index, members, include_mortality=True):
+    """코호트 청크 예측 - 입력을 일괄 구성하고 모델별 1회 추론 후 bulk INSERT
+    
+    예측 행의 task_id 는 코호트/작업 유형/환자/방문으로 정해지므로, acks_late 로 재전달된 청크는
+    이미 저장된 환자를 건너뛰고 진행 상황도 청크당 한 번만 올립니다.
+    입력을 만들 수 없는 환자(방문/환자 행 없음)는 skipped 로 집계합니다.
+    """
+    task_types = ['COMPLICATION', 'MORTALITY'] if include_mortality else ['COMPLICATION']
+    # 입력 구성 전에 실패하면 청크 전체를 실패로 집계
+    scorable = list(members)
+    skipped = 0
+    error = None
+    
+    try:
+        patients_data = build_cohort_patient_data(members)
+        pairs = [(member, data) for member, data in zip(members, patients_data) if data is not None]
+        scorable = [member for member, _ in pairs]
+        patients_data = [data for _, data in pairs]
+        skipped = len(members) - len(scorable)
+        
+        predictors = {
+            'COMPLICATION': ml_service.predict_complications_batch,
+            'MORTALITY': ml_service.predict_stroke_mortality_batch,
+        }
+        for task_type in task_types:
+            saved = _saved_cohort_predictions(cohort_id, task_type, scorable)
+            pending = [i for i in range(len(scorable)) if i not in saved]
+            if not pending:
+                continue
+            
+            self.update_state(state='PROGRESS', meta={
+                'cohort_id': cohort_id,
+                'stage': task_type,
+                'patients': len(pending)
+            })
+            
+            start_time = time.time()
+            results = predictors[task_type]([patients_data[i] for i in pending])
+            processing_time = (time.time() - start_time) / len(pending)
+            
+            bulk_save_predictions(task_type, [
+                {
+                    'task_id': _cohort_prediction_task_id(cohort_id, task_type, scorable[i]),
+                    'patient_id': scorable[i]['patient_id'],
+                    'visit_id': scorable[i]['visit_id'],
+                    'input_data': patients_data[i],
+                    'result': result,
+                    'processing_time': processing_time
+                }
+                for i, result in zip(pending, results)
+            ])
+        
+    except Exception as e:
+        logger.error(f"코호트 청크 예측 실패: {str(e)}")
+        error = str(e)
+    
+    # 저장된 행 기준으로 집계 - 오류로 중단된 경우에도 이미 저장된 환자는 실패로 세지 않음
+    failed_patients = set()
+    saved_patients = set()
+    try:
+        for task_type in task_types:
+            for i, status in _saved_cohort_predictions(cohort_id, task_type, scorable).items():
+                saved_patients.add(i)
+                if status == 'FAILED':
+                    failed_patients.add(i)
+    except Exception as e:
+        logger.warning(f"코호트 청크 저장 결과 조회 실패: {e}")
+    failed_patients.update(i for i in range(len(scorable)) if i not in saved_patients)
+    
+    scored = len(scorable) - len(failed_patients)
+    progress = _advance_cohort_progress(cohort_id, chunk_index, scored, len(failed_patients), skipped)
+    if error is not None:
+        return {'error': error, 'cohort_id': cohort_id, 'scored': scored, 'failed': len(failed_patients)}
+    
+    logger.info(
+        f"코호트 청크 예측 완료: Cohort {cohort_id}, 성공 {scored}명, 실패 {len(failed_patients)}명, 제외 {skipped}명"
+    )
+    return {
+        'cohort_id': cohort_id,
+        'scored': scored,
+        'failed': len(failed_patients),
+        'skipped': skipped,
+        'progress': progress
+    }
+
+@shared_task
+def report_worker_memory_task():
+    """이 태스크를 실행한 워커 자식 프로세스의 메모리 리포트"""
+    from .worker import memory_report
+    report = memory_report()
+    report['loaded_models'] = list(ml_service.registry.loaded())
+    return report
+
 @shared_task
 def cleanup_old_tasks():
     """오래된 예측 작업 정리"""
@@ -7,7 +7,15 @@ urlpatterns = [
     path('predict/mortality/', views.predict_stroke_mortality, name='predict_mortality'),
     path('assess/sod2/', views.assess_sod2_status, name='assess_sod2'),
     
-    # 작업 결과 조회
+    # 작업 결과 조회 (wait/ 는 완료될 때까지 대기하는 long-poll / SSE)
+    path('tasks/wait/', views.wait_for_tasks, name='wait_for_tasks'),
     path('tasks/<str:task_id>/', views.get_task_result, name='get_task_result'),
     path('patients/<int:patient_id>/tasks/', views.list_patient_tasks, name='list_patient_tasks'),
+    
+    # 코호트 일괄 예측
+    path('cohorts/score/', views.score_cohort, name='score_cohort'),
+    path('cohorts/<str:cohort_id>/', views.get_cohort_status, name='get_cohort_status'),
+    
+    # 모델 로드 상태
+    path('models/status/', views.model_registry_status, name='model_registry_status'),
 ]
\ No newline at end of file
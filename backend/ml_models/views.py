@@ -1,17 +1,122 @@
 # backend/ml_models/views.py (새 파일 생성)
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from .tasks import predict_complications_task, predict_stroke_mortality_task, assess_sod2_status_task
+from .tasks import (
+    predict_complications_task, predict_stroke_mortality_task, assess_sod2_status_task,
+    persist_prediction_result_task, score_cohort_task, get_cohort_progress
+)
 from .models import PredictionTask
+from .ml_service import ml_service
+from .task_events import iter_task_results, task_result_payload
 from patients.models import Patient, Visit
-from celery.result import AsyncResult
+from core.pagination import COUNT_MODES, InvalidCursor, count_rows, keyset_page
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import json
 import logging
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# 동기 모드(?mode=sync) 예측 실행용 스레드 풀 - 시간 예산을 넘기면 결과를 기다리지 않고 비동기로 전환
+_sync_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ML_SYNC_MAX_WORKERS', 4),
+    thread_name_prefix='ml-sync'
+)
+
+SYNC_PREDICTORS = {
+    'COMPLICATION': ml_service.predict_complications,
+    'MORTALITY': ml_service.predict_stroke_mortality,
+    'SOD2_ASSESSMENT': ml_service.assess_sod2_status,
+}
+
+def _sync_mode_requested(request):
+    """?mode=sync 요청이고 ML_SYNC_PREDICTION_ENABLED 가 켜져 있을 때만 프로세스 내 예측
+
+    동기 모드는 웹 프로세스에 모델을 로드하므로 기본값은 꺼져 있으며, 꺼져 있으면 기존 비동기 경로로 처리합니다.
+    """
+    return request.query_params.get('mode') == 'sync' and getattr(settings, 'ML_SYNC_PREDICTION_ENABLED', False)
+
+def _sync_budget(request):
+    """?timeout=초 (기본 ML_SYNC_TIMEOUT, 최대 ML_SYNC_MAX_TIMEOUT 으로 제한)"""
+    default = getattr(settings, 'ML_SYNC_TIMEOUT', 2.0)
+    max_budget = getattr(settings, 'ML_SYNC_MAX_TIMEOUT', 10.0)
+    try:
+        budget = float(request.query_params.get('timeout', default))
+    except ValueError:
+        budget = default
+    if not budget >= 0:  # NaN
+        budget = default
+    return min(budget, max_budget)
+
+def _persist_sync_prediction(task_id, task_type, patient_id, visit_id, patient_data, result, processing_time):
+    """동기 모드 결과 저장 요청 (get_task_result 로 같은 task_id 조회 가능)"""
+    try:
+        persist_prediction_result_task.delay(
+            task_id, task_type, patient_id, visit_id, patient_data, result, processing_time
+        )
+    except Exception as e:
+        logger.error(f"동기 예측 결과 저장 요청 실패: {str(e)}")
+
+def _run_sync_prediction(request, task_type, patient, visit_id, patient_data):
+    """Celery 를 거치지 않고 프로세스 내에서 바로 예측 후 결과 반환
+
+    시간 예산(?timeout=초, 기본 ML_SYNC_TIMEOUT) 안에 끝나지 않으면 진행 중인 예측을 그대로 두고
+    202 를 반환합니다. 예측이 끝나면 같은 task_id 로 저장되므로 작업을 다시 실행하지 않습니다.
+    PredictionTask 저장은 persist_prediction_result_task 로 미룹니다.
+    """
+    budget = _sync_budget(request)
+    task_id = str(uuid.uuid4())
+    start_time = time.time()
+    future = _sync_executor.submit(SYNC_PREDICTORS[task_type], patient_data)
+    try:
+        result = future.result(timeout=budget)
+    except FutureTimeoutError:
+        logger.warning(f"동기 예측 시간 초과 ({budget}s) - 완료 후 백그라운드 저장: {task_type}, Patient {patient.id}")
+        
+        def persist_when_done(done_future):
+            error = done_future.exception()
+            _persist_sync_prediction(
+                task_id, task_type, patient.id, visit_id, patient_data,
+                {'error': str(error)} if error is not None else done_future.result(),
+                time.time() - start_time
+            )
+        
+        future.add_done_callback(persist_when_done)
+        return Response({
+            'task_id': task_id,
+            'status': 'processing',
+            'mode': 'async',
+            'message': f'{budget}초 안에 완료되지 않아 비동기 처리로 전환되었습니다.',
+            'patient': patient.name
+        }, status=status.HTTP_202_ACCEPTED)
+    processing_time = time.time() - start_time
+    
+    # 결과 저장은 백그라운드로
+    _persist_sync_prediction(task_id, task_type, patient.id, visit_id, patient_data, result, processing_time)
+    
+    if 'error' in result:
+        return Response({'task_id': task_id, 'status': 'failed', 'mode': 'sync', 'error': result['error']},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'task_id': task_id,
+        'status': 'completed',
+        'mode': 'sync',
+        'results': result,
+        'processing_time': processing_time,
+        'patient': patient.name
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def predict_complications(request):
@@ -27,6 +132,10 @@ def predict_complications(request):
         # 환자 존재 확인
         patient = get_object_or_404(Patient, id=patient_id)
         
+        # ?mode=sync (ML_SYNC_PREDICTION_ENABLED): 프로세스 내 즉시 예측
+        if _sync_mode_requested(request):
+            return _run_sync_prediction(request, 'COMPLICATION', patient, visit_id, patient_data)
+        
         # 비동기 작업 시작
         task = predict_complications_task.delay(patient_id, visit_id, patient_data)
         
@@ -55,6 +164,10 @@ def predict_stroke_mortality(request):
         
         patient = get_object_or_404(Patient, id=patient_id)
         
+        # ?mode=sync (ML_SYNC_PREDICTION_ENABLED): 프로세스 내 즉시 예측
+        if _sync_mode_requested(request):
+            return _run_sync_prediction(request, 'MORTALITY', patient, visit_id, patient_data)
+        
         task = predict_stroke_mortality_task.delay(patient_id, visit_id, patient_data)
         
         return Response({
@@ -82,6 +195,10 @@ def assess_sod2_status(request):
         
         patient = get_object_or_404(Patient, id=patient_id)
         
+        # ?mode=sync (ML_SYNC_PREDICTION_ENABLED): 프로세스 내 즉시 예측
+        if _sync_mode_requested(request):
+            return _run_sync_prediction(request, 'SOD2_ASSESSMENT', patient, visit_id, patient_data)
+        
         task = assess_sod2_status_task.delay(patient_id, visit_id, patient_data)
         
         return Response({
@@ -100,46 +217,126 @@ def assess_sod2_status(request):
 def get_task_result(request, task_id):
     """작업 결과 조회 API"""
     try:
-        # Celery 결과 확인
-        celery_result = AsyncResult(task_id)
-        
-        # 데이터베이스에서 작업 기록 확인
+        # 데이터베이스에서 작업 기록 확인 (환자 이름까지 쿼리 1회)
         try:
-            prediction_task = PredictionTask.objects.get(task_id=task_id)
-        except PredictionTask.DoesNotExist:
+            prediction_task = PredictionTask.objects.select_related('patient').get(task_id=task_id)
+        except (PredictionTask.DoesNotExist, ValidationError):
             return Response({'error': '작업을 찾을 수 없습니다.'}, status=status.HTTP_404_NOT_FOUND)
         
-        response_data = {
-            'task_id': task_id,
-            'status': prediction_task.status.lower(),
-            'task_type': prediction_task.task_type,
-            'patient': prediction_task.patient.name,
-            'created_at': prediction_task.created_at,
-            'processing_time': prediction_task.processing_time
-        }
+        return Response(task_result_payload(prediction_task))
+        
+    except Exception as e:
+        logger.error(f"작업 결과 조회 실패: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class EventStreamRenderer(BaseRenderer):
+    """Accept: text/event-stream 요청이 콘텐츠 협상(406)에서 막히지 않도록 하는 렌더러
+
+    정상 응답은 StreamingHttpResponse 로 직접 보내므로, 여기서는 오류 응답만 SSE 'error' 이벤트로 변환합니다.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n".encode(self.charset)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
+def wait_for_tasks(request):
+    """여러 작업의 완료를 기다리는 API (Redis pub/sub 알림 기반)
+    
+    ?ids=<task_id>,<task_id>&timeout=초
+    - 기본: long-poll. 모든 작업이 끝나거나 timeout 이 지나면 {'results', 'pending'} 반환
+    - ?stream=1 또는 Accept: text/event-stream: 작업이 끝날 때마다 SSE 'result' 이벤트 전송
+    """
+    try:
+        task_ids = [task_id.strip() for task_id in request.query_params.get('ids', '').split(',') if task_id.strip()]
+        if not task_ids:
+            return Response({'error': '작업 ID가 필요합니다.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if prediction_task.status == 'COMPLETED':
-            response_data['results'] = prediction_task.predictions
-            response_data['completed_at'] = prediction_task.completed_at
-        elif prediction_task.status == 'FAILED':
-            response_data['error'] = prediction_task.error_message
+        max_ids = getattr(settings, 'ML_TASK_WAIT_MAX_IDS', 50)
+        if len(task_ids) > max_ids:
+            return Response({'error': f'한 번에 최대 {max_ids}개 작업까지 기다릴 수 있습니다.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            task_ids = list(dict.fromkeys(str(uuid.UUID(task_id)) for task_id in task_ids))
+        except ValueError:
+            return Response({'error': '올바르지 않은 작업 ID입니다.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(response_data)
+        max_timeout = getattr(settings, 'ML_TASK_WAIT_TIMEOUT', 25)
+        try:
+            timeout = min(float(request.query_params.get('timeout', max_timeout)), max_timeout)
+        except ValueError:
+            timeout = max_timeout
+        
+        # EventSource 는 Accept: text/event-stream 을 보내므로 EventStreamRenderer 가 선택됨
+        stream = request.query_params.get('stream') == '1' or \
+            getattr(request.accepted_renderer, 'format', None) == EventStreamRenderer.format
+        if stream:
+            response = StreamingHttpResponse(
+                _task_event_stream(task_ids, timeout), content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
+        results = {}
+        for event in iter_task_results(task_ids, timeout):
+            if event is not None:
+                task_id, payload = event
+                results[task_id] = payload
+        
+        return Response({
+            'results': results,
+            'pending': [task_id for task_id in task_ids if task_id not in results]
+        })
         
     except Exception as e:
-        logger.error(f"작업 결과 조회 실패: {str(e)}")
+        logger.error(f"작업 완료 대기 실패: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _task_event_stream(task_ids, timeout):
+    """SSE 스트림 - 작업마다 'result' 이벤트, 마지막에 남은 작업 목록과 함께 'end' 이벤트"""
+    finished = set()
+    for event in iter_task_results(task_ids, timeout):
+        if event is None:
+            yield ': keepalive\n\n'
+            continue
+        task_id, payload = event
+        finished.add(task_id)
+        yield f"event: result\nid: {task_id}\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n"
+    
+    pending = [task_id for task_id in task_ids if task_id not in finished]
+    yield f"event: end\ndata: {json.dumps({'pending': pending})}\n\n"
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_patient_tasks(request, patient_id):
-    """환자별 작업 목록 조회"""
+    """환자별 작업 목록 조회 - (created_at, id) 역순 키셋 페이지네이션
+
+    ?limit= (기본 50, 최대 ML_TASK_LIST_MAX_LIMIT), ?cursor= (이전 응답의 next_cursor),
+    ?count=exact|approx|none (기본: 첫 페이지 exact, 커서 페이지 none)
+    """
     try:
         patient = get_object_or_404(Patient, id=patient_id)
-        tasks = PredictionTask.objects.filter(patient=patient).order_by('-created_at')
+        try:
+            limit = min(int(request.GET.get('limit', 50)), getattr(settings, 'ML_TASK_LIST_MAX_LIMIT', 200))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.GET.get('cursor') or None
+        count_mode = request.GET.get('count', 'none' if cursor else 'exact')
+        if count_mode not in COUNT_MODES:
+            return Response({'error': f"count must be one of {', '.join(COUNT_MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = PredictionTask.objects.filter(patient=patient).only(
+            'id', 'task_id', 'task_type', 'status', 'created_at', 'completed_at', 'processing_time'
+        )
+        page, next_cursor = keyset_page(tasks, ['-created_at', '-id'], cursor=cursor, limit=max(limit, 1))
         
         task_list = []
-        for task in tasks:
+        for task in page:
             task_data = {
                 'task_id': str(task.task_id),
                 'task_type': task.task_type,
@@ -154,9 +351,59 @@ def list_patient_tasks(request, patient_id):
         return Response({
             'patient': patient.name,
             'tasks': task_list,
-            'total_count': len(task_list)
+            'total_count': count_rows(tasks, count_mode),
+            'next_cursor': next_cursor
         })
         
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"환자 작업 목록 조회 실패: {str(e)}")
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def score_cohort(request):
+    """코호트 일괄 예측 API (진료과 / 진행 중인 입원 방문 / 환자 ID 목록)"""
+    try:
+        task = score_cohort_task.delay(
+            department=request.data.get('department') or None,
+            inpatient_only=request.data.get('inpatient_only', True),
+            patient_ids=request.data.get('patient_ids') or None,
+            include_mortality=request.data.get('include_mortality', True)
+        )
+        
+        return Response({
+            'cohort_id': task.id,
+            'status': 'processing',
+            'message': '코호트 일괄 예측이 시작되었습니다.'
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except Exception as e:
+        logger.error(f"코호트 예측 요청 실패: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_cohort_status(request, cohort_id):
+    """코호트 일괄 예측 진행 상황 조회"""
+    try:
+        progress = get_cohort_progress(cohort_id)
+        if progress is None:
+            return Response({'error': '코호트 작업을 찾을 수 없습니다.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(progress)
+        
+    except Exception as e:
+        logger.error(f"코호트 진행 상황 조회 실패: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def model_registry_status(request):
+    """ML 모델 로드 상태 조회 (이 프로세스 기준)"""
+    try:
+        return Response(ml_service.registry.status())
+        
+    except Exception as e:
+        logger.error(f"모델 상태 조회 실패: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
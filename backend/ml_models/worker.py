@@ -0,0 +1,73 @@
+# backend/ml_models/worker.py - Celery prefork 워커용 모델 사전 로드 / 메모리 리포트
+import gc
+import os
+import logging
+from typing import Dict
+
+from .model_registry import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# /proc/self/smaps_rollup 에서 읽을 항목 (kB)
+SMAPS_FIELDS = {
+    'Rss': 'rss_bytes',
+    'Pss': 'pss_bytes',
+    'Shared_Clean': 'shared_clean_bytes',
+    'Shared_Dirty': 'shared_dirty_bytes',
+    'Private_Clean': 'private_clean_bytes',
+    'Private_Dirty': 'private_dirty_bytes',
+}
+
+
+def memory_report() -> Dict[str, int]:
+    """현재 프로세스의 메모리 사용량 (공유/전용 페이지 구분)
+
+    prefork 자식 프로세스에서 shared_* 는 부모와 copy-on-write 로 공유 중인 페이지,
+    private_* 는 이 자식만 가진 페이지입니다. pss_bytes 는 공유 페이지를 프로세스 수로
+    나눠 합산한 값이라 자식별 실제 부담을 가장 잘 나타냅니다.
+    """
+    report = {'pid': os.getpid(), 'ppid': os.getppid()}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in SMAPS_FIELDS:
+                    report[SMAPS_FIELDS[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        # smaps_rollup 이 없는 환경(Linux 4.14 미만, macOS 등)에서는 RSS 만 보고
+        report['rss_bytes'] = current_rss_bytes()
+    return report
+
+
+def preload_models_for_fork():
+    """부모 프로세스에서 모든 모델을 로드한 뒤 fork 하도록 준비
+
+    gc.freeze() 로 로드된 객체를 영구 세대로 옮겨, 자식의 GC 가 객체 헤더를 건드려
+    공유 페이지가 복사되는 것을 막습니다.
+    """
+    from .ml_service import ml_service
+
+    status = ml_service.registry.preload()
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"ML 모델 사전 로드 완료 (pid={status['pid']}, 모델 {status['loaded_count']}개, "
+        f"RSS {status['process_rss_bytes'] / 1024 / 1024:.1f}MB) - 자식 프로세스와 copy-on-write 공유"
+    )
+    return status
+
+
+def log_child_memory():
+    """fork 직후 자식 프로세스의 메모리 리포트 기록"""
+    report = memory_report()
+
+    def mb(key):
+        return report.get(key, 0) / 1024 / 1024
+
+    logger.info(
+        f"워커 자식 프로세스 메모리 (pid={report['pid']}, parent={report['ppid']}): "
+        f"RSS {mb('rss_bytes'):.1f}MB, PSS {mb('pss_bytes'):.1f}MB, "
+        f"shared {mb('shared_clean_bytes') + mb('shared_dirty_bytes'):.1f}MB, "
+        f"private {mb('private_clean_bytes') + mb('private_dirty_bytes'):.1f}MB"
+    )
+    return report
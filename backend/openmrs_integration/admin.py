@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import OpenMRSSyncCheckpoint, OpenMRSSyncRun
 
-# Register your models here.
+@admin.register(OpenMRSSyncCheckpoint)
+class OpenMRSSyncCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['resource', 'query', 'high_water_mark', 'last_synced_at', 'updated_at']
+    search_fields = ['query']
+
+@admin.register(OpenMRSSyncRun)
+class OpenMRSSyncRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'resource', 'query', 'trigger', 'status', 'start_index', 'next_start_index',
+                    'pages_processed', 'rows_fetched', 'rows_created', 'rows_updated', 'rows_failed',
+                    'duration_seconds', 'started_at']
+    list_filter = ['resource', 'trigger', 'status', 'started_at']
+    search_fields = ['query', 'job_id', 'error_message']
+    readonly_fields = [field.name for field in OpenMRSSyncRun._meta.fields]
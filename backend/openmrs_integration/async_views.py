@@ -0,0 +1,136 @@
+# openmrs_integration/async_views.py - ASGI 로 실행할 때 OpenMRS 응답을 기다리며 스레드를 점유하지 않는 비동기 뷰
+# DRF 3.14 의 @api_view 는 async 함수를 지원하지 않으므로 Django 비동기 뷰 + JsonResponse 로 작성
+# (응답 형식은 views.py 의 같은 이름 뷰와 동일)
+import functools
+import uuid
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from core.openmrs_async import async_openmrs_client
+from core.pagination import COUNT_MODES, InvalidCursor
+from .models import OpenMRSPatient
+from .tasks import trigger_openmrs_patient_sync
+from .utils import OPENMRS_FULL_REPRESENTATION, parse_openmrs_patient, get_local_patient_list
+from .views import _list_paging_params
+
+
+def require_GET(view_func):
+    # django.views.decorators.http.require_GET 는 Django 5.0 전까지 async 뷰를 감싸지 못함
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+def _int_param(request, name, default):
+    try:
+        return int(request.GET.get(name, default))
+    except ValueError:
+        return default
+
+@require_GET
+async def get_django_patient_list_only_async(request):
+    query = request.GET.get('q', '')
+    limit = _int_param(request, 'limit', 50)
+    start_index = _int_param(request, 'startIndex', 0)
+    cursor, count_mode = _list_paging_params(request)
+    if count_mode not in COUNT_MODES:
+        return JsonResponse({'error': f"count must be one of {', '.join(COUNT_MODES)}"}, status=400)
+
+    try:
+        patients_data, total_count, next_cursor = await sync_to_async(get_local_patient_list)(
+            query, start_index, limit, cursor=cursor, count=count_mode
+        )
+        return JsonResponse({'results': patients_data, 'totalCount': total_count, 'nextCursor': next_cursor})
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        print(f"Django Async View (get_django_patient_list_only_async): Error - {type(e).__name__}: {e}")
+        return JsonResponse({'error': f'Error fetching from Django DB: {str(e)}'}, status=500)
+
+@require_GET
+async def get_patients_and_sync_from_openmrs_async(request):
+    sync_query = request.GET.get('sync_q', getattr(settings, 'DEFAULT_OPENMRS_SYNC_QUERY', "1000"))
+    sync_error_detail = None
+    sync_job = {'job_id': None, 'status': 'error', 'last_synced_at': None}
+    try:
+        sync_job = await sync_to_async(trigger_openmrs_patient_sync)(
+            sync_query,
+            limit_per_call=_int_param(request, 'sync_limit', 50),
+            max_total_to_sync=_int_param(request, 'sync_max', 200)
+        )
+    except Exception as e:
+        sync_error_detail = f"Error triggering OpenMRS sync: {str(e)}"
+        print(f"Django Async View (get_patients_and_sync_from_openmrs_async): {sync_error_detail}")
+
+    cursor, count_mode = _list_paging_params(request)
+    if count_mode not in COUNT_MODES:
+        return JsonResponse({'error': f"count must be one of {', '.join(COUNT_MODES)}"}, status=400)
+    try:
+        patients_data, total_count, next_cursor = await sync_to_async(get_local_patient_list)(
+            request.GET.get('q', ''), _int_param(request, 'startIndex', 0), _int_param(request, 'limit', 50),
+            cursor=cursor, count=count_mode
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e), 'sync_error_detail': sync_error_detail}, status=400)
+    except Exception as e:
+        print(f"Django Async View (get_patients_and_sync_from_openmrs_async): Error fetching from local DB: {e}")
+        return JsonResponse({'error': f'Error fetching list from Django DB: {str(e)}', 'sync_error_detail': sync_error_detail}, status=500)
+
+    response_payload = {
+        'results': patients_data, 'totalCount': total_count, 'nextCursor': next_cursor,
+        'sync_job_id': sync_job['job_id'], 'sync_status': sync_job['status'],
+        'last_synced_at': sync_job['last_synced_at']
+    }
+    if sync_error_detail: response_payload['sync_error_detail'] = sync_error_detail
+    return JsonResponse(response_payload)
+
+@require_GET
+async def get_openmrs_patient_detail_async(request, patient_uuid):
+    try:
+        valid_uuid = uuid.UUID(str(patient_uuid))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid UUID format provided.'}, status=400)
+
+    patient_model_instance = await OpenMRSPatient.objects.filter(uuid=valid_uuid).only(
+        'raw_openmrs_data', 'openmrs_representation'
+    ).afirst()
+    if patient_model_instance is not None and isinstance(patient_model_instance.raw_openmrs_data, dict) \
+            and patient_model_instance.raw_openmrs_data \
+            and patient_model_instance.openmrs_representation in (None, '', OPENMRS_FULL_REPRESENTATION):
+        return JsonResponse(patient_model_instance.raw_openmrs_data)
+
+    try:
+        response_from_omrs = await async_openmrs_client.get(
+            f"patient/{valid_uuid}", params={'v': OPENMRS_FULL_REPRESENTATION}, timeout=10
+        )
+        response_from_omrs.raise_for_status()
+        openmrs_patient_data = response_from_omrs.json()
+    except httpx.HTTPStatusError as err:
+        if err.response.status_code == 404:
+            return JsonResponse({'error': f'Patient (UUID: {patient_uuid}) not found in OpenMRS.'}, status=404)
+        print(f"Django Async View (get_openmrs_patient_detail_async): HTTP error - {err} - Detail (first 500 chars): {err.response.text[:500]}")
+        return JsonResponse({
+            'error': f'Error fetching detail from OpenMRS: {err.response.status_code} {err.response.reason_phrase}',
+            'detail': err.response.text
+        }, status=err.response.status_code)
+    except httpx.HTTPError as req_err:
+        print(f"Django Async View (get_openmrs_patient_detail_async): Network error - {req_err}")
+        return JsonResponse({'error': f'Network error connecting to OpenMRS: {str(req_err)}'}, status=503)
+    except ValueError as json_err:
+        return JsonResponse({'error': f'Failed to parse OpenMRS response as JSON: {json_err}'}, status=500)
+
+    # Django DB 저장 로직 (views.get_openmrs_patient_detail 과 같이 content_hash 는 유지)
+    try:
+        patient_fields = parse_openmrs_patient(openmrs_patient_data, OPENMRS_FULL_REPRESENTATION)
+        patient_fields.pop('uuid')
+        patient_fields.pop('content_hash')
+        await OpenMRSPatient.objects.aupdate_or_create(uuid=valid_uuid, defaults=patient_fields)
+    except Exception as db_error:
+        print(f"Django Async View (get_openmrs_patient_detail_async): Error saving/updating patient {valid_uuid} to Django DB: {type(db_error).__name__} - {db_error}")
+
+    return JsonResponse(openmrs_patient_data)
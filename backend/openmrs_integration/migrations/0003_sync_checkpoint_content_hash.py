@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0002_alter_openmrspatient_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openmrspatient',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of raw_openmrs_data (unchanged rows are not rewritten)', max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='OpenMRSSyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(help_text='OpenMRS REST resource (e.g. patient)', max_length=50)),
+                ('query', models.CharField(blank=True, default='', help_text='Search query used for the sync', max_length=255)),
+                ('high_water_mark', models.DateTimeField(blank=True, help_text='Latest auditInfo dateCreated/dateChanged seen', null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, help_text='Start time of the last successful sync run', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'OpenMRS Sync Checkpoint',
+                'verbose_name_plural': 'OpenMRS Sync Checkpoints',
+                'unique_together': {('resource', 'query')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 16:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0003_sync_checkpoint_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenMRSSyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(default='patient', help_text='OpenMRS REST resource (e.g. patient)', max_length=50)),
+                ('query', models.CharField(blank=True, default='', help_text='Search query used for the sync', max_length=255)),
+                ('trigger', models.CharField(choices=[('SCHEDULED', 'Scheduled (Celery Beat)'), ('ON_DEMAND', 'On demand')], default='SCHEDULED', max_length=20)),
+                ('job_id', models.CharField(blank=True, default='', help_text='Celery task id', max_length=255)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('INTERRUPTED', 'Interrupted')], default='RUNNING', max_length=20)),
+                ('start_index', models.PositiveIntegerField(default=0, help_text='startIndex this run began at')),
+                ('next_start_index', models.PositiveIntegerField(default=0, help_text='startIndex of the first page not yet committed')),
+                ('max_total', models.PositiveIntegerField(blank=True, help_text='Upper bound on rows for the whole sync (from startIndex 0)', null=True)),
+                ('high_water_mark', models.DateTimeField(blank=True, help_text='Latest auditInfo timestamp seen so far in this sync', null=True)),
+                ('pages_processed', models.PositiveIntegerField(default=0)),
+                ('rows_fetched', models.PositiveIntegerField(default=0)),
+                ('rows_created', models.PositiveIntegerField(default=0)),
+                ('rows_updated', models.PositiveIntegerField(default=0)),
+                ('rows_unchanged', models.PositiveIntegerField(default=0)),
+                ('rows_skipped', models.PositiveIntegerField(default=0)),
+                ('rows_failed', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('resumed_from', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumed_by', to='openmrs_integration.openmrssyncrun')),
+            ],
+            options={
+                'verbose_name': 'OpenMRS Sync Run',
+                'verbose_name_plural': 'OpenMRS Sync Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='openmrssyncrun',
+            index=models.Index(fields=['resource', 'query', 'status'], name='openmrs_int_resourc_5f9000_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_list_projection(apps, schema_editor):
+    """기존 환자 행의 list_projection 채우기 (content_hash 가 같으면 동기화가 다시 쓰지 않으므로)"""
+    from openmrs_integration.utils import build_patient_list_projection
+
+    OpenMRSPatient = apps.get_model('openmrs_integration', 'OpenMRSPatient')
+    columns = ['uuid', 'raw_openmrs_data', 'display_name', 'identifier', 'given_name', 'family_name', 'gender', 'birthdate']
+    batch = []
+    for patient in OpenMRSPatient.objects.filter(list_projection__isnull=True).only(*columns).iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        patient.list_projection = build_patient_list_projection({column: getattr(patient, column) for column in columns})
+        batch.append(patient)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            OpenMRSPatient.objects.bulk_update(batch, ['list_projection'])
+            batch = []
+    if batch:
+        OpenMRSPatient.objects.bulk_update(batch, ['list_projection'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0004_sync_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openmrspatient',
+            name='list_projection',
+            field=models.JSONField(blank=True, help_text='List API row (display, identifiers, person) computed at sync time', null=True),
+        ),
+        migrations.RunPython(backfill_list_projection, migrations.RunPython.noop),
+    ]
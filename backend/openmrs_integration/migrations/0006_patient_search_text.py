@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 500
+SEARCH_INDEX_NAME = 'omrs_patient_search_trgm'
+
+
+def backfill_search_text(apps, schema_editor):
+    from openmrs_integration.utils import OPENMRS_PATIENT_SEARCH_FIELDS, build_patient_search_text
+
+    OpenMRSPatient = apps.get_model('openmrs_integration', 'OpenMRSPatient')
+    batch = []
+    for patient in OpenMRSPatient.objects.only('uuid', *OPENMRS_PATIENT_SEARCH_FIELDS).iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        patient.search_text = build_patient_search_text({field: getattr(patient, field) for field in OPENMRS_PATIENT_SEARCH_FIELDS})
+        batch.append(patient)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            OpenMRSPatient.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        OpenMRSPatient.objects.bulk_update(batch, ['search_text'])
+
+
+def create_search_index(apps, schema_editor):
+    """PostgreSQL 에서만 pg_trgm 확장과 search_text GIN 인덱스 생성 (SQLite 등은 건너뜀)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} '
+        'ON openmrs_integration_openmrspatient USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0005_patient_list_projection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openmrspatient',
+            name='search_text',
+            field=models.TextField(blank=True, help_text='Lowercased name/identifier text for search (pg_trgm GIN index on PostgreSQL)', null=True),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 16:36
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0006_patient_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='openmrspatient',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('display_name', models.Value('')), models.F('uuid'), name='omrs_patient_list_order_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openmrs_integration', '0007_keyset_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openmrspatient',
+            name='openmrs_representation',
+            field=models.CharField(blank=True, help_text='OpenMRS representation (v=...) raw_openmrs_data was fetched with (empty: full)', max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='openmrspatient',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the synced OpenMRS payload (unchanged rows are not rewritten)', max_length=64, null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 # openmrs_integration/models.py
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 import uuid # UUID 필드를 위해
 
 class OpenMRSPatient(models.Model):
@@ -11,6 +13,10 @@ class OpenMRSPatient(models.Model):
     gender = models.CharField(max_length=10, blank=True, null=True)
     birthdate = models.DateField(blank=True, null=True)
     raw_openmrs_data = models.JSONField(blank=True, null=True, help_text="Raw patient data from OpenMRS as JSON")
+    search_text = models.TextField(blank=True, null=True, help_text="Lowercased name/identifier text for search (pg_trgm GIN index on PostgreSQL)")
+    list_projection = models.JSONField(blank=True, null=True, help_text="List API row (display, identifiers, person) computed at sync time")
+    content_hash = models.CharField(max_length=64, blank=True, null=True, help_text="SHA-256 of the synced OpenMRS payload (unchanged rows are not rewritten)")
+    openmrs_representation = models.CharField(max_length=255, blank=True, null=True, help_text="OpenMRS representation (v=...) raw_openmrs_data was fetched with (empty: full)")
     created_at = models.DateTimeField(auto_now_add=True) # Django DB에 처음 저장된 시간
     updated_at = models.DateTimeField(auto_now=True)   # Django DB에서 마지막으로 업데이트된 시간
 
@@ -20,4 +26,76 @@ class OpenMRSPatient(models.Model):
     class Meta:
         verbose_name = "OpenMRS Patient Record"
         verbose_name_plural = "OpenMRS Patient Records"
-        ordering = ['family_name', 'given_name']
\ No newline at end of file
+        ordering = ['family_name', 'given_name']
+        indexes = [
+            # 목록 API 키셋 페이지네이션 정렬 키 (sort_name, uuid)
+            models.Index(Coalesce('display_name', Value('')), F('uuid'), name='omrs_patient_list_order_idx'),
+        ]
+
+
+class OpenMRSSyncCheckpoint(models.Model):
+    """리소스/검색어별 증분 동기화 기준점 (마지막 성공 실행까지 본 auditInfo 최대 시각)"""
+    resource = models.CharField(max_length=50, help_text="OpenMRS REST resource (e.g. patient)")
+    query = models.CharField(max_length=255, blank=True, default='', help_text="Search query used for the sync")
+    high_water_mark = models.DateTimeField(blank=True, null=True, help_text="Latest auditInfo dateCreated/dateChanged seen")
+    last_synced_at = models.DateTimeField(blank=True, null=True, help_text="Start time of the last successful sync run")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.resource} '{self.query}' @ {self.high_water_mark}"
+
+    class Meta:
+        verbose_name = "OpenMRS Sync Checkpoint"
+        verbose_name_plural = "OpenMRS Sync Checkpoints"
+        unique_together = ['resource', 'query']
+
+
+class OpenMRSSyncRun(models.Model):
+    """동기화 실행 이력 + 재개용 페이지 커서 (페이지가 커밋될 때마다 next_start_index 갱신)"""
+    TRIGGER_CHOICES = [
+        ('SCHEDULED', 'Scheduled (Celery Beat)'),
+        ('ON_DEMAND', 'On demand'),
+    ]
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+        ('INTERRUPTED', 'Interrupted'),
+    ]
+
+    resource = models.CharField(max_length=50, default='patient', help_text="OpenMRS REST resource (e.g. patient)")
+    query = models.CharField(max_length=255, blank=True, default='', help_text="Search query used for the sync")
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='SCHEDULED')
+    job_id = models.CharField(max_length=255, blank=True, default='', help_text="Celery task id")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    resumed_from = models.ForeignKey('self', on_delete=models.SET_NULL, blank=True, null=True, related_name='resumed_by')
+
+    start_index = models.PositiveIntegerField(default=0, help_text="startIndex this run began at")
+    next_start_index = models.PositiveIntegerField(default=0, help_text="startIndex of the first page not yet committed")
+    max_total = models.PositiveIntegerField(blank=True, null=True, help_text="Upper bound on rows for the whole sync (from startIndex 0)")
+    high_water_mark = models.DateTimeField(blank=True, null=True, help_text="Latest auditInfo timestamp seen so far in this sync")
+
+    pages_processed = models.PositiveIntegerField(default=0)
+    rows_fetched = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_unchanged = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True, default='')
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_seconds = models.FloatField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.resource} '{self.query}' {self.status} @ {self.started_at}"
+
+    class Meta:
+        verbose_name = "OpenMRS Sync Run"
+        verbose_name_plural = "OpenMRS Sync Runs"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['resource', 'query', 'status']),
+        ]
@@ -0,0 +1,196 @@
+# backend/openmrs_integration/tasks.py
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from core.openmrs_sync import sync
+from core.redis_client import acquire_lock, extend_lock, lock_owner, release_lock
+from patients.models import Patient
+from .models import OpenMRSSyncCheckpoint, OpenMRSSyncRun
+from .utils import run_openmrs_patient_sync
+import hashlib
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# 검색어별 동기화 잠금 (실행 중인 동기화 job id 저장) - 웹 프로세스가 잡고 openmrs_sync 워커가 해제하므로
+# 프로세스별 Django 캐시가 아니라 공유 Redis(settings.REDIS_URL)에 둡니다.
+SYNC_LOCK_PREFIX = 'openmrs_sync_lock'
+
+_LOG_LEVELS = {'ERROR': logging.ERROR, 'WARNING': logging.WARNING}
+
+
+def _sync_lock_key(query_term):
+    # 검색어에 공백 등이 들어갈 수 있으므로 해시로 키 생성
+    return f"{SYNC_LOCK_PREFIX}:{hashlib.md5((query_term or '').encode('utf-8')).hexdigest()}"
+
+
+def _acquire_sync_lock(lock_key, job_id):
+    """검색어별 잠금 획득 - 워커 재시작으로 같은 job 이 다시 전달된 경우 기존 잠금을 이어서 사용"""
+    return acquire_lock(lock_key, job_id, getattr(settings, 'OPENMRS_SYNC_LOCK_TIMEOUT', 900))
+
+
+def _release_sync_lock(lock_key, job_id):
+    # 이 job 이 잡은 잠금일 때만 해제 (만료 후 다른 job 이 잡은 잠금은 유지)
+    release_lock(lock_key, job_id)
+
+
+def get_last_synced_at(query_term):
+    """검색어의 마지막 성공 동기화 시각 (없으면 None)"""
+    return OpenMRSSyncCheckpoint.objects.filter(
+        resource='patient', query=query_term or ''
+    ).values_list('last_synced_at', flat=True).first()
+
+
+def trigger_openmrs_patient_sync(query_term, limit_per_call=50, max_total_to_sync=200):
+    """환자 동기화를 백그라운드로 요청하고 {'job_id', 'status', 'last_synced_at'} 반환
+
+    - status 'fresh': 마지막 성공 동기화가 OPENMRS_SYNC_DEBOUNCE_SECONDS 이내라 요청하지 않음
+    - status 'running': 같은 검색어의 동기화가 이미 진행 중 - 그 job id 를 반환
+    - status 'queued': 새 동기화 태스크를 openmrs_sync 큐에 등록
+    """
+    last_synced_at = get_last_synced_at(query_term)
+    debounce_seconds = getattr(settings, 'OPENMRS_SYNC_DEBOUNCE_SECONDS', 300)
+    if last_synced_at and timezone.now() - last_synced_at < timedelta(seconds=debounce_seconds):
+        return {'job_id': None, 'status': 'fresh', 'last_synced_at': last_synced_at}
+
+    lock_key = _sync_lock_key(query_term)
+    job_id = str(uuid.uuid4())
+    # SET NX 는 키가 없을 때만 저장 → 동시에 들어온 요청 중 하나만 태스크 등록 (정기 동기화와도 같은 잠금)
+    if not _acquire_sync_lock(lock_key, job_id):
+        return {'job_id': lock_owner(lock_key), 'status': 'running', 'last_synced_at': last_synced_at}
+
+    try:
+        sync_openmrs_patients_task.apply_async(
+            args=[query_term, limit_per_call, max_total_to_sync], task_id=job_id
+        )
+    except Exception:
+        _release_sync_lock(lock_key, job_id)
+        raise
+    return {'job_id': job_id, 'status': 'queued', 'last_synced_at': last_synced_at}
+
+
+def _run_recorded_sync(job_id, query_term, limit_per_call, max_total_to_sync, trigger, resume_from=None):
+    """OpenMRSSyncRun 이력을 남기며 증분 동기화 실행
+
+    페이지가 커밋될 때마다 next_start_index 와 카운터를 저장하므로, 워커가 죽어도
+    다음 실행이 resume_from 의 커서부터 이어서 진행할 수 있습니다.
+    """
+    lock_key = _sync_lock_key(query_term)
+    lock_timeout = getattr(settings, 'OPENMRS_SYNC_LOCK_TIMEOUT', 900)
+    start_index = resume_from.next_start_index if resume_from else 0
+    run = OpenMRSSyncRun.objects.create(
+        resource='patient', query=query_term or '', trigger=trigger, job_id=job_id or '',
+        resumed_from=resume_from, start_index=start_index, next_start_index=start_index,
+        max_total=max_total_to_sync, high_water_mark=resume_from.high_water_mark if resume_from else None
+    )
+    started = time.monotonic()
+
+    def task_logger(message, style_func_name=None):
+        logger.log(_LOG_LEVELS.get(style_func_name, logging.INFO), message)
+
+    def save_page_progress(page_start, next_start_index, page_stats, high_water_mark):
+        OpenMRSSyncRun.objects.filter(pk=run.pk).update(
+            next_start_index=next_start_index,
+            high_water_mark=high_water_mark,
+            pages_processed=F('pages_processed') + 1,
+            rows_fetched=F('rows_fetched') + (next_start_index - page_start),
+            rows_created=F('rows_created') + page_stats['created'],
+            rows_updated=F('rows_updated') + page_stats['updated'],
+            rows_unchanged=F('rows_unchanged') + page_stats['unchanged'],
+            rows_skipped=F('rows_skipped') + page_stats['skipped'],
+            rows_failed=F('rows_failed') + page_stats['failed'],
+        )
+        # 긴 백필 중 잠금이 만료되지 않도록 연장 (이 job 의 잠금일 때만)
+        extend_lock(lock_key, job_id, lock_timeout)
+
+    summary = run_openmrs_patient_sync(
+        query_term=query_term, limit_per_call=limit_per_call, max_total_to_sync=max_total_to_sync,
+        progress_logger=task_logger, incremental=True, start_index=start_index,
+        on_page=save_page_progress, resume_high_water_mark=run.high_water_mark
+    )
+
+    run.refresh_from_db()
+    run.status = 'FAILED' if summary['error'] else 'COMPLETED'
+    run.error_message = summary['error'] or (
+        f"{run.rows_failed} patients failed to save" if run.rows_failed else ''
+    )
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(time.monotonic() - started, 3)
+    run.save(update_fields=['status', 'error_message', 'finished_at', 'duration_seconds'])
+    return run
+
+
+def _sync_run_result(run):
+    last_synced_at = get_last_synced_at(run.query)
+    return {
+        'run_id': run.id,
+        'query': run.query,
+        'status': run.status.lower(),
+        'start_index': run.start_index,
+        'next_start_index': run.next_start_index,
+        'pages': run.pages_processed,
+        'synced_count': run.rows_created + run.rows_updated,
+        'error': run.error_message or None,
+        'last_synced_at': last_synced_at.isoformat() if last_synced_at else None
+    }
+
+
+@shared_task(bind=True)
+def sync_openmrs_patients_task(self, query_term, limit_per_call=50, max_total_to_sync=200):
+    """OpenMRS 환자 증분 동기화 태스크 (검색어별 잠금은 trigger_openmrs_patient_sync 가 잡음)"""
+    lock_key = _sync_lock_key(query_term)
+    try:
+        run = _run_recorded_sync(self.request.id, query_term, limit_per_call, max_total_to_sync, trigger='ON_DEMAND')
+        return _sync_run_result(run)
+    finally:
+        _release_sync_lock(lock_key, self.request.id)
+
+
+@shared_task(bind=True)
+def scheduled_openmrs_patient_sync_task(self, query_term=None, limit_per_call=None, max_total_to_sync=None):
+    """Celery Beat 정기 동기화 - 지난 정기 실행이 실패/중단됐으면 저장된 커서부터 재개"""
+    if query_term is None:
+        query_term = getattr(settings, 'OPENMRS_SCHEDULED_SYNC_QUERY', '1000')
+    limit_per_call = limit_per_call or getattr(settings, 'OPENMRS_SCHEDULED_SYNC_PAGE_SIZE', 100)
+    max_total_to_sync = max_total_to_sync or getattr(settings, 'OPENMRS_SCHEDULED_SYNC_MAX', 100000)
+
+    job_id = self.request.id or str(uuid.uuid4())
+    lock_key = _sync_lock_key(query_term)
+    if not _acquire_sync_lock(lock_key, job_id):
+        running_job_id = lock_owner(lock_key)
+        logger.info(f"OpenMRS 정기 동기화 건너뜀 - '{query_term}' 동기화가 이미 진행 중 (job {running_job_id})")
+        return {'query': query_term, 'status': 'skipped', 'running_job_id': running_job_id}
+
+    try:
+        # 잠금을 얻었는데 RUNNING 으로 남아 있는 실행은 워커가 도중에 종료된 것
+        OpenMRSSyncRun.objects.filter(
+            resource='patient', query=query_term or '', status='RUNNING'
+        ).update(status='INTERRUPTED', finished_at=timezone.now(), error_message='Worker stopped before the run finished')
+
+        last_run = OpenMRSSyncRun.objects.filter(
+            resource='patient', query=query_term or '', trigger='SCHEDULED'
+        ).order_by('-started_at').first()
+        resume_from = None
+        if last_run and last_run.status in ('FAILED', 'INTERRUPTED') \
+                and 0 < last_run.next_start_index < max_total_to_sync:
+            resume_from = last_run
+            logger.info(f"OpenMRS 정기 동기화 재개 - run {last_run.id} 의 startIndex {last_run.next_start_index} 부터")
+
+        run = _run_recorded_sync(job_id, query_term, limit_per_call, max_total_to_sync,
+                                 trigger='SCHEDULED', resume_from=resume_from)
+        return _sync_run_result(run)
+    finally:
+        _release_sync_lock(lock_key, job_id)
+
+
+@shared_task(bind=True)
+def ingest_openmrs_vital_signs_task(self, patient_ids=None):
+    """OpenMRS 활력징후 관찰 기록 일괄 수집 (patient_ids 가 없으면 OpenMRS ID 가 있는 모든 환자)"""
+    patients = None
+    if patient_ids:
+        patients = Patient.objects.filter(id__in=patient_ids).exclude(openmrs_patient_id__isnull=True)
+    return sync.sync_vital_signs_from_openmrs(patients=patients)
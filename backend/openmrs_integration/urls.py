@@ -1,6 +1,6 @@
 # openmrs_integration/urls.py
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'openmrs_integration'
 
@@ -10,10 +10,18 @@ urlpatterns = [
     
     # OpenMRS와 동기화 후 Django DB 목록을 반환하는 API
     path('patients/sync-and-list/', views.get_patients_and_sync_from_openmrs, name='sync_then_list_patients'),
+
+    # 백그라운드 동기화 job 상태 조회
+    path('patients/sync-jobs/<str:job_id>/', views.get_openmrs_sync_job_status, name='openmrs_sync_job_status'),
     
     # OpenMRS에 새 환자 생성 및 Django DB에 저장하는 API
     path('patients/create/', views.create_patient_in_openmrs_and_django, name='create_patient_in_omrs_and_django'), # 이름 변경
     
+    # 비동기 버전 (ASGI 로 실행할 때 OpenMRS 응답 대기 중 스레드를 점유하지 않음)
+    path('patients/async/local-list/', async_views.get_django_patient_list_only_async, name='django_patient_list_only_async'),
+    path('patients/async/sync-and-list/', async_views.get_patients_and_sync_from_openmrs_async, name='sync_then_list_patients_async'),
+    path('patients/async/<str:patient_uuid>/', async_views.get_openmrs_patient_detail_async, name='omrs_patient_detail_async'),
+    
     # 단일 환자 상세 조회 (OpenMRS에서 가져와 Django DB에 저장/업데이트)
     path('patients/<str:patient_uuid>/', views.get_openmrs_patient_detail, name='omrs_patient_detail'),
 ]
\ No newline at end of file
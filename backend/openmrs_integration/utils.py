@@ -1,132 +1,444 @@
 # openmrs_integration/utils.py
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import hashlib
+import json
 import requests
-from requests.auth import HTTPBasicAuth
 import uuid
-from .models import OpenMRSPatient 
-from datetime import datetime
+from core.openmrs_client import custom_representation, openmrs_client
+from core.pagination import count_rows, keyset_page
+from .models import OpenMRSPatient, OpenMRSSyncCheckpoint
+from datetime import date, datetime
 
-OPENMRS_API_BASE_URL = getattr(settings, 'OPENMRS_API_BASE_URL', 'http://localhost:8080/openmrs/ws/rest/v1')
-OPENMRS_USERNAME = getattr(settings, 'OPENMRS_USERNAME', 'admin')
-OPENMRS_PASSWORD = getattr(settings, 'OPENMRS_PASSWORD', 'Admin123')
+# 동기화 시 기존 행에서 갱신할 필드 (created_at 은 최초 저장 시각 유지)
+OPENMRS_PATIENT_UPDATE_FIELDS = [
+    'display_name', 'identifier', 'given_name', 'family_name',
+    'gender', 'birthdate', 'raw_openmrs_data', 'search_text', 'list_projection', 'content_hash',
+    'openmrs_representation', 'updated_at',
+]
 
-def perform_openmrs_patient_sync(query_term="1000", limit_per_call=50, max_total_to_sync=1000, progress_logger=None):
-    if progress_logger is None:
-        def default_logger(message, style_func_name=None):
-            print(message)
-        progress_logger = default_logger
+# 동기화/목록 경로에서 요청하는 필드만 담은 표현 (parse_openmrs_patient, 목록 projection, 증분 동기화의 auditInfo)
+# v=full 의 속성/주소/링크 등은 받지 않으며, 상세 조회 시에만 v=full 로 다시 가져옵니다.
+# 이름/성별/생년월일 수정은 person 의 auditInfo 만 바뀌므로 openmrs_audit_changed_at 을 위해 person 쪽도 받습니다.
+OPENMRS_PATIENT_SYNC_REPRESENTATION = custom_representation(
+    'uuid', 'display',
+    ('identifiers', ['identifier']),
+    ('person', ['gender', 'birthdate', 'display', ('preferredName', ['givenName', 'familyName']), 'auditInfo']),
+    'auditInfo',
+)
+OPENMRS_FULL_REPRESENTATION = 'full'
+
+# search_text 를 구성하는 컬럼
+OPENMRS_PATIENT_SEARCH_FIELDS = ['display_name', 'identifier', 'given_name', 'family_name']
+
+# 목록 API 가 조회하는 컬럼 (raw_openmrs_data 는 읽지 않음)
+OPENMRS_PATIENT_LIST_COLUMNS = [
+    'uuid', 'list_projection', 'display_name', 'identifier', 'given_name', 'family_name', 'gender', 'birthdate',
+]
+
+def _print_logger(message, style_func_name=None):
+    print(message)
+
+def parse_openmrs_birthdate(birthdate_str):
+    """OpenMRS 날짜 문자열(예: "2001-02-28T00:00:00.000+0000") → date (파싱 실패 시 None)"""
+    if not birthdate_str:
+        return None
+    try:
+        return datetime.fromisoformat(birthdate_str.replace("Z", "+00:00")).date()
+    except ValueError:
+        try:
+            return datetime.strptime(birthdate_str.split('T')[0], '%Y-%m-%d').date()
+        except ValueError:
+            return None
+
+def parse_openmrs_datetime(datetime_str):
+    """OpenMRS 일시 문자열 → aware datetime (파싱 실패 시 None)"""
+    if not datetime_str:
+        return None
+    try:
+        parsed = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, timezone.utc)
+
+def openmrs_audit_changed_at(patient_data):
+    """patient / person auditInfo 의 dateCreated, dateChanged 중 가장 늦은 시각 (없으면 None)"""
+    audit_infos = [patient_data.get('auditInfo'), (patient_data.get('person') or {}).get('auditInfo')]
+    timestamps = [
+        parse_openmrs_datetime(audit_info.get(key))
+        for audit_info in audit_infos if isinstance(audit_info, dict)
+        for key in ('dateChanged', 'dateCreated')
+    ]
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+def compute_content_hash(patient_data):
+    """raw_openmrs_data 의 SHA-256 (키 정렬된 JSON 기준)"""
+    payload = json.dumps(patient_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_patient_list_projection(patient):
+    """목록 API 한 행의 {'display', 'identifiers', 'person'} 생성
+
+    patient 는 OpenMRSPatient 필드 dict (parse_openmrs_patient 결과 또는 .values() 행) 입니다.
+    raw_openmrs_data 가 있으면 그 값을 우선 사용하고, 없는 항목은 컬럼 값으로 채웁니다.
+    """
+    display_name_final = "정보 없음"; person_data_final = {}; identifiers_final = []
+    raw = patient.get('raw_openmrs_data')
+    if raw and isinstance(raw, dict):
+        display_name_final = raw.get('display', display_name_final)
+        raw_ids = raw.get('identifiers', [])
+        if raw_ids and isinstance(raw_ids, list):
+            for ident in raw_ids:
+                if ident and ident.get('identifier'): identifiers_final.append({'identifier': ident.get('identifier')})
+        raw_person = raw.get('person', {})
+        if raw_person and isinstance(raw_person, dict):
+            raw_preferred_name = raw_person.get('preferredName') or {}
+            person_display_raw = raw_person.get('display', f"{raw_preferred_name.get('givenName', '')} {raw_preferred_name.get('familyName', '')}".strip())
+            person_data_final = {'display': person_display_raw, 'gender': raw_person.get('gender'), 'birthdate': raw_person.get('birthdate'), 'preferredName': raw_person.get('preferredName', {})}
+
+    given_name = patient.get('given_name'); family_name = patient.get('family_name')
+    identifier = patient.get('identifier'); birthdate = patient.get('birthdate')
+    if display_name_final == "정보 없음":
+        display_name_final = patient.get('display_name') or f"{given_name or ''} {family_name or ''}".strip() or (f"ID: {identifier}" if identifier else f"Patient (UUID: {str(patient.get('uuid'))[:8]})")
+    if not identifiers_final and identifier: identifiers_final.append({'identifier': identifier})
+    if not person_data_final or not person_data_final.get('display'):
+        previous_preferred_name = person_data_final.get('preferredName') or {}
+        person_data_final = {
+            'display': f"{given_name or ''} {family_name or ''}".strip(),
+            'gender': patient.get('gender') or person_data_final.get('gender'),
+            'birthdate': (birthdate.isoformat() if isinstance(birthdate, date) else str(birthdate)) if birthdate else person_data_final.get('birthdate'),
+            'preferredName': {'givenName': given_name or previous_preferred_name.get('givenName'), 'familyName': family_name or previous_preferred_name.get('familyName')}
+        }
+    return {'display': display_name_final, 'identifiers': identifiers_final, 'person': person_data_final}
+
+def build_patient_search_text(patient):
+    """검색용 텍스트 - 이름/식별번호 컬럼을 소문자로 이어 붙임 (pg_trgm 인덱스 대상)"""
+    return ' '.join(
+        str(patient.get(field)).lower() for field in OPENMRS_PATIENT_SEARCH_FIELDS if patient.get(field)
+    )
+
+def search_local_patients(queryset, query):
+    """환자 검색 - (필터된 queryset, 정렬 기준) 반환
+
+    search_text 에 소문자 부분 문자열 조건(LIKE '%q%')을 걸어 PostgreSQL 에서는 pg_trgm GIN 인덱스를
+    사용하고, TrigramWordSimilarity 로 유사도가 높은 순서로 정렬합니다.
+    다른 DB(SQLite 등)에서는 같은 조건으로 거르고 display_name 순으로 정렬합니다.
+    """
+    queryset = queryset.filter(search_text__contains=query.lower())
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        queryset = queryset.annotate(search_rank=TrigramWordSimilarity(query.lower(), 'search_text'))
+        return queryset, ['-search_rank', 'sort_name', 'uuid']
+    return queryset, ['sort_name', 'uuid']
+
+def patient_list_item(row):
+    """OPENMRS_PATIENT_LIST_COLUMNS 로 조회한 행 → 목록 API 응답 항목 (projection 이 없는 행은 컬럼으로 생성)"""
+    projection = row.get('list_projection') or build_patient_list_projection(row)
+    return {'uuid': str(row['uuid']), **projection}
+
+def get_local_patient_list(query='', start_index=0, limit=50, cursor=None, count='exact'):
+    """로컬 DB 환자 목록 한 페이지 - (results, total_count, next_cursor)
+
+    query 가 UUID 면 정확히 일치, 아니면 이름/식별번호 검색(search_local_patients) 결과를 관련도 순으로 반환합니다.
+    (display_name, uuid) 키셋 페이지네이션으로 cursor 다음 페이지를 읽고, cursor 가 없으면 start_index 를 OFFSET 으로 사용합니다.
+    count 는 'exact' | 'approx' | 'none' (none 이면 total_count 는 None) 입니다.
+    목록용 컬럼만 조회하므로 raw_openmrs_data 를 읽거나 역직렬화하지 않습니다.
+    """
+    # display_name 이 NULL 인 행도 키셋 비교가 되도록 '' 로 정렬 (omrs_patient_list_order_idx 와 같은 식)
+    base_qs = OpenMRSPatient.objects.annotate(sort_name=Coalesce('display_name', Value('')))
+    ordering = ['sort_name', 'uuid']
+    if query:
+        try:
+            base_qs = base_qs.filter(uuid=uuid.UUID(query))
+        except ValueError:
+            base_qs, ordering = search_local_patients(base_qs, query)
+
+    total_count = count_rows(base_qs, count)
+    sort_keys = [key.lstrip('-') for key in ordering if key.lstrip('-') not in OPENMRS_PATIENT_LIST_COLUMNS]
+    rows, next_cursor = keyset_page(
+        base_qs.values(*OPENMRS_PATIENT_LIST_COLUMNS, *sort_keys), ordering,
+        cursor=cursor, limit=limit, offset=start_index
+    )
+    return [patient_list_item(row) for row in rows], total_count, next_cursor
+
+def parse_openmrs_patient(patient_data, representation=OPENMRS_FULL_REPRESENTATION):
+    """OpenMRS patient JSON → OpenMRSPatient 필드 dict (uuid 가 없거나 형식이 잘못되면 ValueError)
+
+    representation 은 patient_data 를 요청한 표현(v=...)이며 openmrs_representation 에 저장됩니다.
+    """
+    patient_uuid_str = patient_data.get('uuid')
+    if not patient_uuid_str:
+        raise ValueError(f"no UUID: {patient_data.get('display')}")
+    valid_uuid = uuid.UUID(patient_uuid_str)
+
+    identifiers = patient_data.get('identifiers', [])
+    main_identifier = identifiers[0].get('identifier') if identifiers and len(identifiers) > 0 and identifiers[0] else None
+    person_data = patient_data.get('person', {})
+    if not person_data: person_data = {}
+    preferred_name = person_data.get('preferredName', {})
+    if not preferred_name: preferred_name = {}
+
+    fields = {
+        'uuid': valid_uuid,
+        'display_name': patient_data.get('display'),
+        'identifier': main_identifier,
+        'given_name': preferred_name.get('givenName'),
+        'family_name': preferred_name.get('familyName'),
+        'gender': person_data.get('gender'),
+        'birthdate': parse_openmrs_birthdate(person_data.get('birthdate')),
+        'raw_openmrs_data': patient_data,
+        'content_hash': compute_content_hash(patient_data),
+        'openmrs_representation': representation
+    }
+    fields['search_text'] = build_patient_search_text(fields)
+    fields['list_projection'] = build_patient_list_projection(fields)
+    return fields
+
+def bulk_upsert_openmrs_patients(patients_list, progress_logger=None, unchanged_before=None,
+                                 representation=OPENMRS_FULL_REPRESENTATION):
+    """OpenMRS 환자 목록(한 페이지)을 한 트랜잭션에서 일괄 upsert
+    
+    기존 (uuid, content_hash) 조회 1회 + INSERT ... ON CONFLICT (uuid) DO UPDATE 1회로 저장하고
+    {'created', 'updated', 'unchanged', 'skipped', 'failed'} 를 반환합니다.
+    - content_hash 가 같은 기존 행은 다시 쓰지 않습니다.
+    - unchanged_before(증분 동기화 기준점)가 주어지면, 이미 저장된 환자 중 auditInfo 가 그 시각보다
+      이전인 환자는 파싱/해시 없이 건너뜁니다 (같은 시각은 해시로 다시 비교).
+    - 같은 페이지 안의 중복 uuid 는 마지막 항목을 사용합니다.
+    - representation 은 patients_list 를 요청한 표현(v=...)입니다.
+    - 다른 환자와 identifier(unique)가 겹쳐 실패하면 그 페이지만 행 단위로 다시 저장해
+      충돌한 행만 실패로 처리합니다.
+    """
+    progress_logger = progress_logger or _print_logger
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
 
-    progress_logger(f"SYNC UTILITY: Starting sync from OpenMRS with query='{query_term}', limit_per_call={limit_per_call}, max_total_to_sync={max_total_to_sync}", 'INFO')
+    candidates = {}
+    for patient_data in patients_list:
+        try:
+            candidates[uuid.UUID(patient_data.get('uuid') or '')] = patient_data
+        except (ValueError, TypeError, AttributeError):
+            progress_logger(f"SYNC UTILITY: Skipping patient data with no/invalid UUID: {patient_data.get('display') if isinstance(patient_data, dict) else patient_data}", 'WARNING')
+            stats['skipped'] += 1
+    if not candidates:
+        return stats
 
-    synced_count = 0
-    start_index = 0
-    has_more_patients = True
+    existing = dict(OpenMRSPatient.objects.filter(uuid__in=list(candidates)).values_list('uuid', 'content_hash'))
 
-    while has_more_patients and synced_count < max_total_to_sync:
+    rows = {}
+    for patient_uuid, patient_data in candidates.items():
+        if unchanged_before is not None and patient_uuid in existing:
+            changed_at = openmrs_audit_changed_at(patient_data)
+            if changed_at is not None and changed_at < unchanged_before:
+                stats['unchanged'] += 1
+                continue
         try:
-            api_url = f"{OPENMRS_API_BASE_URL}/patient"
-            params = {
-                'v': 'full',
-                'limit': limit_per_call,
-                'startIndex': start_index,
-            }
-            # query_term이 None이 아니고 빈 문자열도 아닐 때만 q 파라미터 추가
-            # OpenMRS가 빈 q 또는 q 없는 조회를 어떻게 처리하는지 확인 필요
-            if query_term: 
-                params['q'] = query_term
-            
-            progress_logger(f"SYNC UTILITY: Requesting OpenMRS API - URL: {api_url}, Params: {params}", 'INFO')
-            
-            response = requests.get(
-                api_url, params=params, auth=HTTPBasicAuth(OPENMRS_USERNAME, OPENMRS_PASSWORD),
-                headers={'Content-Type': 'application/json', 'Accept': 'application/json'}, timeout=60
+            fields = parse_openmrs_patient(patient_data, representation)
+        except (ValueError, TypeError, AttributeError) as e:
+            progress_logger(f"SYNC UTILITY: Skipping patient data ({e})", 'WARNING')
+            stats['skipped'] += 1
+            continue
+        if existing.get(patient_uuid) == fields['content_hash']:
+            stats['unchanged'] += 1
+            continue
+        rows[patient_uuid] = fields
+    if not rows:
+        return stats
+
+    try:
+        with transaction.atomic():
+            OpenMRSPatient.objects.bulk_create(
+                [OpenMRSPatient(**fields) for fields in rows.values()],
+                update_conflicts=True,
+                unique_fields=['uuid'],
+                update_fields=OPENMRS_PATIENT_UPDATE_FIELDS
             )
-            progress_logger(f"SYNC UTILITY: OpenMRS API response status: {response.status_code}", 'INFO')
-            response.raise_for_status()
-            
-            openmrs_response_data = response.json()
-            openmrs_patients_list = openmrs_response_data.get('results', [])
-
-            if not openmrs_patients_list:
-                has_more_patients = False
-                log_msg = f"No patients found in OpenMRS for query '{query_term}'"
-                if start_index == 0: log_msg += " on the first page."
-                else: log_msg += " on subsequent pages."
-                progress_logger(log_msg, 'WARNING')
-                break
-
-            progress_logger(f"SYNC UTILITY: Fetched {len(openmrs_patients_list)} patients. Processing (current synced: {synced_count}, startIndex: {start_index})...", 'INFO')
-
-            for patient_data in openmrs_patients_list:
-                try:
-                    patient_uuid_str = patient_data.get('uuid')
-                    if not patient_uuid_str:
-                        progress_logger(f"SYNC UTILITY: Skipping patient data with no UUID: {patient_data.get('display')}", 'WARNING')
-                        continue
-                    valid_uuid = uuid.UUID(patient_uuid_str)
-                    identifiers = patient_data.get('identifiers', [])
-                    main_identifier = identifiers[0].get('identifier') if identifiers and len(identifiers) > 0 and identifiers[0] else None
-                    person_data = patient_data.get('person', {})
-                    if not person_data: person_data = {}
-                    preferred_name = person_data.get('preferredName', {})
-                    if not preferred_name: preferred_name = {}
-                    birthdate_str = person_data.get('birthdate') # person 객체 안의 birthdate
-                    birthdate_obj = None
-                    if birthdate_str:
-                        try:
-                            birthdate_obj = datetime.fromisoformat(birthdate_str.replace("Z", "+00:00")).date()
-                        except ValueError:
-                            try:
-                                birthdate_obj = datetime.strptime(birthdate_str.split('T')[0], '%Y-%m-%d').date()
-                            except ValueError:
-                                progress_logger(f"SYNC UTILITY: Could not parse birthdate: {birthdate_str} for patient {valid_uuid}", 'WARNING')
-                                birthdate_obj = None
-                    
-                    obj, created = OpenMRSPatient.objects.update_or_create(
-                        uuid=valid_uuid,
-                        defaults={
-                            'display_name': patient_data.get('display'),
-                            'identifier': main_identifier,
-                            'given_name': preferred_name.get('givenName'),
-                            'family_name': preferred_name.get('familyName'),
-                            'gender': person_data.get('gender'),
-                            'birthdate': birthdate_obj,
-                            'raw_openmrs_data': patient_data
-                        }
-                    )
-                    log_prefix = "CREATED" if created else "UPDATED"
-                    progress_logger(f"SYNC UTILITY: {log_prefix}: Patient {valid_uuid} - {patient_data.get('display')}", 'SUCCESS' if created else 'INFO')
-                    
-                    synced_count += 1
-                    if synced_count >= max_total_to_sync:
-                        has_more_patients = False
-                        progress_logger(f"SYNC UTILITY: Reached max_patients limit: {max_total_to_sync}", 'WARNING')
-                        break
-                except Exception as db_error:
-                    progress_logger(f"SYNC UTILITY: Error saving/updating patient {patient_data.get('uuid')} to Django DB: {type(db_error).__name__} - {db_error}", 'ERROR')
-
-            if not has_more_patients: break
-            start_index += len(openmrs_patients_list)
-            if len(openmrs_patients_list) < limit_per_call:
-                has_more_patients = False
-                progress_logger(f"SYNC UTILITY: Fetched all available patients for query '{query_term}'.", 'SUCCESS')
-
-        except requests.exceptions.HTTPError as err:
-            error_detail = err.response.text if err.response is not None else "No response text"
-            status_code = err.response.status_code if err.response is not None else "Unknown"
-            reason = err.response.reason if err.response is not None else "Unknown"
-            progress_logger(f"SYNC UTILITY: HTTP error - {status_code} {reason}. Detail: {error_detail[:200]}...", 'ERROR')
-            has_more_patients = False
-        except requests.exceptions.JSONDecodeError as err_json:
-            raw_text = response.text[:200] if 'response' in locals() and hasattr(response, 'text') else 'N/A'
-            progress_logger(f"SYNC UTILITY: JSONDecodeError - {err_json}. Raw text: {raw_text}...", 'ERROR')
-            has_more_patients = False
-        except requests.exceptions.RequestException as err:
-            progress_logger(f"SYNC UTILITY: Network error - {err}", 'ERROR')
-            has_more_patients = False
-        except Exception as e:
-            progress_logger(f"SYNC UTILITY: Unexpected error - {type(e).__name__}: {e}", 'ERROR')
-            has_more_patients = False
-
-    progress_logger(f"SYNC UTILITY: Finished. Total patients processed/synced: {synced_count}", 'SUCCESS')
-    return synced_count
\ No newline at end of file
+    except IntegrityError as e:
+        progress_logger(f"SYNC UTILITY: Bulk upsert conflict ({e}) - retrying {len(rows)} patients row by row", 'WARNING')
+        return _upsert_openmrs_patients_row_by_row(rows.values(), stats, progress_logger)
+
+    stats['updated'] = sum(1 for patient_uuid in rows if patient_uuid in existing)
+    stats['created'] = len(rows) - stats['updated']
+    return stats
+
+def _upsert_openmrs_patients_row_by_row(rows, stats, progress_logger):
+    for fields in rows:
+        fields = dict(fields)
+        valid_uuid = fields.pop('uuid')
+        try:
+            with transaction.atomic():
+                obj, created = OpenMRSPatient.objects.update_or_create(uuid=valid_uuid, defaults=fields)
+            stats['created' if created else 'updated'] += 1
+        except Exception as db_error:
+            progress_logger(f"SYNC UTILITY: Error saving/updating patient {valid_uuid} to Django DB: {type(db_error).__name__} - {db_error}", 'ERROR')
+            stats['failed'] += 1
+    return stats
+
+class OpenMRSPatientWriteBuffer:
+    """환자를 하나씩 받아 batch_size 개가 모이면 bulk_upsert_openmrs_patients 로 저장하는 버퍼
+
+    메모리에는 최대 batch_size 명만 남으므로 동기화하는 환자 수와 관계없이 사용량이 일정합니다.
+    on_flush(batch_start, batch_end, batch, stats) 는 배치가 커밋된 뒤 호출됩니다
+    (batch_start/batch_end 는 add 에 넘긴 index 기준, 넘기지 않았으면 None).
+    마지막에 flush() 를 호출해 남은 환자를 저장해야 합니다.
+    """
+
+    def __init__(self, batch_size, progress_logger=None, unchanged_before=None, on_flush=None,
+                 representation=OPENMRS_FULL_REPRESENTATION):
+        self.batch_size = max(1, batch_size)
+        self.progress_logger = progress_logger
+        self.unchanged_before = unchanged_before
+        self.representation = representation
+        self.on_flush = on_flush
+        self.totals = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        self._batch = []
+        self._batch_start = None
+
+    def add(self, patient_data, index=None):
+        if not self._batch:
+            self._batch_start = index
+        self._batch.append(patient_data)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return None
+        batch, self._batch = self._batch, []
+        stats = bulk_upsert_openmrs_patients(
+            batch, self.progress_logger, unchanged_before=self.unchanged_before, representation=self.representation
+        )
+        for key in self.totals:
+            self.totals[key] += stats[key]
+        if self.on_flush is not None:
+            batch_end = self._batch_start + len(batch) if self._batch_start is not None else None
+            self.on_flush(self._batch_start, batch_end, batch, stats)
+        return stats
+
+def perform_openmrs_patient_sync(query_term="1000", limit_per_call=50, max_total_to_sync=1000, progress_logger=None, concurrency=None, incremental=False):
+    """OpenMRS 환자 검색 결과를 로컬 DB 로 동기화하고 새로 생성/변경된 환자 수를 반환
+
+    incremental=True 이면 (resource, query) 별 OpenMRSSyncCheckpoint 의 high_water_mark 이후로
+    auditInfo 가 바뀌지 않은 기존 환자는 다시 쓰지 않습니다. OpenMRS patient 리소스는 서버 측
+    변경 시각 필터를 지원하지 않으므로 목록은 그대로 내려받고, DB 쓰기만 변경분으로 줄어듭니다.
+    오류 없이 끝난 실행에서만 체크포인트를 앞으로 옮깁니다.
+    """
+    summary = run_openmrs_patient_sync(
+        query_term=query_term, limit_per_call=limit_per_call, max_total_to_sync=max_total_to_sync,
+        progress_logger=progress_logger, concurrency=concurrency, incremental=incremental
+    )
+    return summary['synced_count']
+
+def run_openmrs_patient_sync(query_term="1000", limit_per_call=50, max_total_to_sync=1000, progress_logger=None,
+                             concurrency=None, incremental=False, start_index=0, on_page=None, resume_high_water_mark=None):
+    """perform_openmrs_patient_sync 본체 - 실행 요약 dict 반환
+
+    - start_index 부터 페이지를 가져옵니다 (중단된 동기화 재개). max_total_to_sync 는 startIndex 0 기준 상한입니다.
+    - on_page(page_start, next_start_index, page_stats, high_water_mark) 는 각 페이지가 커밋된 뒤 호출됩니다.
+    - resume_high_water_mark 는 재개 전 실행에서 이미 본 auditInfo 최대 시각입니다.
+    반환: {'synced_count', 'fetched_count', 'pages', 'next_start_index', 'high_water_mark', 'totals', 'error'}
+    """
+    if progress_logger is None:
+        progress_logger = _print_logger
+
+    concurrency = concurrency or getattr(settings, 'OPENMRS_SYNC_CONCURRENCY', 4)
+    progress_logger(f"SYNC UTILITY: Starting sync from OpenMRS with query='{query_term}', limit_per_call={limit_per_call}, max_total_to_sync={max_total_to_sync}, concurrency={concurrency}, incremental={incremental}, startIndex={start_index}", 'INFO')
+
+    checkpoint = None
+    unchanged_before = None
+    if incremental:
+        checkpoint, _ = OpenMRSSyncCheckpoint.objects.get_or_create(resource='patient', query=query_term or '')
+        unchanged_before = checkpoint.high_water_mark
+        progress_logger(f"SYNC UTILITY: Incremental sync - high water mark: {unchanged_before}, last synced at: {checkpoint.last_synced_at}", 'INFO')
+
+    run_started_at = timezone.now()
+    high_water_mark = max(filter(None, [unchanged_before, resume_high_water_mark]), default=None)
+    sync_error = None
+    fetched_count = 0
+    page_count = 0
+    next_start_index = start_index
+    params = {'v': OPENMRS_PATIENT_SYNC_REPRESENTATION}
+    # query_term이 None이 아니고 빈 문자열도 아닐 때만 q 파라미터 추가
+    # OpenMRS가 빈 q 또는 q 없는 조회를 어떻게 처리하는지 확인 필요
+    if query_term:
+        params['q'] = query_term
+    progress_logger(f"SYNC UTILITY: Requesting OpenMRS API - URL: {openmrs_client.url('patient')}, Params: {params}", 'INFO')
+
+    def page_committed(page_start, page_end, page_patients, page_stats):
+        nonlocal high_water_mark, page_count, next_start_index
+        progress_logger(f"SYNC UTILITY: Upserted {len(page_patients)} patients (startIndex: {page_start}) - created: {page_stats['created']}, updated: {page_stats['updated']}, unchanged: {page_stats['unchanged']}, skipped: {page_stats['skipped']}, failed: {page_stats['failed']}", 'SUCCESS')
+        for patient_data in page_patients:
+            changed_at = openmrs_audit_changed_at(patient_data) if isinstance(patient_data, dict) else None
+            if changed_at is not None and (high_water_mark is None or changed_at > high_water_mark):
+                high_water_mark = changed_at
+        page_count += 1
+        next_start_index = page_end
+        if on_page is not None:
+            on_page(page_start, next_start_index, page_stats, high_water_mark)
+
+    # 환자를 하나씩 받아 페이지 크기만큼 모이면 한 트랜잭션에서 일괄 upsert (내용이 같은 환자는 건너뜀)
+    write_buffer = OpenMRSPatientWriteBuffer(
+        limit_per_call, progress_logger, unchanged_before=unchanged_before, on_flush=page_committed,
+        representation=OPENMRS_PATIENT_SYNC_REPRESENTATION
+    )
+    try:
+        # startIndex 페이지를 최대 concurrency 개까지 동시에 요청하고 순서대로 처리
+        patients = openmrs_client.iter_items(
+            'patient', params=params, page_size=limit_per_call, max_total=max(max_total_to_sync - start_index, 0),
+            concurrency=concurrency, timeout=(openmrs_client.timeout[0], 60), start_index=start_index
+        )
+        for index, patient_data in patients:
+            fetched_count += 1
+            write_buffer.add(patient_data, index)
+        write_buffer.flush()
+
+        if not fetched_count:
+            log_msg = f"No patients found in OpenMRS for query '{query_term}'"
+            if start_index == 0: log_msg += " on the first page."
+            else: log_msg += " on subsequent pages."
+            progress_logger(log_msg, 'WARNING')
+        elif next_start_index >= max_total_to_sync:
+            progress_logger(f"SYNC UTILITY: Reached max_patients limit: {max_total_to_sync}", 'WARNING')
+        else:
+            progress_logger(f"SYNC UTILITY: Fetched all available patients for query '{query_term}'.", 'SUCCESS')
+
+    except requests.exceptions.HTTPError as err:
+        error_detail = err.response.text if err.response is not None else "No response text"
+        status_code = err.response.status_code if err.response is not None else "Unknown"
+        reason = err.response.reason if err.response is not None else "Unknown"
+        sync_error = f"HTTP error - {status_code} {reason}. Detail: {error_detail[:200]}..."
+    except requests.exceptions.JSONDecodeError as err_json:
+        raw_text = err_json.doc[:200] if getattr(err_json, 'doc', None) else 'N/A'
+        sync_error = f"JSONDecodeError - {err_json}. Raw text: {raw_text}..."
+    except requests.exceptions.RequestException as err:
+        sync_error = f"Network error - {err}"
+    except Exception as e:
+        sync_error = f"Unexpected error - {type(e).__name__}: {e}"
+    if sync_error:
+        progress_logger(f"SYNC UTILITY: {sync_error}", 'ERROR')
+
+    totals = write_buffer.totals
+    synced_count = totals['created'] + totals['updated']
+
+    # 중간에 실패했거나 저장 실패한 환자가 있으면 다음 실행에서 다시 확인하도록 체크포인트를 유지
+    if checkpoint is not None:
+        if sync_error or totals['failed']:
+            progress_logger(f"SYNC UTILITY: Checkpoint not advanced (errors during sync) - high water mark stays at {checkpoint.high_water_mark}", 'WARNING')
+        else:
+            checkpoint.high_water_mark = high_water_mark
+            checkpoint.last_synced_at = run_started_at
+            checkpoint.save(update_fields=['high_water_mark', 'last_synced_at', 'updated_at'])
+            progress_logger(f"SYNC UTILITY: Checkpoint advanced - high water mark: {high_water_mark}", 'INFO')
+
+    progress_logger(f"SYNC UTILITY: Finished. Total patients processed/synced: {synced_count} (created: {totals['created']}, updated: {totals['updated']}, unchanged: {totals['unchanged']}, skipped: {totals['skipped']}, failed: {totals['failed']})", 'SUCCESS')
+    return {
+        'synced_count': synced_count,
+        'fetched_count': fetched_count,
+        'pages': page_count,
+        'next_start_index': next_start_index,
+        'high_water_mark': high_water_mark,
+        'totals': totals,
+        'error': sync_error,
+    }
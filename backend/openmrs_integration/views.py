@@ -1,11 +1,8 @@
 # openmrs_integration/views.py
 import requests
-from requests.auth import HTTPBasicAuth
 from django.conf import settings
 from .models import OpenMRSPatient
-from django.db.models import Q
 import uuid
-from datetime import datetime, date
 import json
 
 from rest_framework.decorators import api_view, permission_classes
@@ -13,33 +10,32 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
-from .utils import perform_openmrs_patient_sync
-
-# Docker 환경에 맞는 OpenMRS 설정
-OPENMRS_API_BASE_URL = getattr(settings, 'OPENMRS_API_BASE_URL', 'http://openmrs-backend-app:8080/openmrs/ws/rest/v1')
-OPENMRS_USERNAME = getattr(settings, 'OPENMRS_USERNAME', 'admin')
-OPENMRS_PASSWORD = getattr(settings, 'OPENMRS_PASSWORD', 'Admin123')
-
-DEFAULT_IDENTIFIER_TYPE_UUID = getattr(settings, 'DEFAULT_OPENMRS_IDENTIFIER_TYPE_UUID', None)
-DEFAULT_LOCATION_UUID = getattr(settings, 'DEFAULT_OPENMRS_LOCATION_UUID', None)
-PHONE_NUMBER_ATTRIBUTE_TYPE_UUID = getattr(settings, 'OPENMRS_PHONE_ATTRIBUTE_TYPE_UUID', None)
+from core.openmrs_client import openmrs_client
+from core.openmrs_reference import reference_cache
+from core.pagination import COUNT_MODES, InvalidCursor
+from .utils import OPENMRS_FULL_REPRESENTATION, parse_openmrs_patient, get_local_patient_list
+from .tasks import trigger_openmrs_patient_sync, sync_openmrs_patients_task
 
 def is_openmrs_uuid_valid(resource_type, uuid_to_check):
-    """Helper function to check if a UUID exists in OpenMRS for a given resource type."""
+    """Helper function to check if a UUID exists in OpenMRS for a given resource type (cached by reference_cache)."""
     if not uuid_to_check:
         print(f"UUID validation: {resource_type} UUID is None or empty.")
         return False
-    url = f"{OPENMRS_API_BASE_URL}/{resource_type}/{uuid_to_check}"
     log_prefix = f"[Django View - UUID Check for {resource_type} {uuid_to_check}]"
     try:
-        print(f"{log_prefix} Requesting OpenMRS API: {url}")
-        response = requests.get(url, auth=HTTPBasicAuth(OPENMRS_USERNAME, OPENMRS_PASSWORD), timeout=10)
-        print(f"{log_prefix} Response status: {response.status_code}")
-        return response.status_code == 200
+        exists = reference_cache.exists(resource_type, uuid_to_check)
+        print(f"{log_prefix} Exists: {exists}")
+        return exists
     except requests.exceptions.RequestException as e:
         print(f"{log_prefix} Error: {e}")
         return False
 
+def _list_paging_params(request):
+    """목록 API 의 (cursor, count 모드) - cursor 로 이어 읽을 때는 기본적으로 전체 개수를 세지 않음"""
+    cursor = request.GET.get('cursor') or None
+    count_mode = request.GET.get('count', 'none' if cursor else 'exact')
+    return cursor, count_mode
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_django_patient_list_only(request):
@@ -50,49 +46,21 @@ def get_django_patient_list_only(request):
     except ValueError:
         limit = 50
         start_index = 0
+    cursor, count_mode = _list_paging_params(request)
+    if count_mode not in COUNT_MODES:
+        return Response({'error': f"count must be one of {', '.join(COUNT_MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-    print(f"[Django View - get_django_patient_list_only] Received request. Query: '{query}', Limit: {limit}, StartIndex: {start_index}")
+    print(f"[Django View - get_django_patient_list_only] Received request. Query: '{query}', Limit: {limit}, StartIndex: {start_index}, Cursor: {bool(cursor)}")
     try:
-        base_qs = OpenMRSPatient.objects.all()
-        if query:
-            print(f"[Django View - get_django_patient_list_only] Applying filter for query: '{query}'")
-            try:
-                uuid_query = uuid.UUID(query)
-                base_qs = base_qs.filter(uuid=uuid_query)
-            except ValueError:
-                base_qs = base_qs.filter(
-                    Q(display_name__icontains=query) | Q(identifier__icontains=query) |
-                    Q(given_name__icontains=query) | Q(family_name__icontains=query)
-                )
-
-        patients_qs_ordered = base_qs.order_by('display_name')
-        total_patients_after_filter = patients_qs_ordered.count()
-        current_patients_to_display = patients_qs_ordered[start_index : start_index + limit]
-
-        print(f"[Django View - get_django_patient_list_only] Patients to display after paging: {len(list(current_patients_to_display))}")
-
-        patients_data = []
-        for p_model in current_patients_to_display:
-            display_name_final = "정보 없음"; person_data_final = {}; identifiers_final = []
-            if p_model.raw_openmrs_data and isinstance(p_model.raw_openmrs_data, dict):
-                raw = p_model.raw_openmrs_data; display_name_final = raw.get('display', display_name_final)
-                raw_ids = raw.get('identifiers', []);
-                if raw_ids and isinstance(raw_ids, list):
-                    for ident in raw_ids:
-                        if ident and ident.get('identifier'): identifiers_final.append({'identifier': ident.get('identifier')})
-                raw_person = raw.get('person', {});
-                if raw_person and isinstance(raw_person, dict):
-                    person_display_raw = raw_person.get('display', f"{raw_person.get('preferredName', {}).get('givenName', '')} {raw_person.get('preferredName', {}).get('familyName', '')}".strip())
-                    person_data_final = {'display': person_display_raw, 'gender': raw_person.get('gender'), 'birthdate': raw_person.get('birthdate'), 'preferredName': raw_person.get('preferredName', {})}
-            if display_name_final == "정보 없음": display_name_final = p_model.display_name or f"{p_model.given_name or ''} {p_model.family_name or ''}".strip() or (f"ID: {p_model.identifier}" if p_model.identifier else f"Patient (UUID: {str(p_model.uuid)[:8]})")
-            if not identifiers_final and p_model.identifier: identifiers_final.append({'identifier': p_model.identifier})
-            if not person_data_final or not person_data_final.get('display'):
-                person_display_model = f"{p_model.given_name or ''} {p_model.family_name or ''}".strip()
-                person_data_final = {'display': person_display_model, 'gender': p_model.gender or person_data_final.get('gender'), 'birthdate': (p_model.birthdate.isoformat() if isinstance(p_model.birthdate, date) else str(p_model.birthdate)) if p_model.birthdate else person_data_final.get('birthdate'), 'preferredName': {'givenName': p_model.given_name or person_data_final.get('preferredName', {}).get('givenName'), 'familyName': p_model.family_name or person_data_final.get('preferredName', {}).get('familyName')}}
-            patients_data.append({'uuid': str(p_model.uuid), 'display': display_name_final, 'identifiers': identifiers_final, 'person': person_data_final})
+        # 동기화 시 저장한 list_projection 만 조회 (raw_openmrs_data 는 읽지 않음)
+        patients_data, total_patients_after_filter, next_cursor = get_local_patient_list(
+            query, start_index, limit, cursor=cursor, count=count_mode
+        )
 
         print(f"Django View (get_django_patient_list_only): Returning {len(patients_data)} patients. Total: {total_patients_after_filter}")
-        return Response({'results': patients_data, 'totalCount': total_patients_after_filter})
+        return Response({'results': patients_data, 'totalCount': total_patients_after_filter, 'nextCursor': next_cursor})
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         print(f"Django View (get_django_patient_list_only): Error - {type(e).__name__}: {e}")
         import traceback
@@ -108,64 +76,43 @@ def get_patients_and_sync_from_openmrs(request):
     sync_limit = int(request.GET.get('sync_limit', 50))
     sync_max = int(request.GET.get('sync_max', 200))
     sync_error_detail = None
+    sync_job = {'job_id': None, 'status': 'error', 'last_synced_at': None}
 
+    # 동기화는 openmrs_sync 큐에서 백그라운드로 실행하고, 목록은 로컬 DB 에서 바로 반환
     try:
-        print(f"Django View (get_patients_and_sync_from_openmrs): Triggering OpenMRS sync with query='{sync_query_from_request}'")
-        def view_logger(message, style_func_name=None): print(f"[SYNC_UTIL_IN_VIEW] {message}")
-        perform_openmrs_patient_sync(
-            query_term=sync_query_from_request, limit_per_call=sync_limit,
-            max_total_to_sync=sync_max, progress_logger=view_logger
+        print(f"Django View (get_patients_and_sync_from_openmrs): Triggering background OpenMRS sync with query='{sync_query_from_request}'")
+        sync_job = trigger_openmrs_patient_sync(
+            sync_query_from_request, limit_per_call=sync_limit, max_total_to_sync=sync_max
         )
-        print(f"Django View (get_patients_and_sync_from_openmrs): Sync utility finished.")
+        print(f"Django View (get_patients_and_sync_from_openmrs): Sync job {sync_job['job_id']} ({sync_job['status']})")
     except Exception as e:
-        sync_error_message = f"Error during OpenMRS sync: {str(e)}"
+        sync_error_message = f"Error triggering OpenMRS sync: {str(e)}"
         print(f"Django View (get_patients_and_sync_from_openmrs): {sync_error_message}")
         sync_error_detail = sync_error_message
 
     query_for_list = request.GET.get('q', '')
     limit_for_list = int(request.GET.get('limit', 50))
     start_index_for_list = int(request.GET.get('startIndex', '0'))
+    cursor_for_list, count_mode = _list_paging_params(request)
+    if count_mode not in COUNT_MODES:
+        return Response({'error': f"count must be one of {', '.join(COUNT_MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
     print(f"Django View (get_patients_and_sync_from_openmrs): Fetching final list from LOCAL DJANGO DB. Query: '{query_for_list}'")
     try:
-        base_qs = OpenMRSPatient.objects.all()
-        if query_for_list:
-            try:
-                uuid_query_list = uuid.UUID(query_for_list)
-                base_qs = base_qs.filter(uuid=uuid_query_list)
-            except ValueError:
-                base_qs = base_qs.filter(
-                    Q(display_name__icontains=query_for_list) | Q(identifier__icontains=query_for_list) |
-                    Q(given_name__icontains=query_for_list) | Q(family_name__icontains=query_for_list)
-                )
-        patients_qs_ordered = base_qs.order_by('display_name')
-        total_patients = patients_qs_ordered.count()
-        patients_to_display = patients_qs_ordered[start_index_for_list : start_index_for_list + limit_for_list]
-
-        patients_data_response = []
-        for p_model in patients_to_display:
-            display_name_final = "정보 없음"; person_data_final = {}; identifiers_final = []
-            if p_model.raw_openmrs_data and isinstance(p_model.raw_openmrs_data, dict):
-                raw = p_model.raw_openmrs_data; display_name_final = raw.get('display', display_name_final)
-                raw_ids = raw.get('identifiers', []);
-                if raw_ids and isinstance(raw_ids, list):
-                    for ident in raw_ids:
-                        if ident and ident.get('identifier'): identifiers_final.append({'identifier': ident.get('identifier')})
-                raw_person = raw.get('person', {});
-                if raw_person and isinstance(raw_person, dict):
-                    person_display_raw = raw_person.get('display', f"{raw_person.get('preferredName', {}).get('givenName', '')} {raw_person.get('preferredName', {}).get('familyName', '')}".strip())
-                    person_data_final = {'display': person_display_raw, 'gender': raw_person.get('gender'), 'birthdate': raw_person.get('birthdate'), 'preferredName': raw_person.get('preferredName', {})}
-            if display_name_final == "정보 없음": display_name_final = p_model.display_name or f"{p_model.given_name or ''} {p_model.family_name or ''}".strip() or (f"ID: {p_model.identifier}" if p_model.identifier else f"Patient (UUID: {str(p_model.uuid)[:8]})")
-            if not identifiers_final and p_model.identifier: identifiers_final.append({'identifier': p_model.identifier})
-            if not person_data_final or not person_data_final.get('display'):
-                person_display_model = f"{p_model.given_name or ''} {p_model.family_name or ''}".strip()
-                person_data_final = {'display': person_display_model, 'gender': p_model.gender or person_data_final.get('gender'), 'birthdate': (p_model.birthdate.isoformat() if isinstance(p_model.birthdate, date) else str(p_model.birthdate)) if p_model.birthdate else person_data_final.get('birthdate'), 'preferredName': {'givenName': p_model.given_name or person_data_final.get('preferredName', {}).get('givenName'), 'familyName': p_model.family_name or person_data_final.get('preferredName', {}).get('familyName')}}
-            patients_data_response.append({'uuid': str(p_model.uuid), 'display': display_name_final, 'identifiers': identifiers_final, 'person': person_data_final})
+        patients_data_response, total_patients, next_cursor = get_local_patient_list(
+            query_for_list, start_index_for_list, limit_for_list, cursor=cursor_for_list, count=count_mode
+        )
 
-        response_payload = {'results': patients_data_response, 'totalCount': total_patients}
+        response_payload = {
+            'results': patients_data_response, 'totalCount': total_patients, 'nextCursor': next_cursor,
+            'sync_job_id': sync_job['job_id'], 'sync_status': sync_job['status'],
+            'last_synced_at': sync_job['last_synced_at']
+        }
         if sync_error_detail: response_payload['sync_error_detail'] = sync_error_detail
         return Response(response_payload)
+    except InvalidCursor as e:
+        return Response({'error': str(e), 'sync_error_detail': sync_error_detail}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        print(f"Django View (get_patients_and_sync_from_openmrs): Error fetching from local DB after sync: {e}")
+        print(f"Django View (get_patients_and_sync_from_openmrs): Error fetching from local DB: {e}")
         return Response({'error': f'Error fetching list from Django DB: {str(e)}', 'sync_error_detail': sync_error_detail}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
@@ -174,9 +121,10 @@ def create_patient_in_openmrs_and_django(request):
     print(f"[Django View - create_patient_in_openmrs_and_django] Received request data: {request.data}")
     data = request.data
 
-    identifier_type_uuid_from_settings = DEFAULT_IDENTIFIER_TYPE_UUID
-    location_uuid_from_settings = DEFAULT_LOCATION_UUID
-    phone_attr_type_uuid_from_settings = PHONE_NUMBER_ATTRIBUTE_TYPE_UUID
+    # 설정된 UUID → OpenMRS 에서 이름으로 찾은 UUID → 표준 UUID 순 (reference_cache 에 캐시됨)
+    identifier_type_uuid_from_settings = reference_cache.default_uuid('identifier_type')
+    location_uuid_from_settings = reference_cache.default_uuid('location')
+    phone_attr_type_uuid_from_settings = reference_cache.default_uuid('phone_attribute_type')
 
     # --- UUID 유효성 사전 확인 ---
     if not identifier_type_uuid_from_settings or \
@@ -232,13 +180,11 @@ def create_patient_in_openmrs_and_django(request):
                 "attributeType": phone_attr_type_uuid_from_settings, "value": phone_number_str
             })
         
-        api_url = f"{OPENMRS_API_BASE_URL}/patient"
+        api_url = openmrs_client.url('patient')
         print(f"Django View: Posting to OpenMRS API: {api_url} with payload: {json.dumps(openmrs_payload, indent=2)}")
 
-        omrs_response = requests.post(
-            api_url, json=openmrs_payload, auth=HTTPBasicAuth(OPENMRS_USERNAME, OPENMRS_PASSWORD),
-            headers={'Content-Type': 'application/json', 'Accept': 'application/json'}, timeout=20
-        )
+        # POST 는 멱등이 아니므로 공용 클라이언트가 재시도하지 않음
+        omrs_response = openmrs_client.post('patient', json=openmrs_payload, timeout=20)
         
         print(f"Django View: OpenMRS API response status for patient creation: {omrs_response.status_code}")
         print(f"Django View: OpenMRS API response text for patient creation (first 1000 chars): {omrs_response.text[:1000]}")
@@ -249,34 +195,11 @@ def create_patient_in_openmrs_and_django(request):
         
         # Django DB 저장 로직
         try:
-            new_patient_uuid = uuid.UUID(created_openmrs_patient_data.get('uuid'))
-            resp_identifiers = created_openmrs_patient_data.get('identifiers', [])
-            resp_main_identifier = resp_identifiers[0].get('identifier') if resp_identifiers and len(resp_identifiers) > 0 and resp_identifiers[0] else None
-            
-            resp_person_data = created_openmrs_patient_data.get('person', {});
-            if not resp_person_data: resp_person_data = {}
-            resp_preferred_name = resp_person_data.get('preferredName', {});
-            if not resp_preferred_name: resp_preferred_name = {}
-            resp_birthdate_str = resp_person_data.get('birthdate'); birthdate_obj_for_db = None
-            if resp_birthdate_str:
-                try: birthdate_obj_for_db = datetime.fromisoformat(resp_birthdate_str.replace("Z", "+00:00")).date()
-                except ValueError:
-                    try: birthdate_obj_for_db = datetime.strptime(resp_birthdate_str.split('T')[0], '%Y-%m-%d').date()
-                    except ValueError: 
-                        print(f"Warning: Could not parse birthdate '{resp_birthdate_str}' from OpenMRS response for DB save.")
-                        birthdate_obj_for_db = None
-            
+            # POST 응답은 default 표현 - 상세 조회 시 v=full 로 다시 가져옴
+            patient_fields = parse_openmrs_patient(created_openmrs_patient_data, 'default')
+            new_patient_uuid = patient_fields.pop('uuid')
             patient_obj, created_in_django = OpenMRSPatient.objects.update_or_create(
-                uuid=new_patient_uuid,
-                defaults={
-                    'display_name': created_openmrs_patient_data.get('display'), 
-                    'identifier': resp_main_identifier, 
-                    'given_name': resp_preferred_name.get('givenName'), 
-                    'family_name': resp_preferred_name.get('familyName'),
-                    'gender': resp_person_data.get('gender'), 
-                    'birthdate': birthdate_obj_for_db,
-                    'raw_openmrs_data': created_openmrs_patient_data
-                }
+                uuid=new_patient_uuid, defaults=patient_fields
             )
             log_action = "CREATED" if created_in_django else "UPDATED"
             print(f"Django View: Patient {new_patient_uuid} {log_action} in Django DB.")
@@ -321,48 +244,31 @@ def get_openmrs_patient_detail(request, patient_uuid):
         try:
             patient_model_instance = OpenMRSPatient.objects.get(uuid=valid_uuid)
             if patient_model_instance.raw_openmrs_data and isinstance(patient_model_instance.raw_openmrs_data, dict):
-                print(f"Django View (get_openmrs_patient_detail): Fetching patient {valid_uuid} from Django DB (using existing raw_openmrs_data)")
-                return Response(patient_model_instance.raw_openmrs_data)
-            print(f"Django View (get_openmrs_patient_detail): Patient {valid_uuid} found in Django DB but raw_openmrs_data is missing or invalid, will fetch fresh from OpenMRS...")
+                # 동기화 경로는 목록용 필드만 받으므로(custom 표현) v=full 로 저장된 경우에만 그대로 반환
+                if patient_model_instance.openmrs_representation in (None, '', OPENMRS_FULL_REPRESENTATION):
+                    print(f"Django View (get_openmrs_patient_detail): Fetching patient {valid_uuid} from Django DB (using existing raw_openmrs_data)")
+                    return Response(patient_model_instance.raw_openmrs_data)
+                print(f"Django View (get_openmrs_patient_detail): Patient {valid_uuid} found in Django DB with partial data (v={patient_model_instance.openmrs_representation}), will fetch full data from OpenMRS...")
+            else:
+                print(f"Django View (get_openmrs_patient_detail): Patient {valid_uuid} found in Django DB but raw_openmrs_data is missing or invalid, will fetch fresh from OpenMRS...")
         except OpenMRSPatient.DoesNotExist:
             print(f"Django View (get_openmrs_patient_detail): Patient {valid_uuid} not found in Django DB, will fetch from OpenMRS...")
 
-        api_url = f"{OPENMRS_API_BASE_URL}/patient/{valid_uuid}?v=full"
+        api_url = openmrs_client.url(f"patient/{valid_uuid}?v={OPENMRS_FULL_REPRESENTATION}")
         print(f"Django View (get_openmrs_patient_detail): Requesting OpenMRS API: {api_url}")
         
-        response_from_omrs = requests.get(
-            api_url, auth=HTTPBasicAuth(OPENMRS_USERNAME, OPENMRS_PASSWORD),
-            headers={'Content-Type': 'application/json', 'Accept': 'application/json'}, timeout=10
-        )
+        response_from_omrs = openmrs_client.get(api_url, timeout=10)
         response_from_omrs.raise_for_status() 
         openmrs_patient_data = response_from_omrs.json()
         print(f"Django View (get_openmrs_patient_detail): Successfully fetched data from OpenMRS for patient {valid_uuid}")
 
         # Django DB 저장 로직
         try:
-            identifiers = openmrs_patient_data.get('identifiers', [])
-            main_identifier = identifiers[0].get('identifier') if identifiers and len(identifiers) > 0 and identifiers[0] else None
-            person_data = openmrs_patient_data.get('person', {})
-            if not person_data: person_data = {}
-            preferred_name = person_data.get('preferredName', {})
-            if not preferred_name: preferred_name = {}
-            birthdate_str = person_data.get('birthdate') 
-            birthdate_obj = None
-            if birthdate_str:
-                try: birthdate_obj = datetime.fromisoformat(birthdate_str.replace("Z", "+00:00")).date()
-                except ValueError:
-                    try: birthdate_obj = datetime.strptime(birthdate_str.split('T')[0], '%Y-%m-%d').date()
-                    except ValueError: birthdate_obj = None
-            
-            OpenMRSPatient.objects.update_or_create(
-                uuid=valid_uuid,
-                defaults={
-                    'display_name': openmrs_patient_data.get('display'), 'identifier': main_identifier,
-                    'given_name': preferred_name.get('givenName'), 'family_name': preferred_name.get('familyName'),
-                    'gender': person_data.get('gender'), 'birthdate': birthdate_obj, 
-                    'raw_openmrs_data': openmrs_patient_data
-                }
-            )
+            patient_fields = parse_openmrs_patient(openmrs_patient_data, OPENMRS_FULL_REPRESENTATION)
+            patient_fields.pop('uuid')
+            # content_hash 는 동기화 표현 기준이므로 유지 - 다음 동기화에서 내용이 같으면 v=full 데이터를 덮어쓰지 않음
+            patient_fields.pop('content_hash')
+            OpenMRSPatient.objects.update_or_create(uuid=valid_uuid, defaults=patient_fields)
         except Exception as db_error:
             print(f"Django View (get_openmrs_patient_detail): Error saving/updating patient {valid_uuid} to Django DB: {type(db_error).__name__} - {db_error}")
         
@@ -383,4 +289,16 @@ def get_openmrs_patient_detail(request, patient_uuid):
         return Response({'error': f'Network error connecting to OpenMRS: {str(req_err)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         print(f"Django View (get_openmrs_patient_detail): Unexpected error - {type(e).__name__}: {e}")
-        return Response({'error': f'An unexpected server error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': f'An unexpected server error occurred: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_openmrs_sync_job_status(request, job_id):
+    """sync-and-list 가 반환한 sync_job_id 의 진행 상태 조회"""
+    job = sync_openmrs_patients_task.AsyncResult(job_id)
+    response_payload = {'job_id': job_id, 'status': job.state.lower()}
+    if job.successful():
+        response_payload['result'] = job.result
+    elif job.failed():
+        response_payload['error'] = str(job.result)
+    return Response(response_payload)
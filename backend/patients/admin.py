@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Patient, Visit, VitalSigns
+from .models import Patient, Visit, VitalSigns, VitalSignsAggregate
 
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
@@ -67,3 +67,11 @@ class VitalSignsAdmin(admin.ModelAdmin):
             'fields': ('height', 'weight', 'bmi')
         }),
     )
+
+@admin.register(VitalSignsAggregate)
+class VitalSignsAggregateAdmin(admin.ModelAdmin):
+    list_display = ['visit', 'measure', 'count', 'mean', 'std', 'min', 'max', 'first', 'last', 'updated_at']
+    list_filter = ['measure']
+    search_fields = ['visit__patient__name', 'visit__visit_number']
+    # VitalSigns 저장 시 자동 계산되는 값이므로 수정하지 않음
+    readonly_fields = [field.name for field in VitalSignsAggregate._meta.fields]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_alter_vitalsigns_measured_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vitalsigns',
+            name='openmrs_encounter_uuid',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='vitalsigns',
+            name='measured_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='측정시간'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.2 on 2026-10-18 16:47
+
+import math
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_VISIT_BATCH_SIZE = 500
+
+# 이 마이그레이션 시점의 통계 항목 (patients.vital_stats 가 바뀌어도 결과가 달라지지 않도록 고정)
+MEASURE_FIELDS = [
+    'heart_rate',
+    'systolic_bp',
+    'diastolic_bp',
+    'temperature',
+    'respiratory_rate',
+    'oxygen_saturation',
+    'weight',
+]
+
+
+def _measure_stats(values):
+    """측정 시각 순 값 목록의 통계 (std 는 2회 이상 측정 시 표본 표준편차)"""
+    count = len(values)
+    mean = sum(values) / count
+    return {
+        'count': count,
+        'mean': mean,
+        'std': math.sqrt(sum((value - mean) ** 2 for value in values) / (count - 1)) if count > 1 else None,
+        'min': min(values),
+        'max': max(values),
+        'first': values[0],
+        'last': values[-1],
+    }
+
+
+def _visit_aggregates(VitalSignsAggregate, visit_id, rows):
+    """한 방문의 (측정값...) 행들 → VitalSignsAggregate 목록 (mean_bp 는 수축기/이완기 혈압으로 계산)"""
+    systolic = MEASURE_FIELDS.index('systolic_bp')
+    diastolic = MEASURE_FIELDS.index('diastolic_bp')
+    columns = {
+        measure: [float(row[i]) for row in rows if row[i] is not None]
+        for i, measure in enumerate(MEASURE_FIELDS)
+    }
+    columns['mean_bp'] = [
+        (float(row[systolic]) + 2 * float(row[diastolic])) / 3
+        for row in rows if row[systolic] is not None and row[diastolic] is not None
+    ]
+    return [
+        VitalSignsAggregate(visit_id=visit_id, measure=measure, **_measure_stats(values))
+        for measure, values in columns.items() if values
+    ]
+
+
+def backfill_vital_sign_aggregates(apps, schema_editor):
+    """기존 측정값이 있는 방문의 통계 계산"""
+    VitalSigns = apps.get_model('patients', 'VitalSigns')
+    VitalSignsAggregate = apps.get_model('patients', 'VitalSignsAggregate')
+    visit_ids = sorted(set(VitalSigns.objects.values_list('visit_id', flat=True)))
+    for start in range(0, len(visit_ids), BACKFILL_VISIT_BATCH_SIZE):
+        visit_rows = {}
+        for visit_id, *values in (
+            VitalSigns.objects.filter(visit_id__in=visit_ids[start:start + BACKFILL_VISIT_BATCH_SIZE])
+            .order_by('visit_id', 'measured_at', 'id')
+            .values_list('visit_id', *MEASURE_FIELDS)
+        ):
+            visit_rows.setdefault(visit_id, []).append(values)
+        VitalSignsAggregate.objects.bulk_create([
+            aggregate
+            for visit_id, rows in visit_rows.items()
+            for aggregate in _visit_aggregates(VitalSignsAggregate, visit_id, rows)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_vitalsigns_openmrs_encounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalSignsAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('measure', models.CharField(max_length=30, verbose_name='측정항목')),
+                ('count', models.IntegerField(verbose_name='측정횟수')),
+                ('mean', models.FloatField(verbose_name='평균')),
+                ('std', models.FloatField(blank=True, null=True, verbose_name='표준편차')),
+                ('min', models.FloatField(verbose_name='최솟값')),
+                ('max', models.FloatField(verbose_name='최댓값')),
+                ('first', models.FloatField(verbose_name='첫 측정값')),
+                ('last', models.FloatField(verbose_name='마지막 측정값')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='갱신일')),
+                ('visit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_sign_aggregates', to='patients.visit', verbose_name='방문')),
+            ],
+            options={
+                'verbose_name': '활력징후 통계',
+                'verbose_name_plural': '활력징후 통계',
+                'unique_together': {('visit', 'measure')},
+            },
+        ),
+        migrations.RunPython(backfill_vital_sign_aggregates, migrations.RunPython.noop),
+    ]
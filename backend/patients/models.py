@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Patient(models.Model):
     """환자 기본 정보"""
@@ -112,8 +113,11 @@ class VitalSigns(models.Model):
     height = models.DecimalField(max_digits=5, decimal_places=1, verbose_name="키(cm)", null=True, blank=True)
     weight = models.DecimalField(max_digits=5, decimal_places=1, verbose_name="체중(kg)", null=True, blank=True)
     
-    # 측정 정보
-    measured_at = models.DateTimeField(auto_now_add=True, verbose_name="측정시간")
+    # OpenMRS 연동용 ID (관찰 기록을 가져온 encounter - 같은 encounter 는 다시 저장하지 않음)
+    openmrs_encounter_uuid = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    
+    # 측정 정보 (OpenMRS 에서 가져온 기록은 obsDatetime 사용)
+    measured_at = models.DateTimeField(default=timezone.now, verbose_name="측정시간")
     measured_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, verbose_name="측정자",related_name="patient_vitalsigns")
     
@@ -132,3 +136,30 @@ class VitalSigns(models.Model):
             height_m = float(self.height) / 100
             return round(float(self.weight) / (height_m ** 2), 1)
         return None
+
+
+
+class VitalSignsAggregate(models.Model):
+    """방문별 활력징후 통계 (ML 피처 *_mean/_std/_min/_max/_count/_first/_last 입력)
+
+    VitalSigns 가 저장/삭제되면 해당 방문만 다시 계산합니다 (patients/vital_stats.py).
+    """
+    visit = models.ForeignKey(Visit, on_delete=models.CASCADE, related_name='vital_sign_aggregates', verbose_name="방문")
+    measure = models.CharField(max_length=30, verbose_name="측정항목")
+    
+    count = models.IntegerField(verbose_name="측정횟수")
+    mean = models.FloatField(verbose_name="평균")
+    std = models.FloatField(null=True, blank=True, verbose_name="표준편차")  # 표본 표준편차, 1회 측정이면 없음
+    min = models.FloatField(verbose_name="최솟값")
+    max = models.FloatField(verbose_name="최댓값")
+    first = models.FloatField(verbose_name="첫 측정값")
+    last = models.FloatField(verbose_name="마지막 측정값")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="갱신일")
+    
+    class Meta:
+        verbose_name = "활력징후 통계"
+        verbose_name_plural = "활력징후 통계"
+        unique_together = ('visit', 'measure')
+    
+    def __str__(self):
+        return f"{self.visit_id} - {self.measure} (n={self.count})"
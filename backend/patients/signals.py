@@ -0,0 +1,15 @@
+# backend/patients/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import VitalSigns
+from .vital_stats import refresh_vital_sign_aggregates
+
+
+@receiver(post_save, sender=VitalSigns)
+@receiver(post_delete, sender=VitalSigns)
+def refresh_visit_vital_sign_aggregates(sender, instance, **kwargs):
+    """측정값이 바뀐 방문의 통계만 커밋 후 다시 계산 (bulk_create 는 호출한 쪽에서 갱신)"""
+    visit_id = instance.visit_id
+    transaction.on_commit(lambda: refresh_vital_sign_aggregates([visit_id]))
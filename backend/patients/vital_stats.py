@@ -0,0 +1,111 @@
+# backend/patients/vital_stats.py - 방문/기간별 활력징후 통계 (ML 피처 *_mean/_std/_min/_max/_count/_first/_last)
+import numpy as np
+from django.db import transaction
+
+from .models import Visit, VitalSigns, VitalSignsAggregate
+
+# VitalSigns 필드 → 통계 항목 (mean_bp 는 수축기/이완기 혈압으로 계산)
+VITAL_SIGN_MEASURE_FIELDS = [
+    'heart_rate',
+    'systolic_bp',
+    'diastolic_bp',
+    'temperature',
+    'respiratory_rate',
+    'oxygen_saturation',
+    'weight',
+]
+VITAL_SIGN_MEASURES = VITAL_SIGN_MEASURE_FIELDS + ['mean_bp']
+VITAL_SIGN_STATS = ['mean', 'std', 'min', 'max', 'count', 'first', 'last']
+
+
+def compute_vital_sign_stats(rows):
+    """(그룹 키, 측정값...) 행들의 그룹별 통계 - {그룹 키: {측정항목: {통계: 값}}}
+
+    rows 는 그룹 키, 측정 시각 순으로 정렬된 (group, *VITAL_SIGN_MEASURE_FIELDS) 튜플이며
+    측정항목마다 NumPy reduceat 으로 한 번에 계산합니다. 값이 없는(None) 측정은 제외하고,
+    std 는 표본 표준편차(2회 이상 측정 시)입니다.
+    """
+    if not rows:
+        return {}
+    groups = np.array([row[0] for row in rows])
+    values = np.array([row[1:] for row in rows], dtype=np.float64)  # None → nan
+    systolic = values[:, VITAL_SIGN_MEASURE_FIELDS.index('systolic_bp')]
+    diastolic = values[:, VITAL_SIGN_MEASURE_FIELDS.index('diastolic_bp')]
+    values = np.column_stack([values, (systolic + 2 * diastolic) / 3])
+
+    stats = {}
+    for column, measure in enumerate(VITAL_SIGN_MEASURES):
+        present = ~np.isnan(values[:, column])
+        measure_values = values[present, column]
+        if not measure_values.size:
+            continue
+        measure_groups = groups[present]
+        # 그룹 키로 정렬되어 있으므로 그룹이 바뀌는 위치가 각 구간의 시작
+        starts = np.flatnonzero(np.r_[True, measure_groups[1:] != measure_groups[:-1]])
+        counts = np.diff(np.r_[starts, measure_values.size])
+        means = np.add.reduceat(measure_values, starts) / counts
+        squared = np.add.reduceat((measure_values - np.repeat(means, counts)) ** 2, starts)
+        mins = np.minimum.reduceat(measure_values, starts)
+        maxs = np.maximum.reduceat(measure_values, starts)
+        firsts = measure_values[starts]
+        lasts = measure_values[starts + counts - 1]
+        for i, start in enumerate(starts):
+            stats.setdefault(measure_groups[start].item(), {})[measure] = {
+                'mean': float(means[i]),
+                'std': float(np.sqrt(squared[i] / (counts[i] - 1))) if counts[i] > 1 else None,
+                'min': float(mins[i]),
+                'max': float(maxs[i]),
+                'count': int(counts[i]),
+                'first': float(firsts[i]),
+                'last': float(lasts[i]),
+            }
+    return stats
+
+
+def refresh_vital_sign_aggregates(visit_ids):
+    """방문들의 VitalSignsAggregate 를 다시 계산 (해당 방문의 측정값만 읽음) - 저장한 행 수 반환
+
+    같은 방문을 동시에 갱신하면 delete + insert 가 겹쳐 unique_together 위반이 나므로,
+    방문 행을 id 순으로 잠근(select_for_update) 뒤 같은 트랜잭션 안에서 읽고 씁니다.
+    """
+    visit_ids = sorted(set(visit_ids))
+    if not visit_ids:
+        return 0
+    with transaction.atomic():
+        list(Visit.objects.select_for_update().filter(id__in=visit_ids).order_by('id').values_list('id', flat=True))
+        rows = list(
+            VitalSigns.objects.filter(visit_id__in=visit_ids)
+            .order_by('visit_id', 'measured_at', 'id')
+            .values_list('visit_id', *VITAL_SIGN_MEASURE_FIELDS)
+        )
+        aggregates = [
+            VitalSignsAggregate(visit_id=visit_id, measure=measure, **measure_stats)
+            for visit_id, measures in compute_vital_sign_stats(rows).items()
+            for measure, measure_stats in measures.items()
+        ]
+        VitalSignsAggregate.objects.filter(visit_id__in=visit_ids).delete()
+        VitalSignsAggregate.objects.bulk_create(aggregates)
+    return len(aggregates)
+
+
+def get_visit_vital_sign_stats(visit_ids):
+    """저장된 방문별 통계 - {visit_id: {측정항목: {통계: 값}}} (쿼리 1회)"""
+    stats = {}
+    rows = VitalSignsAggregate.objects.filter(visit_id__in=visit_ids).values('visit_id', 'measure', *VITAL_SIGN_STATS)
+    for row in rows:
+        stats.setdefault(row['visit_id'], {})[row['measure']] = {stat: row[stat] for stat in VITAL_SIGN_STATS}
+    return stats
+
+
+def get_window_vital_sign_stats(patient_id, start=None, end=None):
+    """환자의 기간 [start, end) 측정값 통계 - {측정항목: {통계: 값}} (저장하지 않고 바로 계산)"""
+    vital_signs = VitalSigns.objects.filter(visit__patient_id=patient_id)
+    if start is not None:
+        vital_signs = vital_signs.filter(measured_at__gte=start)
+    if end is not None:
+        vital_signs = vital_signs.filter(measured_at__lt=end)
+    rows = [
+        (0, *values) for values in
+        vital_signs.order_by('measured_at', 'id').values_list(*VITAL_SIGN_MEASURE_FIELDS)
+    ]
+    return compute_vital_sign_stats(rows).get(0, {})